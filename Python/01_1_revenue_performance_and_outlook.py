@@ -7,20 +7,19 @@ import matplotlib.dates as mdates
 from statsmodels.tsa.seasonal import STL
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 
+from cica import backtest, paths, tables
+
 
 # Pandas display settings
 pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
 # Project 06 structure:
 # .py files live in /Python
 # CSV files live in /Data_Generated
 # find the directory for the CSV file
-data_dir = os.path.join(script_dir, "..", "Data_Generated")
+data_dir = paths.data_dir
 
 # Attach the file name into the path
 revenue_path                = os.path.join(data_dir, "01_1_revenue_performance_and_outlook.csv")
@@ -96,10 +95,16 @@ plt.show()
 # draw second graph, use SARIMA for time series data which has seasonality ( yearly )
 # ----------------------------------------------------------------------------------------------------------
 
-sarima_result   = SARIMAX( srs_gross_revenue, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12) ).fit(disp=False)
+# The orders come from the 01_5 rolling-origin backtest: the SARIMA spec with the
+# lowest MASE on revenue (only 10 origins, so treat it as a weak preference)
+sarima_spec     = backtest.selected_specs(tables.load_generated("01_5_forecast_backtest_scores"), kind="sarimax")["revenue"]
+print(f"SARIMA spec from the 01_5 backtest: {sarima_spec['name']}")
+
+sarima_result   = SARIMAX( srs_gross_revenue, order=tuple(sarima_spec["order"]),
+                           seasonal_order=tuple(sarima_spec["seasonal_order"]) ).fit(disp=False)
 # srs_gross_revenue is the time series data you feed into SARIMAX.
 
-# order=( 1, 1, 1) is telling the model how to handle short term behavior. 
+# order=( 1, 1, 1) ( the current pick ) is telling the model how to handle short term behavior. 
 # The first 1    - look at the last month.
 # The second 1   - Remove the trend so the data is easier to learn
 # The third 1    - Learn from recent mistakes
@@ -134,7 +139,7 @@ plt.figure(figsize=(16, 8))
 
 plt.title(
     "CICA Prime — Monthly Gross Revenue (Interest + Fees)\n"
-    "Actual vs 12-Month SARIMA Forecast",
+    f"Actual vs 12-Month {sarima_spec['name']} Forecast",
     fontsize=24,          # doubled
     fontweight="bold",    # bold
     loc="center"          # force centering
@@ -3,19 +3,19 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cica.plotting import label_collection
+from cica import paths
+
 
 # Pandas display settings
 pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir                          = os.path.dirname(os.path.abspath(__file__))
-
 # Project structure
 # .py files live in /Python
 # CSV files live in /Data_Generated
-data_dir                            = os.path.join(script_dir, "..", "Data_Generated")
+data_dir                            = paths.data_dir
 
 # Attach the file name into the path
 cashflowgap_path                    = os.path.join(data_dir, "01_2_scheduled_vs_actual_cash_flow.csv")
@@ -79,22 +79,20 @@ ax_chart.plot   (
                     marker="o"
                 )
 
-# annotate each point
-for x, y in zip(df_cashflowgap["year_month"], df_cashflowgap["cashflow_gap_pct"]):
-    if pd.isna(y):
-        continue
+# annotate each point (one collection for all labels)
+srs_gap_pct     = df_cashflowgap["cashflow_gap_pct"]
+is_positive     = (srs_gap_pct >= 0).to_numpy()
 
-    offset = 0.9 if y >= 0 else -1.1
-
-    ax_chart.text   (
-                        x,
-                        y + offset,
-                        f"{y:.1f}%",
-                        ha = "center",
-                        va = "bottom" if y >= 0 else "top",
-                        fontsize=12,
-                        fontweight="bold"
-                    )
+label_collection(
+                    ax_chart,
+                    df_cashflowgap["year_month"],
+                    srs_gap_pct + np.where(is_positive, 0.9, -1.1),
+                    [f"{y:.1f}%" for y in srs_gap_pct],
+                    ha = "center",
+                    va = np.where(is_positive, "bottom", "top"),
+                    fontsize=12,
+                    fontweight="bold"
+                )
 
 ax_chart.set_title  (
                         "CICA Prime — Monthly Cashflow Gap (%)\nActual vs Scheduled Payments",
@@ -3,13 +3,14 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cica import paths
+
 # -----------------------------------------------------------
 # Load data
 # -----------------------------------------------------------
 
-script_dir              = os.path.dirname(os.path.abspath(__file__))
-data_generated_dir      = os.path.join(script_dir, "..", "Data_Generated")
-data_raw_dir            = os.path.join(script_dir, "..", "Data_RAW")
+data_generated_dir      = paths.data_dir
+data_raw_dir            = paths.raw_dir
 
 actual_revenue_path     = os.path.normpath(os.path.join(data_generated_dir, "01_3a_actual_revenue.csv"))
 budget_plan_path        = os.path.normpath(os.path.join(data_raw_dir, "budget_plan_monthly.csv"))
@@ -3,12 +3,13 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cica import paths
+
 # -----------------------------------------------------------
 # Load data
 # -----------------------------------------------------------
 
-script_dir  = os.path.dirname(os.path.abspath(__file__))
-data_dir    = os.path.join(script_dir, "..", "Data_Generated")
+data_dir    = paths.data_dir
 
 delinquency_path = os.path.normpath(
     os.path.join(data_dir, "01_4d_portfolio_delinquency_trend.csv")
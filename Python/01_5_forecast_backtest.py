@@ -0,0 +1,84 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import backtest, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Rolling-origin backtest: every spec x origin, for revenue, cash and loss
+# -----------------------------------------------------------
+
+dict_series             = backtest.load_series()
+
+time_start              = time.perf_counter()
+df_errors, df_scores    = backtest.backtest(dict_series)
+print(f"{len(df_errors) // backtest.HORIZON_MONTHS} backtest forecasts in {time.perf_counter() - time_start:.2f}s "
+      f"({df_scores.attrs['n_fitted']} fitted, the rest from the fit cache)")
+
+tables.save_generated(df_scores, "01_5_forecast_backtest_scores")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+df_mase         = df_scores.pivot(index="spec", columns="series", values="mase")
+df_mase         = df_mase.loc[[spec["name"] for spec in backtest.SPECS], list(dict_series)]
+print(df_mase)
+
+# 01_1 fits the selected SARIMA spec on revenue (backtest.selected_specs, kind="sarimax").
+# The support for it is weak: 36 months, 24 minimum training months and a 3-month
+# horizon leave only 10 rolling origins per series, each fitted on 24 to 33 points,
+# and the MASE gaps between the top few specs are small next to that
+df_selected     = df_scores.loc[df_scores["selected"], ["series", "spec", "mape", "mase"]]
+print(df_selected)
+print(df_scores.loc[(df_scores["series"] == "revenue") & (df_scores["spec"] == "SARIMA(1,1,1)(1,1,1,12)"),
+                    ["spec", "mape", "mase", "rank"]])
+
+
+# -----------------------------------------------------------
+# Chart: MASE per spec and series, and the selected revenue spec one step ahead
+# -----------------------------------------------------------
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 7), gridspec_kw={"width_ratios": [1, 1.3]})
+
+img = ax_left.imshow(df_mase.to_numpy(), aspect="auto", cmap="RdYlGn_r", vmin=0, vmax=1.5)
+ax_left.set_xticks(np.arange(len(df_mase.columns)))
+ax_left.set_xticklabels(df_mase.columns)
+ax_left.set_yticks(np.arange(len(df_mase.index)))
+ax_left.set_yticklabels(df_mase.index)
+for (i, j), value in np.ndenumerate(df_mase.to_numpy()):
+    is_selected = df_selected.loc[df_selected["series"] == df_mase.columns[j], "spec"].eq(df_mase.index[i]).any()
+    ax_left.text(j, i, f"{value:.2f}", ha="center", va="center", fontsize=10,
+                 fontweight="bold" if is_selected else "normal")
+fig.colorbar(img, ax=ax_left).set_label("MASE (lower is better)", fontsize=11)
+
+spec_revenue    = df_selected.loc[df_selected["series"] == "revenue", "spec"].iloc[0]
+df_one_step     = df_errors.loc[(df_errors["series"] == "revenue") & (df_errors["spec"] == spec_revenue) & (df_errors["step"] == 1)]
+srs_revenue     = dict_series["revenue"]
+
+ax_right.plot(srs_revenue.index, srs_revenue, color="black", linewidth=2.5, marker="o", label="Actual Revenue")
+ax_right.plot(df_one_step["origin"], df_one_step["forecast"], color="tab:blue", linewidth=2.5, marker="o",
+              label=f"{spec_revenue}, 1 month ahead")
+
+ax_left.set_title(f"Rolling-Origin MASE by Spec ({df_scores['n_origins'].max()} Origins per Series)", fontsize=15, fontweight="bold", pad=14)
+ax_left.set_xlabel("Series", fontsize=12, fontweight="bold", labelpad=12)
+
+ax_right.set_title("Selected Revenue Spec: Backtest Forecasts", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_xlabel("Month", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.set_ylabel("Gross Revenue", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+ax_right.grid(axis="y", linestyle="--", alpha=0.35)
+ax_right.legend(loc="upper left", frameon=False, fontsize=10)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("01_5_forecast_backtest"), dpi=200)
+plt.show()
@@ -3,12 +3,14 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cica.plotting import bar_value_labels, label_collection
+from cica import paths
+
 # -----------------------------------------------------------
 # Load data
 # -----------------------------------------------------------
 
-script_dir              = os.path.dirname(os.path.abspath(__file__))
-data_dir                = os.path.join(script_dir, "..", "Data_Generated")
+data_dir                = paths.data_dir
 cust_activation_timing  = os.path.normpath(os.path.join(data_dir, "02_1_customer_activation_timing.csv"))
 
 df_cat                  = pd.read_csv(cust_activation_timing)
@@ -60,15 +62,15 @@ ax1.set_ylabel("Activation Days", fontsize=18, fontweight="bold")
 
 # Value labels above AVG dots
 label_offset = 8
-for x, y in zip(df_cat["year_month"], df_cat["avg_activation_days"]):
-    ax1.text(
-        x,
-        y + label_offset,
-        f"{int(round(y))}",
-        ha="center",
-        va="bottom",
-        fontsize=9
-    )
+label_collection(
+    ax1,
+    df_cat["year_month"],
+    df_cat["avg_activation_days"] + label_offset,
+    [f"{int(round(y))}" for y in df_cat["avg_activation_days"]],
+    ha="center",
+    va="bottom",
+    fontsize=9
+)
 
 # Legend (large, upper-right)
 ax1.legend(
@@ -92,17 +94,14 @@ ax2.set_ylabel("Activated Customers", fontsize=18, fontweight="bold")
 ax2.set_xlabel("Year-Month")
 
 # Bar labels
-for bar in bars:
-    h = bar.get_height()
-    if h > 0:
-        ax2.text(
-            bar.get_x() + bar.get_width() / 2,
-            h,
-            f"{int(h)}",
-            ha="center",
-            va="bottom",
-            fontsize=9
-        )
+bar_value_labels(
+    ax2,
+    bars,
+    fmt="{:.0f}",
+    ha="center",
+    va="bottom",
+    fontsize=9
+)
 
 # ============================
 # Vertical guides + cutoff
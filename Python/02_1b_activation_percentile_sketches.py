@@ -0,0 +1,129 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from cica import activation, paths, tables
+from cica.plotting import bar_value_labels
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Load data
+# -----------------------------------------------------------
+
+df_loans        = tables.load_raw("loans")
+df_customers    = tables.load_raw("customers")
+df_sql          = tables.load_generated("02_1_customer_activation_timing", date_cols=["year_month"])
+
+
+# -----------------------------------------------------------
+# Build the sketches: one KLL sketch per (signup month, channel)
+# -----------------------------------------------------------
+
+time_start  = time.perf_counter()
+store       = activation.build(df_loans, df_customers)
+print(f"{len(store)} activated customers in {len(store.cells)} cells, built in {time.perf_counter() - time_start:.3f}s")
+
+
+# -----------------------------------------------------------
+# Reconciliation 1: p50 by signup month vs the SQL PERCENTILE_CONT median
+# -----------------------------------------------------------
+
+df_month    = store.table("signup_month")
+df_recon    = df_month.merge(df_sql, left_on="signup_month", right_on="year_month", how="outer", suffixes=("", "_sql"))
+
+print(f"p50 vs SQL median, max abs diff   : {(df_recon['p50_activation_days'] - df_recon['median_activation_days']).abs().max():.2f} days")
+print(f"customers vs SQL, max abs diff    : {(df_recon['n_customers'] - df_recon['n_customers_sql']).abs().max():.0f}")
+
+
+# -----------------------------------------------------------
+# Reconciliation 2: incremental updates vs one full build, and vs exact quantiles
+# -----------------------------------------------------------
+
+cutoff_date     = pd.Timestamp("2024-12-31")
+store_stream    = activation.ActivationSketches()
+n_first         = store_stream.update_from_loans(df_loans.loc[df_loans["origination_date"] <= cutoff_date], df_customers)
+n_later         = store_stream.update_from_loans(df_loans.loc[df_loans["origination_date"] > cutoff_date], df_customers)
+print(f"Streamed: {n_first} customers through {cutoff_date.date()}, {n_later} after")
+
+df_first        = activation.first_loans(df_loans, df_customers)
+list_accuracy   = []
+
+for channel in [None] + store.channels():
+    arr_days    = df_first["activation_days"].to_numpy() if channel is None else \
+                  df_first.loc[df_first["acquisition_channel"] == channel, "activation_days"].to_numpy()
+    srs_full    = store.quantiles(channels=channel)
+    srs_stream  = store_stream.quantiles(channels=channel)
+
+    for q in activation.QUANTILES:
+        label = activation.quantile_label(q)
+        list_accuracy.append({
+                                "acquisition_channel"   : channel or "All",
+                                "quantile"              : q,
+                                "exact"                 : np.quantile(arr_days, q),
+                                "sketch"                : srs_full[label],
+                                "sketch_streamed"       : srs_stream[label],
+                                # share of customers at or below the sketch value, minus q
+                                "rank_error"            : np.mean(arr_days <= srs_full[label]) - q,
+                             })
+
+df_accuracy = pd.DataFrame(list_accuracy)
+print(df_accuracy)
+
+
+# -----------------------------------------------------------
+# Output: p10 / p50 / p90 / p99 by signup month x channel
+# -----------------------------------------------------------
+
+df_cells = store.table(("signup_month", "acquisition_channel"))
+tables.save_generated(df_cells, "02_1b_activation_percentiles")
+print(df_cells.head(10))
+
+time_start  = time.perf_counter()
+srs_query   = store.quantiles(months=pd.date_range("2024-01-01", "2024-12-01", freq="MS"), channels=["organic", "referral"])
+print(f"Ad hoc cohort (2024 signups, organic + referral), {(time.perf_counter() - time_start) * 1000:.2f} ms:")
+print(srs_query)
+
+
+# -----------------------------------------------------------
+# Chart: percentile bands by signup month, and by channel
+# -----------------------------------------------------------
+
+df_channel  = store.table("acquisition_channel")
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 6), gridspec_kw={"width_ratios": [2, 1]})
+
+ax_left.fill_between(df_month["signup_month"], df_month["p10_activation_days"], df_month["p90_activation_days"],
+                     alpha=0.25, label="p10 – p90")
+ax_left.plot(df_month["signup_month"], df_month["p50_activation_days"], marker="o", markersize=4, linewidth=2, label="p50")
+ax_left.plot(df_month["signup_month"], df_month["p99_activation_days"], linestyle="--", linewidth=1.5, label="p99")
+
+arr_x       = np.arange(len(df_channel))
+bar_width   = 0.2
+for i, q in enumerate(activation.QUANTILES):
+    bars = ax_right.bar(arr_x + (i - 1.5) * bar_width, df_channel[activation.quantile_label(q)], bar_width,
+                        label=f"p{int(round(q * 100))}")
+    bar_value_labels(ax_right, bars, fontsize=8)
+
+ax_right.set_xticks(arr_x)
+ax_right.set_ylim(0, df_channel[activation.quantile_label(activation.QUANTILES[-1])].max() * 1.25)
+ax_right.set_xticklabels(df_channel["acquisition_channel"], rotation=20)
+
+ax_left.set_title("Activation Days Percentiles by Signup Month", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_title("Activation Days Percentiles by Channel", fontsize=15, fontweight="bold", pad=14)
+ax_left.set_xlabel("Signup Month", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.set_xlabel("Acquisition Channel", fontsize=12, fontweight="bold", labelpad=12)
+
+for ax in (ax_left, ax_right):
+    ax.set_ylabel("Activation Days", fontsize=12, fontweight="bold", labelpad=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="upper right", frameon=False, fontsize=10, ncol=1 if ax is ax_left else 4)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("02_1b_activation_percentile_sketches"), dpi=200)
+plt.show()
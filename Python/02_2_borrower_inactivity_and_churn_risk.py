@@ -3,6 +3,8 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cica import paths
+
 # Pandas display settings
 pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
@@ -12,8 +14,7 @@ pd.set_option("display.width", 2000)
 # Load data
 # -----------------------------------------------------------
 
-script_dir      = os.path.dirname(os.path.abspath(__file__))
-data_dir        = os.path.join(script_dir, "..", "Data_Generated")
+data_dir        = paths.data_dir
 path_file       = os.path.normpath(os.path.join(data_dir, "02_2_borrower_inactivity_and_churn_risk.csv"))
 
 df_customer     = pd.read_csv(path_file)
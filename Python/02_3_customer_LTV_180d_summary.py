@@ -1,12 +1,13 @@
 import os
 import pandas as pd
 
+from cica import paths
+
 # -----------------------------------------------------------
 # Load data
 # -----------------------------------------------------------
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-data_dir = os.path.join(script_dir, "..", "Data_Generated")
+data_dir = paths.data_dir
 
 ltv_path = os.path.normpath(
     os.path.join(data_dir, "02_3a_customer_LTV_180d.csv")
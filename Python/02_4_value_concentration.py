@@ -5,6 +5,9 @@ import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
 
+from cica.plotting import downsample
+from cica import paths
+
 
 # Pandas display settings
 pd.set_option("display.max_columns", 200)
@@ -15,8 +18,7 @@ pd.set_option("display.width", 2000)
 # Load data
 # -----------------------------------------------------------
 
-script_dir      = os.path.dirname(os.path.abspath(__file__))
-data_dir        = os.path.join(script_dir, "..", "Data_Generated")
+data_dir        = paths.data_dir
 pareto_path     = os.path.normpath(os.path.join(data_dir, "02_4_value_concentration.csv"))
 df_pareto       = pd.read_csv(pareto_path)
 
@@ -37,19 +39,23 @@ label_fontsize          = 20
 tick_fontsize           = 18
 
 # Output path
-charts_dir              = os.path.join(script_dir, "..", "Charts")
+charts_dir              = paths.charts_dir
 os.makedirs(charts_dir, exist_ok=True)
 
 chart_path              = os.path.normpath(
     os.path.join(charts_dir, "02_4_value_concentration_pareto_curve.png")
 )
 
+# Downsample the curve (shape-preserving LTTB) so render time does not grow with customer count
+df_pareto               = df_pareto.dropna(subset=["pareto_x", "pareto_y"]).sort_values("pareto_x")
+arr_curve_x, arr_curve_y = downsample(df_pareto["pareto_x"], df_pareto["pareto_y"], n_out=2000)
+
 # Plot
 fig, ax                 = plt.subplots(figsize=(8, 6))
 
 ax.plot(
-    df_pareto["pareto_x"],
-    df_pareto["pareto_y"],
+    arr_curve_x,
+    arr_curve_y,
     linewidth=2
 )
 
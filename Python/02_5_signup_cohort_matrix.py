@@ -0,0 +1,90 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import cohorts, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Load data
+# -----------------------------------------------------------
+
+df_revenue      = tables.load_generated("01_3a_actual_revenue")
+df_loss         = tables.load_generated("01_3c_actual_loss")
+
+
+# -----------------------------------------------------------
+# Triangles: saved matrix plus any new diagonals (rebuilt only when the raw CSVs changed)
+# -----------------------------------------------------------
+
+time_start  = time.perf_counter()
+mx          = cohorts.load_matrix()
+print(f"{mx.n_months()} cohorts x {mx.n_months()} offsets ready in {time.perf_counter() - time_start:.3f}s")
+
+
+# -----------------------------------------------------------
+# Reconciliation: diagonal sums = the monthly SQL totals
+# -----------------------------------------------------------
+
+df_recon = pd.DataFrame({
+                            "year_month"        : df_revenue["year_month"],
+                            "revenue_cohorts"   : mx.by_calendar_month("revenue"),
+                            "revenue_sql"       : df_revenue["actual_revenue"],
+                            "net_loss_cohorts"  : mx.by_calendar_month("net_loss"),
+                            "net_loss_sql"      : df_loss["actual_loss"],
+                        })
+print(f"01_3a revenue, max abs diff : {(df_recon['revenue_cohorts'] - df_recon['revenue_sql']).abs().max():.6f}")
+print(f"01_3c net loss, max abs diff: {(df_recon['net_loss_cohorts'] - df_recon['net_loss_sql']).abs().max():.6f}")
+
+
+# -----------------------------------------------------------
+# Output: long cohort table
+# -----------------------------------------------------------
+
+df_cohorts = mx.to_frame()
+tables.save_generated(df_cohorts, "02_5_signup_cohort_matrix")
+print(df_cohorts.head(12))
+
+
+# -----------------------------------------------------------
+# Chart: retention triangle, and cumulative revenue per signup by quarterly cohort
+# -----------------------------------------------------------
+
+arr_retention   = mx.matrix("active_borrowers") / np.where(mx.cohort_size > 0, mx.cohort_size, np.nan)[:, None]
+list_cohorts    = mx.spine.to_month_start(np.arange(mx.n_months())).dt.strftime("%Y-%m").tolist()
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 7), gridspec_kw={"width_ratios": [1.2, 1]})
+
+img = ax_left.imshow(arr_retention, aspect="auto", cmap="Blues", interpolation="nearest")
+ax_left.set_yticks(np.arange(0, mx.n_months(), 3))
+ax_left.set_yticklabels(list_cohorts[::3])
+cbar = fig.colorbar(img, ax=ax_left, format=mtick.PercentFormatter(1.0, decimals=0))
+cbar.set_label("Active Borrowers / Cohort Size", fontsize=11)
+
+df_quarterly    = df_cohorts.loc[df_cohorts["cohort_month"].dt.month.isin([1, 4, 7, 10])]
+arr_colors      = plt.cm.viridis(np.linspace(0, 0.9, df_quarterly["cohort_month"].nunique()))
+
+for color, (cohort_month, df_cohort) in zip(arr_colors, df_quarterly.groupby("cohort_month")):
+    ax_right.plot(df_cohort["months_since_signup"], df_cohort["cum_revenue_per_customer"], linewidth=2,
+                  color=color, label=cohort_month.strftime("%Y-%m"))
+
+ax_left.set_title("Active Borrower Retention by Signup Cohort", fontsize=15, fontweight="bold", pad=14)
+ax_left.set_xlabel("Months Since Signup", fontsize=12, fontweight="bold", labelpad=12)
+ax_left.set_ylabel("Signup Cohort", fontsize=12, fontweight="bold", labelpad=12)
+
+ax_right.set_title("Cumulative Revenue per Signup by Cohort", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_xlabel("Months Since Signup", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.set_ylabel("Revenue per Signed-Up Customer", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.grid(axis="y", linestyle="--", alpha=0.35)
+ax_right.legend(loc="upper left", frameon=False, fontsize=9, ncol=2)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("02_5_signup_cohort_matrix"), dpi=200)
+plt.show()
@@ -4,8 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from cica.plotting import label_collection
+from cica import paths, uncertainty
 
 
 # Pandas display settings
@@ -13,10 +14,7 @@ pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-data_dir = os.path.join(script_dir, "..", "Data_Generated")
+data_dir = paths.data_dir
 
 # Attach the file name into the path
 pd_path                     = os.path.join(data_dir, "03_1_probability_of_default.csv")
@@ -74,6 +72,25 @@ df_pd_by_vintage["pd_12m"]      = (df_pd_by_vintage["total_defaults_12m"] / df_p
 
 
 
+# -----------------------------------------------------------
+# 95% intervals (Poisson-weight bootstrap, Jeffreys for cells with few events; cica.uncertainty)
+# -----------------------------------------------------------
+
+df_pd_ci                        = uncertainty.rate_intervals(["pd_12m"])
+
+df_pd_by_tier                   = df_pd_by_tier.merge(
+                                        uncertainty.segment_table(df_pd_ci, "pd_12m", "risk_tier_at_signup"),
+                                        on="risk_tier_at_signup", how="left"
+                                    )
+
+df_pd_by_vintage["origination_month"] = pd.to_datetime(df_pd_by_vintage["origination_month"])
+df_pd_by_vintage                = df_pd_by_vintage.merge(
+                                        uncertainty.segment_table(df_pd_ci, "pd_12m", "origination_month"),
+                                        on="origination_month", how="left"
+                                    )
+
+
+
 print(df_pd_by_tier.head(100))
 print()
 print(df_pd_by_vintage.head(100))
@@ -100,15 +117,20 @@ srs_pd = df_plot_tier["pd_12m"].astype(float)
 srs_n = df_plot_tier["total_eligible_loans"].astype(int)
 srs_tier = df_plot_tier["risk_tier_at_signup"]
 
+# Error bars run from the bar top to the interval ends
+arr_err = np.vstack([(srs_pd - df_plot_tier["pd_12m_ci_low"]).clip(lower=0),
+                     (df_plot_tier["pd_12m_ci_high"] - srs_pd).clip(lower=0)])
+srs_top = df_plot_tier["pd_12m_ci_high"].combine(srs_pd, max)
+
 # Dynamic headroom
-max_pd = float(srs_pd.max())
+max_pd = float(srs_top.max())
 y_top = max_pd * 1.30
 if y_top < max_pd + 0.02:
     y_top = max_pd + 0.02
 
 fig, ax = plt.subplots(figsize=(10, 6))
 
-ax.bar(srs_tier, srs_pd)
+ax.bar(srs_tier, srs_pd, yerr=arr_err, capsize=6, error_kw={"elinewidth": 1.5, "ecolor": "black"})
 
 ax.set_title("12M PD by Risk Tier at Signup", fontsize=16, fontweight="bold", pad=18)
 ax.set_xlabel("Risk Tier", fontsize=13, fontweight="bold", labelpad=15)
@@ -123,23 +145,20 @@ ax.set_ylim(0, y_top)
 label_offset = y_top * 0.02
 
 # Add eligible loan count labels above bars
-for idx in range(df_plot_tier.shape[0]):
-    y_val = float(srs_pd.iloc[idx])
-    n_val = int(srs_n.iloc[idx])
-
-    ax.text(
-        idx,
-        y_val + label_offset,
-        str(n_val),
-        ha="center",
-        va="bottom",
-        fontsize=11,
-        fontweight="bold",
-        clip_on=True
-    )
+label_collection(
+    ax,
+    np.arange(df_plot_tier.shape[0]),
+    srs_top.to_numpy(dtype=float) + label_offset,
+    [str(n_val) for n_val in srs_n],
+    ha="center",
+    va="bottom",
+    fontsize=11,
+    fontweight="bold"
+)
 
 # Legend explaining what the number means
 ax.plot([], [], " ", label="Numbers above bars = Eligible loan count (N)")
+ax.plot([], [], " ", label=f"Error bars = {uncertainty.ci_label(df_pd_ci, 'pd_12m', 'risk_tier_at_signup')}")
 ax.legend(loc="upper left", frameon=False, fontsize=11)
 
 ax.grid(axis="y", linestyle="--", alpha=0.35)
@@ -168,15 +187,20 @@ df_plot["month_label"] = df_plot["origination_month_dt"].dt.strftime("%Y-%m")
 srs_pd = df_plot["pd_12m"]
 srs_n = df_plot["total_eligible_loans"].astype(int)
 
+# Error bars run from the bar top to the interval ends
+arr_err = np.vstack([(srs_pd - df_plot["pd_12m_ci_low"]).clip(lower=0),
+                     (df_plot["pd_12m_ci_high"] - srs_pd).clip(lower=0)])
+srs_top = df_plot["pd_12m_ci_high"].combine(srs_pd, max)
+
 # Dynamic headroom so labels never go above chart area
-max_pd = float(srs_pd.max())
+max_pd = float(srs_top.max())
 y_top = max_pd * 1.25
 if y_top < max_pd + 0.02:
     y_top = max_pd + 0.02
 
 fig, ax = plt.subplots(figsize=(16, 6))
 
-bars = ax.bar(df_plot["month_label"], srs_pd)
+bars = ax.bar(df_plot["month_label"], srs_pd, yerr=arr_err, capsize=4, error_kw={"elinewidth": 1.2, "ecolor": "black"})
 
 # Axis labels (bigger, bold, with padding)
 ax.set_title("12M PD by Origination Month", fontsize=16, fontweight="bold", pad=18)
@@ -197,23 +221,20 @@ ax.set_ylim(0, y_top)
 
 # Put loan-count labels just above each bar (bigger, no overlap)
 label_offset = y_top * 0.015
-for idx in range(df_plot.shape[0]):
-    y_val = float(srs_pd.iloc[idx])
-    n_val = int(srs_n.iloc[idx])
-
-    ax.text(
-        idx,
-        y_val + label_offset,
-        str(n_val),
-        ha="center",
-        va="bottom",
-        fontsize=11,
-        fontweight="bold",
-        clip_on=True
-    )
+label_collection(
+    ax,
+    np.arange(df_plot.shape[0]),
+    srs_top.to_numpy(dtype=float) + label_offset,
+    [str(n_val) for n_val in srs_n],
+    ha="center",
+    va="bottom",
+    fontsize=11,
+    fontweight="bold"
+)
 
 # Legend explaining label meaning
 ax.plot([], [], " ", label="Numbers above bars = Eligible loan count (N)")
+ax.plot([], [], " ", label=f"Error bars = {uncertainty.ci_label(df_pd_ci, 'pd_12m', 'origination_month')}")
 ax.legend(loc="upper right", frameon=False, fontsize=11)
 
 ax.grid(axis="y", linestyle="--", alpha=0.35)
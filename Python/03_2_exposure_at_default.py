@@ -4,8 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from cica.plotting import label_collection
+from cica import paths
 
 
 # Pandas display settings
@@ -13,10 +14,7 @@ pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-data_dir = os.path.join(script_dir, "..", "Data_Generated")
+data_dir = paths.data_dir
 
 # Attach the file name into the path
 pd_path                     = os.path.join(data_dir, "03_2_exposure_at_default.csv")
@@ -105,16 +103,15 @@ plt.text(
 )
 
 # Bar labels (N) above bars
-for bar, n in zip(bars, df_plot_risk["defaulted_loan_count"]):
-    height = bar.get_height()
-    plt.text(
-        bar.get_x() + bar.get_width() / 2,
-        height + (0.01 * df_plot_risk["avg_principal_unpaid_on_default"].max()),
-        f"{int(n)}",
-        ha="center",
-        va="bottom",
-        fontsize=18
-    )
+label_collection(
+    plt.gca(),
+    [bar.get_x() + bar.get_width() / 2 for bar in bars],
+    [bar.get_height() + (0.01 * df_plot_risk["avg_principal_unpaid_on_default"].max()) for bar in bars],
+    [f"{int(n)}" for n in df_plot_risk["defaulted_loan_count"]],
+    ha="center",
+    va="bottom",
+    fontsize=18
+)
 
 plt.tight_layout()
 plt.show()
@@ -159,16 +156,15 @@ plt.text(
 )
 
 # Bar labels
-for bar, n in zip(bars, df_plot_vintage["defaulted_loan_count"]):
-    height = bar.get_height()
-    plt.text(
-        bar.get_x() + bar.get_width() / 2,
-        height + (0.02 * max_y),   # small offset above bar
-        f"{int(n)}",
-        ha="center",
-        va="bottom",
-        fontsize=16
-    )
+label_collection(
+    plt.gca(),
+    [bar.get_x() + bar.get_width() / 2 for bar in bars],
+    [bar.get_height() + (0.02 * max_y) for bar in bars],   # small offset above bar
+    [f"{int(n)}" for n in df_plot_vintage["defaulted_loan_count"]],
+    ha="center",
+    va="bottom",
+    fontsize=16
+)
 
 plt.tight_layout()
 plt.show()
@@ -4,8 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from cica.plotting import label_collection
+from cica import paths, uncertainty
 
 
 # Pandas display settings
@@ -13,10 +14,7 @@ pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir                  = os.path.dirname(os.path.abspath(__file__))
-
-data_dir                    = os.path.join(script_dir, "..", "Data_Generated")
+data_dir                    = paths.data_dir
 
 # Attach the file name into the path
 pd_path                     = os.path.join(data_dir, "03_3_loss_given_default.csv")
@@ -74,6 +72,24 @@ df_lgd_by_vintage["origination_month_label"] = df_lgd_by_vintage["origination_mo
 
 
 
+# ----------------
+# 95% bootstrap intervals (Poisson weights, 10,000 replicates, cica.uncertainty)
+# ----------------
+
+df_lgd_ci                   = uncertainty.rate_intervals(["lgd"])
+
+df_lgd_by_tier              = df_lgd_by_tier.merge(
+                                    uncertainty.segment_table(df_lgd_ci, "lgd", "risk_tier_at_signup"),
+                                    on="risk_tier_at_signup", how="left"
+                                )
+
+df_lgd_by_vintage           = df_lgd_by_vintage.merge(
+                                    uncertainty.segment_table(df_lgd_ci, "lgd", "origination_month"),
+                                    on="origination_month", how="left"
+                                )
+
+
+
 # ----------------
 # Chart 1: LGD by Risk Tier
 # ----------------
@@ -83,7 +99,13 @@ plt.figure(figsize=(18, 10))
 x_tier                      = df_lgd_by_tier["risk_tier_at_signup"]
 y_lgd_tier                  = df_lgd_by_tier["lgd_rate"]  # ratio (0–1)
 
-bars                        = plt.bar(x_tier, y_lgd_tier)
+# Error bars run from the bar top to the interval ends
+arr_err_tier                = np.vstack([(y_lgd_tier - df_lgd_by_tier["lgd_ci_low"]).clip(lower=0),
+                                         (df_lgd_by_tier["lgd_ci_high"] - y_lgd_tier).clip(lower=0)])
+srs_top_tier                = df_lgd_by_tier["lgd_ci_high"].combine(y_lgd_tier, max)
+
+bars                        = plt.bar(x_tier, y_lgd_tier, yerr=arr_err_tier, capsize=8,
+                                      error_kw={"elinewidth": 2, "ecolor": "black"})
 
 plt.title("Exposure-Weighted LGD by Risk Tier at Signup", fontsize=22)
 plt.xlabel("Risk Tier", fontsize=18)
@@ -97,7 +119,7 @@ plt.yticks(fontsize=16)
 # Legend-style note box
 plt.text(
         0.02, 0.96,
-        "Numbers above bars = Defaulted loan count (N)",
+        "Numbers above bars = Defaulted loan count (N)\nError bars = " + uncertainty.ci_label(df_lgd_ci, "lgd", "risk_tier_at_signup"),
         transform=ax.transAxes,
         fontsize=14,
         verticalalignment="top",
@@ -105,16 +127,15 @@ plt.text(
     )
 
 # N labels above bars
-for bar, n in zip(bars, df_lgd_by_tier["defaulted_loan_count"]):
-    bar_height              = bar.get_height()
-    plt.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar_height + 0.01,
-            f"{int(n)}",
-            ha="center",
-            va="bottom",
-            fontsize=16
-        )
+label_collection(
+        plt.gca(),
+        [bar.get_x() + bar.get_width() / 2 for bar in bars],
+        srs_top_tier + 0.01,
+        [f"{int(n)}" for n in df_lgd_by_tier["defaulted_loan_count"]],
+        ha="center",
+        va="bottom",
+        fontsize=16
+    )
 
 plt.tight_layout()
 plt.show()
@@ -130,7 +151,12 @@ plt.figure(figsize=(22, 10))
 x_vintage                   = df_lgd_by_vintage["origination_month_label"]
 y_lgd_vintage               = df_lgd_by_vintage["lgd_rate"]
 
-bars                        = plt.bar(x_vintage, y_lgd_vintage)
+arr_err_vintage             = np.vstack([(y_lgd_vintage - df_lgd_by_vintage["lgd_ci_low"]).clip(lower=0),
+                                         (df_lgd_by_vintage["lgd_ci_high"] - y_lgd_vintage).clip(lower=0)])
+srs_top_vintage             = df_lgd_by_vintage["lgd_ci_high"].combine(y_lgd_vintage, max)
+
+bars                        = plt.bar(x_vintage, y_lgd_vintage, yerr=arr_err_vintage, capsize=4,
+                                      error_kw={"elinewidth": 1.5, "ecolor": "black"})
 
 plt.title("Exposure-Weighted LGD by Origination Month", fontsize=22)
 plt.xlabel("Origination Month", fontsize=18)
@@ -140,7 +166,7 @@ ax                          = plt.gca()
 ax.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=1.0))
 
 # Add headroom so labels and legend don't collide
-plt.ylim(0, y_lgd_vintage.max() * 1.20)
+plt.ylim(0, srs_top_vintage.max() * 1.20)
 
 plt.xticks(rotation=45, ha="right", fontsize=14)
 plt.yticks(fontsize=16)
@@ -148,7 +174,7 @@ plt.yticks(fontsize=16)
 # Legend-style note box
 plt.text(
         0.70, 0.98,
-        "Numbers above bars = Defaulted loan count (N)",
+        "Numbers above bars = Defaulted loan count (N)\nError bars = " + uncertainty.ci_label(df_lgd_ci, "lgd", "origination_month"),
         transform=ax.transAxes,
         fontsize=14,
         verticalalignment="top",
@@ -156,16 +182,15 @@ plt.text(
     )
 
 # N labels above bars
-for bar, n in zip(bars, df_lgd_by_vintage["defaulted_loan_count"]):
-    bar_height              = bar.get_height()
-    plt.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar_height + 0.015,
-            f"{int(n)}",
-            ha="center",
-            va="bottom",
-            fontsize=12
-        )
+label_collection(
+        plt.gca(),
+        [bar.get_x() + bar.get_width() / 2 for bar in bars],
+        srs_top_vintage + 0.015,
+        [f"{int(n)}" for n in df_lgd_by_vintage["defaulted_loan_count"]],
+        ha="center",
+        va="bottom",
+        fontsize=12
+    )
 
 plt.tight_layout()
 plt.show()
\ No newline at end of file
@@ -4,8 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from cica.plotting import bar_value_labels, label_collection
+from cica import paths, uncertainty
 
 
 # Pandas display settings
@@ -13,10 +14,7 @@ pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir                  = os.path.dirname(os.path.abspath(__file__))
-
-data_dir                    = os.path.join(script_dir, "..", "Data_Generated")
+data_dir                    = paths.data_dir
 
 # Attach the file name into the path
 cdr_filename                = "03_4a_cumulative_default_rate.csv"
@@ -46,6 +44,15 @@ print(df_cdr12m.head())
 # Sort for correct time order
 df_cdr12m                   = df_cdr12m.sort_values("origination_month")
 
+# 95% intervals (Poisson-weight bootstrap, Jeffreys for vintages with few defaults; cica.uncertainty), in percent like cdr_12m
+df_cdr_ci                   = uncertainty.rate_intervals(["cdr_12m"])
+df_cdr12m                   = df_cdr12m.merge(
+    uncertainty.segment_table(df_cdr_ci, "cdr_12m", "origination_month", scale=100.0),
+    on="origination_month",
+    how="left"
+)
+print(df_cdr12m)
+
 srs_x                       = df_cdr12m["origination_month"]
 srs_n_loans                 = df_cdr12m["n_loans_in_vintage"]
 srs_n_defaults              = df_cdr12m["n_default_12m_loans"]
@@ -85,6 +92,15 @@ ax2.plot(
     markeredgewidth=2.5
 )
 
+ax2.fill_between(
+    srs_x,
+    df_cdr12m["cdr_12m_ci_low"],
+    df_cdr12m["cdr_12m_ci_high"],
+    color="black",
+    alpha=0.12,
+    label=uncertainty.ci_label(df_cdr_ci, "cdr_12m", "origination_month")
+)
+
 ax2.set_ylabel("12M Cumulative Default Rate", fontsize=20)
 ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=100))
 
@@ -96,52 +112,33 @@ plt.title(
 )
 
 # Larger bar value labels
-for rect in bar_loans:
-    x_pos                   = rect.get_x() + rect.get_width() / 2
-    y_val                   = rect.get_height()
-    if pd.notna(y_val) and y_val != 0:
-        ax1.text(
-            x_pos,
-            y_val,
-            f"{int(y_val)}",
-            ha="center",
-            va="bottom",
-            color=rect.get_facecolor(),
-            fontsize=12,
-            fontweight="bold"
-        )
-
-for rect in bar_defaults:
-    x_pos                   = rect.get_x() + rect.get_width() / 2
-    y_val                   = rect.get_height()
-    if pd.notna(y_val) and y_val != 0:
-        ax1.text(
-            x_pos,
-            y_val,
-            f"{int(y_val)}",
-            ha="center",
-            va="bottom",
-            color=rect.get_facecolor(),
-            fontsize=12,
-            fontweight="bold"
-        )
+for bars in [bar_loans, bar_defaults]:
+    bar_value_labels(
+        ax1,
+        bars,
+        fmt="{:.0f}",
+        match_bar_color=True,
+        ha="center",
+        va="bottom",
+        fontsize=12,
+        fontweight="bold"
+    )
 
 # Larger line value labels
 y_max                       = float(np.nanmax(srs_cdr_12m)) if len(srs_cdr_12m) else 0.0
 y_offset                    = max(0.15, y_max * 0.03)
 
-for x_val, y_val in zip(srs_x, srs_cdr_12m):
-    if pd.notna(y_val):
-        ax2.text(
-            x_val,
-            y_val + y_offset,
-            f"{y_val:.2f}%",
-            ha="center",
-            va="bottom",
-            color="black",
-            fontsize=12,
-            fontweight="bold"
-        )
+label_collection(
+    ax2,
+    srs_x,
+    srs_cdr_12m + y_offset,
+    [f"{y_val:.2f}%" for y_val in srs_cdr_12m],
+    ha="center",
+    va="bottom",
+    color="black",
+    fontsize=12,
+    fontweight="bold"
+)
 
 # Force every bar to have its own 45° label
 ax1.set_xticks(srs_x)
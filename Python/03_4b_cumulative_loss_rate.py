@@ -4,8 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import matplotlib.dates as mdates
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from cica.plotting import bar_value_labels, label_collection
+from cica import paths, uncertainty
 
 
 # Pandas display settings
@@ -13,10 +14,7 @@ pd.set_option("display.max_columns", 200)
 pd.set_option("display.max_rows", 100)
 pd.set_option("display.width", 2000)
 
-# find the path to current active Python path, ground it here
-script_dir                  = os.path.dirname(os.path.abspath(__file__))
-
-data_dir                    = os.path.join(script_dir, "..", "Data_Generated")
+data_dir                    = paths.data_dir
 
 # Attach the file name into the path
 clr_filename                = "03_4b_cumulative_loss_rate.csv"
@@ -33,6 +31,15 @@ df_clr12m                   = df_clr12m.copy()
 df_clr12m["origination_month"] = pd.to_datetime(df_clr12m["origination_month"])
 df_clr12m                   = df_clr12m.sort_values("origination_month")
 
+# 95% bootstrap intervals (Poisson weights, 10,000 replicates, cica.uncertainty), in percent like clr_12m
+df_clr_ci                   = uncertainty.rate_intervals(["clr_12m"])
+df_clr12m                   = df_clr12m.merge(
+    uncertainty.segment_table(df_clr_ci, "clr_12m", "origination_month", scale=100.0),
+    on="origination_month",
+    how="left"
+)
+print(df_clr12m)
+
 srs_x                       = df_clr12m["origination_month"]
 srs_n_loans                 = df_clr12m["n_loans_in_vintage"]
 srs_total_loss_12m          = df_clr12m["total_loss_12m"]
@@ -75,11 +82,20 @@ ax2.plot(
     markeredgewidth=2.5
 )
 
+ax2.fill_between(
+    srs_x,
+    df_clr12m["clr_12m_ci_low"],
+    df_clr12m["clr_12m_ci_high"],
+    color="black",
+    alpha=0.12,
+    label=uncertainty.ci_label(df_clr_ci, "clr_12m", "origination_month")
+)
+
 ax2.set_ylabel("12M Cumulative Loss Rate", fontsize=20)
 ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=100))
 
 # Add headroom for line
-max_right                   = srs_clr_12m.max()
+max_right                   = max(srs_clr_12m.max(), df_clr12m["clr_12m_ci_high"].max())
 ax2.set_ylim(0, max_right * 1.25)
 
 plt.title(
@@ -91,35 +107,17 @@ plt.title(
 # ----------------------------
 # BAR LABELS
 # ----------------------------
-for rect in bar_loans:
-    x_pos                   = rect.get_x() + rect.get_width() / 2
-    y_val                   = rect.get_height()
-    if pd.notna(y_val) and y_val != 0:
-        ax1.text(
-            x_pos,
-            y_val,
-            f"{int(y_val)}",
-            ha="center",
-            va="bottom",
-            color=rect.get_facecolor(),
-            fontsize=12,
-            fontweight="bold"
-        )
-
-for rect in bar_loss:
-    x_pos                   = rect.get_x() + rect.get_width() / 2
-    y_val                   = rect.get_height()
-    if pd.notna(y_val) and y_val != 0:
-        ax1.text(
-            x_pos,
-            y_val,
-            f"{y_val:,.0f}",
-            ha="center",
-            va="bottom",
-            color=rect.get_facecolor(),
-            fontsize=12,
-            fontweight="bold"
-        )
+for bars, fmt in [(bar_loans, "{:.0f}"), (bar_loss, "{:,.0f}")]:
+    bar_value_labels(
+        ax1,
+        bars,
+        fmt=fmt,
+        match_bar_color=True,
+        ha="center",
+        va="bottom",
+        fontsize=12,
+        fontweight="bold"
+    )
 
 # ----------------------------
 # LINE LABELS
@@ -127,18 +125,17 @@ for rect in bar_loss:
 y_max                       = float(np.nanmax(srs_clr_12m)) if len(srs_clr_12m) else 0.0
 y_offset                    = max(0.15, y_max * 0.03)
 
-for x_val, y_val in zip(srs_x, srs_clr_12m):
-    if pd.notna(y_val):
-        ax2.text(
-            x_val,
-            y_val + y_offset,
-            f"{y_val:.2f}%",
-            ha="center",
-            va="bottom",
-            color="black",
-            fontsize=12,
-            fontweight="bold"
-        )
+label_collection(
+    ax2,
+    srs_x,
+    srs_clr_12m + y_offset,
+    [f"{y_val:.2f}%" for y_val in srs_clr_12m],
+    ha="center",
+    va="bottom",
+    color="black",
+    fontsize=12,
+    fontweight="bold"
+)
 
 ax1.set_xticks(srs_x)
 ax1.set_xticklabels(
@@ -0,0 +1,115 @@
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import paths, policy, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Score every application, then sweep all thresholds at once
+# -----------------------------------------------------------
+
+time_start                  = time.perf_counter()
+
+df_apps                     = policy.application_economics()
+df_sweep, df_band           = policy.sweep_all_segments(df_apps)
+
+print(f"Threshold sweep built in {time.perf_counter() - time_start:.2f}s")
+
+tables.save_generated(df_sweep, "03_5a_policy_threshold_sweep")
+tables.save_generated(df_band, "03_5b_policy_band_sweep")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+# Where does today's policy sit? (lowest score that was actually approved)
+current_cutoff              = df_apps.loc[df_apps["decision"] == "approved", "decision_score"].min()
+
+df_portfolio                = df_sweep.loc[df_sweep["segment_type"] == "portfolio"]
+row_current                 = df_portfolio.loc[df_portfolio["threshold"] >= current_cutoff].iloc[-1]
+row_best                    = df_portfolio.loc[df_portfolio["expected_profit"].idxmax()]
+
+print("\nCurrent policy (lowest approved score):")
+print(row_current)
+print("\nProfit-maximising single threshold:")
+print(row_best)
+
+# Best threshold per risk tier
+df_tier                     = df_sweep.loc[df_sweep["segment_type"] == "risk_tier_at_signup"]
+df_best_tier                = df_tier.loc[df_tier.groupby("segment")["expected_profit"].idxmax()]
+print("\nProfit-maximising threshold by risk tier:")
+print(df_best_tier)
+
+# Best approve / review / reject band for the whole book
+df_band_portfolio           = df_band.loc[df_band["segment_type"] == "portfolio"]
+print("\nTop 5 approve / review / reject bands:")
+print(df_band_portfolio.sort_values("expected_profit_policy", ascending=False).head(5))
+
+
+# -----------------------------------------------------------
+# Chart: approval rate, expected bad rate and profit by threshold
+# -----------------------------------------------------------
+
+fig, ax1 = plt.subplots(figsize=(14, 7))
+
+ax1.plot(
+    df_portfolio["threshold"],
+    df_portfolio["expected_profit"],
+    linewidth=2.5,
+    label="Expected Profit"
+)
+
+ax1.set_xlabel("Approval Threshold (decision_score)", fontsize=14, fontweight="bold")
+ax1.set_ylabel("Expected Profit", fontsize=14, fontweight="bold")
+ax1.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+
+ax2 = ax1.twinx()
+
+ax2.plot(
+    df_portfolio["threshold"],
+    df_portfolio["approval_rate"],
+    linestyle="--",
+    linewidth=2,
+    color="gray",
+    label="Approval Rate"
+)
+
+ax2.plot(
+    df_portfolio["threshold"],
+    df_portfolio["expected_bad_rate"],
+    linestyle=":",
+    linewidth=2.5,
+    color="black",
+    label="Expected Bad Rate"
+)
+
+ax2.set_ylabel("Rate", fontsize=14, fontweight="bold")
+ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=1.0))
+
+ax1.axvline(current_cutoff, color="red", linestyle="--", linewidth=1.2, label=f"Current Cutoff ({current_cutoff:.0f})")
+ax1.axvline(row_best["threshold"], color="green", linestyle="--", linewidth=1.2, label=f"Max Profit ({row_best['threshold']:.0f})")
+
+ax1.set_title(
+    "CICA Prime — Credit Policy Threshold Sweep\n"
+    "Approval Rate vs Expected Bad Rate vs Expected Profit",
+    fontsize=18,
+    fontweight="bold"
+)
+
+handles1, labels1 = ax1.get_legend_handles_labels()
+handles2, labels2 = ax2.get_legend_handles_labels()
+ax1.legend(handles1 + handles2, labels1 + labels2, loc="center left", frameon=False, fontsize=11)
+
+ax1.grid(axis="y", linestyle="--", alpha=0.35)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_5_credit_policy_thresholds"), dpi=200)
+plt.show()
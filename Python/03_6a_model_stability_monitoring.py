@@ -0,0 +1,68 @@
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import monitoring, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# PSI (decision_score) + CSI (PD features) by month
+# Picks up the monitors saved by the last run and only adds the months after them
+# -----------------------------------------------------------
+
+df_monitor, monitor_score, monitor_pd   = monitoring.stability_table(
+                                                monitor_score   = monitoring.load_monitor(monitoring.SCORE_MONITOR_PATH),
+                                                monitor_pd      = monitoring.load_monitor(monitoring.PD_MONITOR_PATH),
+                                          )
+
+monitor_score.save(monitoring.SCORE_MONITOR_PATH)
+monitor_pd.save(monitoring.PD_MONITOR_PATH)
+
+tables.save_generated(df_monitor, "03_6a_model_stability_monitoring")
+
+print(df_monitor.loc[df_monitor["status"] != "stable"])
+
+
+# -----------------------------------------------------------
+# Chart: monthly PSI / CSI (same month axis as 03_1b PD by vintage)
+# -----------------------------------------------------------
+
+df_plot                     = df_monitor.pivot(index="year_month", columns="feature", values="stability_index").sort_index()
+df_plot.index               = df_plot.index.strftime("%Y-%m")
+
+fig, ax = plt.subplots(figsize=(16, 6))
+
+for col in df_plot.columns:
+    is_score = col == monitoring.SCORE_FEATURE
+    ax.plot(
+        df_plot.index,
+        df_plot[col],
+        linewidth=3 if is_score else 1.5,
+        color="black" if is_score else None,
+        marker="o" if is_score else None,
+        label=f"PSI — {col}" if is_score else f"CSI — {col}"
+    )
+
+ax.axhline(monitoring.PSI_WATCH, color="orange", linestyle="--", linewidth=1.2, label="Watch (0.10)")
+ax.axhline(monitoring.PSI_ALERT, color="red", linestyle="--", linewidth=1.2, label="Shifted (0.25)")
+
+ax.set_title("Model & Population Stability vs 2023 Reference", fontsize=16, fontweight="bold", pad=18)
+ax.set_xlabel("Month", fontsize=13, fontweight="bold", labelpad=18)
+ax.set_ylabel("Stability Index", fontsize=13, fontweight="bold", labelpad=18)
+
+ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:.2f}"))
+ax.tick_params(axis="y", labelsize=11)
+ax.tick_params(axis="x", labelsize=10, pad=10)
+plt.xticks(rotation=45, ha="right")
+
+ax.legend(loc="upper left", frameon=False, fontsize=9, ncol=3)
+ax.grid(axis="y", linestyle="--", alpha=0.35)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_6a_model_stability_monitoring"), dpi=200)
+plt.show()
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import calibration, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# AUC / KS / Brier + reliability deciles for every segment
+# -----------------------------------------------------------
+#
+# In-sample: the PD(score) curve is fit on the same booked, PD-eligible loans it
+# is scored against here, so these figures are optimistic for new applications.
+
+time_start                  = time.perf_counter()
+
+df_metrics, df_reliability  = calibration.calibration_tables()
+
+print(f"Calibration tables built in {time.perf_counter() - time_start:.2f}s")
+
+tables.save_generated(df_metrics, "03_6b_model_calibration_discrimination")
+tables.save_generated(df_reliability, "03_6c_model_reliability_deciles")
+
+print(df_metrics.loc[df_metrics["segment_level"].isin(["portfolio", "risk_tier_at_signup"])])
+
+
+# -----------------------------------------------------------
+# Chart: AUC by vintage (with bootstrap band) + portfolio reliability
+# -----------------------------------------------------------
+
+df_vintage                  = df_metrics.loc[df_metrics["segment_level"] == "origination_month"].sort_values("origination_month")
+df_rel_portfolio            = df_reliability.loc[df_reliability["segment_level"] == "portfolio"]
+
+fig, (ax1, ax2) = plt.subplots(
+    1, 2,
+    figsize=(18, 7),
+    gridspec_kw={"width_ratios": [2, 1]}
+)
+
+ax1.plot(
+    df_vintage["origination_month"],
+    df_vintage["auc"],
+    color="black",
+    linewidth=2.5,
+    marker="o",
+    label="AUC"
+)
+
+ax1.fill_between(
+    df_vintage["origination_month"],
+    df_vintage["auc_ci_low"],
+    df_vintage["auc_ci_high"],
+    alpha=0.2,
+    label="95% Bootstrap CI"
+)
+
+ax1.axhline(0.5, color="red", linestyle="--", linewidth=1.2, label="No Discrimination (0.50)")
+
+ax1.set_title("AUC by Origination Month (In-Sample)", fontsize=16, fontweight="bold", pad=18)
+ax1.set_xlabel("Origination Month", fontsize=13, fontweight="bold", labelpad=15)
+ax1.set_ylabel("AUC", fontsize=13, fontweight="bold", labelpad=15)
+ax1.set_ylim(0, 1)
+ax1.tick_params(axis="x", rotation=45)
+ax1.legend(loc="lower left", frameon=False, fontsize=11)
+ax1.grid(axis="y", linestyle="--", alpha=0.35)
+
+max_pd                      = float(np.nanmax(df_rel_portfolio[["mean_predicted_pd", "observed_default_rate"]].to_numpy())) * 1.1
+
+ax2.plot([0, max_pd], [0, max_pd], linestyle="--", linewidth=1, color="gray", label="Perfect Calibration")
+ax2.plot(
+    df_rel_portfolio["mean_predicted_pd"],
+    df_rel_portfolio["observed_default_rate"],
+    marker="o",
+    linewidth=2,
+    label="PD Deciles"
+)
+
+ax2.set_title("Reliability (Portfolio, In-Sample)", fontsize=16, fontweight="bold", pad=18)
+ax2.set_xlabel("Mean Predicted PD", fontsize=13, fontweight="bold", labelpad=15)
+ax2.set_ylabel("Observed 12M Default Rate", fontsize=13, fontweight="bold", labelpad=15)
+ax2.xaxis.set_major_formatter(mtick.PercentFormatter(xmax=1.0))
+ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=1.0))
+ax2.legend(loc="upper left", frameon=False, fontsize=11)
+ax2.grid(linestyle="--", alpha=0.35)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_6b_model_calibration_discrimination"), dpi=200)
+plt.show()
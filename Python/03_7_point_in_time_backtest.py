@@ -0,0 +1,117 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import asof, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Event index (built once, shared by every as_of)
+# -----------------------------------------------------------
+
+time_start  = time.perf_counter()
+ix          = asof.EventIndex()
+print(f"Event index built in {time.perf_counter() - time_start:.2f}s")
+
+
+# -----------------------------------------------------------
+# Reconciliation: as_of 2025-12-31 with no event horizon = the SQL exports
+# -----------------------------------------------------------
+#
+# Numeric columns are compared by max absolute difference. Every other column
+# (dates, tiers, channels, ...) is compared as text, dates as YYYY-MM-DD like the
+# exports, with missing equal to missing; text_mismatches counts differing cells.
+
+def as_text(srs):
+    if pd.api.types.is_datetime64_any_dtype(srs):
+        return srs.dt.strftime("%Y-%m-%d")
+    return srs.astype("string")
+
+
+dict_snapshot   = asof.sql_snapshot(ix)
+list_recon      = []
+
+for output_name, df_asof in dict_snapshot.items():
+    df_sql          = tables.load_generated(output_name)
+    list_keys       = [c for c in df_sql.columns if c.endswith("_id") or c in ("origination_month", "year_month")]
+    df_sql          = df_sql.sort_values(list_keys, kind="mergesort").reset_index(drop=True)
+    df_asof         = df_asof.sort_values(list_keys, kind="mergesort").reset_index(drop=True)
+    list_numeric    = [c for c in df_asof.columns if c in df_sql.columns
+                       and pd.api.types.is_numeric_dtype(df_sql[c]) and not c.endswith("_id")]
+
+    list_text       = [c for c in df_sql.columns if c not in list_numeric and not c.endswith("_id")]
+    list_missing    = [c for c in df_sql.columns if c not in df_asof.columns]
+
+    if len(df_asof) == len(df_sql):
+        arr_diff        = [np.nanmax(np.abs(df_asof[c].astype(float).to_numpy() - df_sql[c].astype(float).to_numpy()), initial=0)
+                           for c in list_numeric]
+        n_text_diff     = sum(int((as_text(df_asof[c]).fillna("NULL") != as_text(df_sql[c]).fillna("NULL")).sum())
+                              for c in list_text if c in df_asof.columns)
+    else:
+        arr_diff, n_text_diff = [np.nan], np.nan
+
+    list_recon.append({
+                        "output"            : output_name,
+                        "rows_as_of"        : len(df_asof),
+                        "rows_sql"          : len(df_sql),
+                        "max_abs_diff"      : max(arr_diff, default=0),
+                        "text_mismatches"   : n_text_diff,
+                        "missing_columns"   : ", ".join(list_missing),
+                      })
+
+print(pd.DataFrame(list_recon))
+
+
+# -----------------------------------------------------------
+# Sweep: 36 month-ends, each rebuilt point-in-time
+# -----------------------------------------------------------
+
+time_start  = time.perf_counter()
+df_sweep    = asof.sweep(asof.month_end_dates(), ix)
+print(f"Sweep over {df_sweep['as_of'].nunique()} month-ends in {time.perf_counter() - time_start:.2f}s")
+
+tables.save_generated(df_sweep, "03_7_point_in_time_sweep")
+
+df_all      = df_sweep.loc[df_sweep["risk_tier_at_signup"] == "All"].pivot(index="as_of", columns="metric", values="value")
+print(df_all)
+
+
+# -----------------------------------------------------------
+# Chart: how the headline rates looked at each month-end
+# -----------------------------------------------------------
+
+df_tier_pd  = (df_sweep
+                    .loc[(df_sweep["metric"] == "pd_12m") & (df_sweep["risk_tier_at_signup"] != "All")]
+                    .pivot(index="as_of", columns="risk_tier_at_signup", values="value")
+              )
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 6))
+
+for metric, label in [("pd_12m", "PD 12M"), ("cdr_12m", "CDR 12M"), ("clr_12m", "CLR 12M"), ("lgd", "LGD")]:
+    ax_left.plot(df_all.index, df_all[metric], marker="o", markersize=3, linewidth=2, label=label)
+
+for tier in df_tier_pd.columns:
+    ax_right.plot(df_tier_pd.index, df_tier_pd[tier], marker="o", markersize=3, linewidth=2, label=f"Tier {tier}")
+
+ax_left.set_title("Portfolio Rates as Known at Each Month-End", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_title("12M PD by Risk Tier as Known at Each Month-End", fontsize=15, fontweight="bold", pad=14)
+
+for ax in (ax_left, ax_right):
+    ax.set_xlabel("As-of Date", fontsize=12, fontweight="bold", labelpad=12)
+    ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    ax.tick_params(axis="x", labelsize=10, rotation=45)
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="upper right", frameon=False, fontsize=10)
+
+ax_left.set_ylabel("Rate", fontsize=12, fontweight="bold", labelpad=12)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_7_point_in_time_backtest"), dpi=200)
+plt.show()
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import asof, paths, survival, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Load data (event index shared with 03_7)
+# -----------------------------------------------------------
+
+ix          = asof.EventIndex()
+df_churn    = tables.load_generated("02_2_borrower_inactivity_and_churn_risk")
+df_pd       = tables.load_generated("03_1_probability_of_default")
+
+
+# -----------------------------------------------------------
+# Survival tables: time to second loan, time to default, by tier and channel
+# -----------------------------------------------------------
+
+time_start              = time.perf_counter()
+df_curves, df_horizons  = survival.survival_tables(ix)
+print(f"Life tables in {time.perf_counter() - time_start:.3f}s")
+
+tables.save_generated(df_curves, "03_8_survival_curves")
+tables.save_generated(df_horizons, "03_8_survival_horizons")
+print(df_horizons)
+
+
+# -----------------------------------------------------------
+# Reconciliation: on the fully observed subsets there is no censoring inside
+# the window, so Kaplan-Meier must give back the SQL shares exactly
+# -----------------------------------------------------------
+
+# 02_2: inactive_flag = no second loan within 180 days, customers with a full window only
+df_second       = survival.time_to_second_loan(ix)
+list_observed   = df_churn.loc[df_churn["inactive_flag"].notna(), "customer_id"]
+km_inactive     = survival.survival_at(df_second.loc[df_second["customer_id"].isin(list_observed)], asof.INACTIVITY_DAYS)
+
+# 03_1: is_default_12m on PD-eligible loans; repaid loans stay in the denominator there
+df_default      = survival.time_to_default(ix, censor_repaid=False)
+list_eligible   = df_pd.loc[df_pd["is_pd_eligible"] == 1, "loan_id"]
+km_pd           = 1 - survival.survival_at(df_default.loc[df_default["loan_id"].isin(list_eligible)], 365)
+
+df_recon = pd.DataFrame([
+                            {"check": "02_2 inactive share", "kaplan_meier": km_inactive,
+                             "sql": df_churn["inactive_flag"].mean()},
+                            {"check": "03_1 12M PD", "kaplan_meier": km_pd,
+                             "sql": df_pd.loc[df_pd["is_pd_eligible"] == 1, "is_default_12m"].mean()},
+                        ])
+df_recon["abs_diff"] = (df_recon["kaplan_meier"] - df_recon["sql"]).abs()
+print(df_recon)
+
+# With every customer / loan kept and censored properly
+print(f"Return within 180 days, all borrowers (KM)  : {1 - survival.survival_at(df_second, asof.INACTIVITY_DAYS):.2%}")
+print(f"Default within 12 months, all loans (KM)    : {1 - survival.survival_at(survival.time_to_default(ix), 365):.2%}")
+
+
+# -----------------------------------------------------------
+# Chart: Kaplan-Meier by tier, Nelson-Aalen hazard by channel
+# -----------------------------------------------------------
+
+fig, axes = plt.subplots(2, 2, figsize=(18, 11))
+
+list_panels = [
+    (axes[0, 0], "second_loan", "risk_tier_at_signup", "survival", "Share Without a Second Loan by Risk Tier"),
+    (axes[0, 1], "default", "risk_tier_at_signup", "survival", "Share Not Yet Defaulted by Risk Tier"),
+    (axes[1, 0], "second_loan", "acquisition_channel", "cum_hazard", "Cumulative Repeat-Borrowing Hazard by Channel"),
+    (axes[1, 1], "default", "acquisition_channel", "cum_hazard", "Cumulative Default Hazard by Channel"),
+]
+
+for ax, outcome, segment_type, metric, title in list_panels:
+    df_panel = df_curves.loc[(df_curves["outcome"] == outcome) & (df_curves["segment_type"] == segment_type)]
+
+    for segment, df_seg in df_panel.groupby("segment"):
+        # Step functions start at day 0 (S = 1, H = 0)
+        arr_t   = np.concatenate([[0], df_seg["time_days"].to_numpy()])
+        arr_y   = np.concatenate([[1.0 if metric == "survival" else 0.0], df_seg[metric].to_numpy()])
+        label   = f"Tier {segment}" if segment_type == "risk_tier_at_signup" else segment
+        line,   = ax.step(arr_t, arr_y, where="post", linewidth=2, label=label)
+
+        if metric == "survival":
+            ax.fill_between(df_seg["time_days"], df_seg["survival_lower"], df_seg["survival_upper"],
+                            step="post", color=line.get_color(), alpha=0.15)
+
+    ax.set_title(title, fontsize=15, fontweight="bold", pad=14)
+    ax.set_xlabel("Days Since " + ("First Loan" if outcome == "second_loan" else "Origination"),
+                  fontsize=12, fontweight="bold", labelpad=12)
+    ax.set_ylabel("Survival" if metric == "survival" else "Cumulative Hazard", fontsize=12, fontweight="bold", labelpad=12)
+    if metric == "survival":
+        ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0, decimals=0))
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="best", frameon=False, fontsize=10)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_8_survival_analysis"), dpi=200)
+plt.show()
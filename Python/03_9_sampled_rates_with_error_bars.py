@@ -0,0 +1,93 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import asof, paths, sampling, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Sampled rates: 10% of customers, stratified by first-loan vintage x tier
+# -----------------------------------------------------------
+
+# Both sides are timed the same way: from the files on disk (the saved sample, or
+# the raw CSVs) through a freshly built event index to the rates
+time_start  = time.perf_counter()
+df_sample   = sampling.sampled_rates()
+time_sample = time.perf_counter() - time_start
+print(f"Sample of {df_sample.attrs['n_customers']:,} customers / {df_sample.attrs['n_loans']:,} loans "
+      f"in {time_sample:.3f}s")
+
+
+# -----------------------------------------------------------
+# Full book at the same as_of, for comparison
+# -----------------------------------------------------------
+
+time_start  = time.perf_counter()
+raw_full    = tables.load_raw_tables(sampling.SAMPLED_TABLES)
+df_full     = asof.sweep([asof.DATA_END], asof.EventIndex(raw_full))
+time_full   = time.perf_counter() - time_start
+print(f"Full book in {time_full:.3f}s, {time_full / time_sample:.1f}x the sample")
+
+df_rates = df_sample.merge(
+                df_full[["metric", "risk_tier_at_signup", "value"]].rename(columns={"value": "full_book"}),
+                on=["metric", "risk_tier_at_signup"], how="left",
+            )
+# Only cells with a published interval (reliable ones) are scored
+df_rates["covered"] = ((df_rates["full_book"] >= df_rates["ci_low"]) & (df_rates["full_book"] <= df_rates["ci_high"])
+                      ).where(df_rates["reliable"])
+
+list_cols   = ["metric", "risk_tier_at_signup", "n_sampled", "n_events", "estimate", "std_error",
+               "ci_low", "ci_high", "reliable", "full_book", "covered"]
+tables.save_generated(df_rates[list_cols], "03_9_sampled_rates")
+print(df_rates[list_cols])
+print(f"Full-book value inside the {sampling.CI_LEVEL:.0%} interval: "
+      f"{int(df_rates['covered'].sum())} of {int(df_rates['reliable'].sum())} reliable cells")
+
+
+# -----------------------------------------------------------
+# Chart: sampled estimate with interval by tier, full-book value as a dot
+# -----------------------------------------------------------
+
+list_metrics = [
+    ("pd_12m", "12M Probability of Default"),
+    ("lgd", "Loss Given Default"),
+    ("cdr_12m", "12M Cumulative Default Rate"),
+    ("clr_12m", "12M Cumulative Loss Rate"),
+]
+
+fig, axes = plt.subplots(2, 2, figsize=(18, 11))
+
+for ax, (metric, title) in zip(axes.flat, list_metrics):
+    df_m    = df_rates.loc[df_rates["metric"] == metric]
+    arr_x   = np.arange(len(df_m))
+
+    # Error bars only where an interval is published; cells with too few customers or
+    # events have none and are drawn hollow
+    mask_weak   = ~df_m["reliable"].to_numpy()
+    df_ok       = df_m.loc[~mask_weak]
+    arr_err     = np.vstack([df_ok["estimate"] - df_ok["ci_low"], df_ok["ci_high"] - df_ok["estimate"]])
+
+    ax.errorbar(arr_x[~mask_weak], df_ok["estimate"], yerr=arr_err, fmt="o", markersize=8, capsize=8, linewidth=2,
+                color="#1f77b4", label=f"{sampling.SAMPLE_FRACTION:.0%} sample, {sampling.CI_LEVEL:.0%} CI")
+    ax.scatter(arr_x, df_m["full_book"], marker="D", s=60, color="#d62728", zorder=3, label="Full book")
+    ax.scatter(arr_x[mask_weak], df_m["estimate"].to_numpy()[mask_weak], s=140, facecolors="white",
+               edgecolors="#1f77b4", linewidths=2, zorder=4, label="Low sample / events (no interval)")
+
+    ax.set_xticks(arr_x)
+    ax.set_xticklabels([f"Tier {t}" if t != "All" else "All" for t in df_m["risk_tier_at_signup"]])
+    ax.set_title(title, fontsize=15, fontweight="bold", pad=14)
+    ax.set_ylabel("Rate", fontsize=12, fontweight="bold", labelpad=12)
+    ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0, decimals=1))
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="best", frameon=False, fontsize=10)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("03_9_sampled_rates_with_error_bars"), dpi=200)
+plt.show()
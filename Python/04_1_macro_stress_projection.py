@@ -0,0 +1,100 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import paths, stress, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Run the projection (all scenarios, full open book)
+# -----------------------------------------------------------
+
+time_start              = time.perf_counter()
+
+df_projection           = stress.project(horizon_months=24)
+df_summary              = stress.portfolio_summary(df_projection)
+
+print(f"Projection built in {time.perf_counter() - time_start:.2f}s")
+
+tables.save_generated(df_projection, "04_1_macro_stress_projection")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+# Totals over the whole horizon per scenario
+df_totals               = (df_summary
+                            .groupby("scenario_name", as_index=False)
+                            .agg(
+                                    expected_revenue    = ("expected_revenue", "sum"),
+                                    expected_loss       = ("expected_loss", "sum"),
+                                    expected_defaults   = ("expected_defaults", "sum"),
+                                )
+                          )
+
+df_totals["revenue_after_loss"]     = df_totals["expected_revenue"] - df_totals["expected_loss"]
+df_totals["loss_to_revenue_pct"]    = np.where(
+                                            df_totals["expected_revenue"] > 0,
+                                            df_totals["expected_loss"] / df_totals["expected_revenue"] * 100,
+                                            np.nan
+                                        )
+
+print(df_totals)
+print()
+print(df_summary.head(100))
+
+
+# -----------------------------------------------------------
+# Chart: cumulative revenue vs cumulative stressed loss per scenario
+# -----------------------------------------------------------
+
+os.makedirs(paths.charts_dir, exist_ok=True)
+
+fig, ax = plt.subplots(figsize=(14, 7))
+
+for scenario_name, df_scn in df_summary.groupby("scenario_name", sort=False):
+    line = ax.plot(
+        df_scn["year_month"],
+        df_scn["expected_loss"].cumsum(),
+        linewidth=2,
+        label=f"Cumulative Loss — {scenario_name}"
+    )
+
+    ax.plot(
+        df_scn["year_month"],
+        df_scn["expected_revenue"].cumsum(),
+        linewidth=2,
+        linestyle="--",
+        color=line[0].get_color(),
+        label=f"Cumulative Revenue — {scenario_name}"
+    )
+
+ax.set_title(
+    "CICA Prime — Stressed Revenue vs Credit Loss\n"
+    "Open Book Projection by Macro Scenario",
+    fontsize=20,
+    fontweight="bold"
+)
+
+ax.set_xlabel("Projection Month", fontsize=14, fontweight="bold")
+ax.set_ylabel("Cumulative Amount", fontsize=14, fontweight="bold")
+
+ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+ax.tick_params(axis="both", labelsize=12)
+plt.xticks(rotation=45, ha="right")
+
+ax.grid(axis="y", linestyle="--", alpha=0.35)
+ax.legend(loc="upper left", frameon=False, fontsize=11)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("04_1_macro_stress_projection"), dpi=200)
+plt.show()
@@ -0,0 +1,74 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import montecarlo, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+
+# -----------------------------------------------------------
+# Simulate (guard needed: the process pool re-imports this file)
+# -----------------------------------------------------------
+
+if __name__ == "__main__":
+
+    time_start              = time.perf_counter()
+
+    df_var_es, dict_paths   = montecarlo.run_all_scenarios(horizon_months=12, n_paths=100_000)
+
+    print(f"Simulation finished in {time.perf_counter() - time_start:.2f}s")
+    print(df_var_es)
+
+    tables.save_generated(df_var_es, "04_2_monte_carlo_loss_distribution")
+
+    # -----------------------------------------------------------
+    # Chart: loss distribution per scenario with 99% VaR / ES
+    # -----------------------------------------------------------
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+
+    for scenario_name, df_paths in dict_paths.items():
+        hist = ax.hist(
+            df_paths["loss"],
+            bins=120,
+            density=True,
+            histtype="step",
+            linewidth=2,
+            label=f"{scenario_name}"
+        )
+
+        df_scn      = df_var_es.loc[
+                        (df_var_es["scenario_name"] == scenario_name)
+                        & np.isclose(df_var_es["confidence_level"], 0.99)
+                      ]
+        line_color  = hist[2][0].get_edgecolor()
+
+        ax.axvline(df_scn["var"].iloc[0], color=line_color, linestyle="--", linewidth=1.2)
+        ax.axvline(df_scn["expected_shortfall"].iloc[0], color=line_color, linestyle=":", linewidth=1.2)
+
+    ax.set_title(
+        "CICA Prime — 12M Portfolio Loss Distribution (One-Factor Gaussian Copula)\n"
+        "Dashed = 99% VaR • Dotted = 99% Expected Shortfall",
+        fontsize=18,
+        fontweight="bold"
+    )
+
+    ax.set_xlabel("Portfolio Credit Loss", fontsize=14, fontweight="bold")
+    ax.set_ylabel("Density", fontsize=14, fontweight="bold")
+
+    ax.xaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+    ax.tick_params(axis="both", labelsize=12)
+
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="upper right", frameon=False, fontsize=12)
+
+    plt.tight_layout()
+    plt.savefig(paths.chart_path("04_2_monte_carlo_loss_distribution"), dpi=200)
+    plt.show()
@@ -0,0 +1,89 @@
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import ecl, paths, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Stage + ECL for every loan-month in the history (one batch)
+# -----------------------------------------------------------
+
+time_start                  = time.perf_counter()
+
+df_ecl, srs_stage_2_mult    = ecl.loan_month_ecl()
+df_balance                  = ecl.monthly_ecl_balance(df_ecl)
+df_migration                = ecl.stage_migration(df_ecl)
+
+print(f"ECL built for {len(df_ecl)} loan-months in {time.perf_counter() - time_start:.2f}s")
+print(f"Stage 2 PD multiplier (empirical, latest month-end) : {srs_stage_2_mult.iloc[-1]:.2f}")
+
+tables.save_generated(df_balance, "04_3a_ecl_monthly_balance")
+tables.save_generated(df_migration, "04_3b_ecl_stage_migration")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+df_pivot_ecl                = df_balance.pivot(index="year_month", columns="stage", values="ecl").fillna(0)
+df_pivot_ecl.columns        = [f"Stage {c}" for c in df_pivot_ecl.columns]
+
+df_total                    = df_balance.groupby("year_month")[["principal_outstanding", "ecl"]].sum()
+df_total["coverage_ratio"]  = df_total["ecl"] / df_total["principal_outstanding"]
+
+print(df_pivot_ecl.join(df_total))
+
+
+# -----------------------------------------------------------
+# Chart: ECL balance by stage (stacked) + coverage ratio
+# -----------------------------------------------------------
+
+fig, ax1 = plt.subplots(figsize=(16, 7))
+
+ax1.stackplot(
+    df_pivot_ecl.index,
+    [df_pivot_ecl[c] for c in df_pivot_ecl.columns],
+    labels=list(df_pivot_ecl.columns),
+    alpha=0.8
+)
+
+ax1.set_xlabel("Month-End", fontsize=14, fontweight="bold")
+ax1.set_ylabel("ECL Balance", fontsize=14, fontweight="bold")
+ax1.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+
+ax2 = ax1.twinx()
+
+ax2.plot(
+    df_total.index,
+    df_total["coverage_ratio"],
+    color="black",
+    linewidth=2.5,
+    marker="o",
+    label="Coverage Ratio (ECL / Principal Outstanding)"
+)
+
+ax2.set_ylabel("Coverage Ratio", fontsize=14, fontweight="bold")
+ax2.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=1.0))
+
+ax1.set_title(
+    "CICA Prime — Expected Credit Loss by IFRS 9 Stage",
+    fontsize=20,
+    fontweight="bold"
+)
+
+handles1, labels1 = ax1.get_legend_handles_labels()
+handles2, labels2 = ax2.get_legend_handles_labels()
+ax1.legend(handles1 + handles2, labels1 + labels2, loc="upper left", frameon=False, fontsize=11)
+
+ax1.grid(axis="y", linestyle="--", alpha=0.35)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("04_3_expected_credit_loss"), dpi=200)
+plt.show()
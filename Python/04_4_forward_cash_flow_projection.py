@@ -0,0 +1,110 @@
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import cashflow, paths, stress, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Load data
+# -----------------------------------------------------------
+
+raw             = {name: tables.load_raw(name) for name in ["loans", "customers", "payments", "payment_schedule"]}
+df_delinquency  = tables.load_generated("01_4c_delinquency_at_month_end", date_cols=["year_month", "month_end"])
+df_steps        = cashflow.monthly_steps(df_delinquency, raw["loans"])
+
+
+# -----------------------------------------------------------
+# Backtest: project from 2024-12-31 with parameters fitted on data up to then,
+# and compare with the cash the same loans actually paid in 2025
+# -----------------------------------------------------------
+
+backtest_as_of  = pd.Timestamp("2024-12-31")
+
+df_bt, df_bt_loans, arr_bt_grid = cashflow.project(backtest_as_of, raw=raw, df_delinquency=df_delinquency,
+                                                   params=cashflow.fit(df_steps, backtest_as_of))
+arr_actual      = cashflow.actual_collections(df_delinquency, df_bt_loans["loan_id"].to_numpy(), backtest_as_of,
+                                              cashflow.HORIZON_MONTHS)
+
+df_backtest     = pd.DataFrame({
+                                "year_month"            : stress.projection_months(backtest_as_of, cashflow.HORIZON_MONTHS),
+                                "scheduled_due"         : df_bt.groupby("months_ahead")["scheduled_due"].sum().to_numpy(),
+                                "expected_collections"  : arr_bt_grid.sum(axis=0),
+                                "actual_collections"    : arr_actual.sum(axis=0),
+                              })
+df_backtest["error_pct"] = df_backtest["expected_collections"] / df_backtest["actual_collections"] - 1
+
+print(df_backtest)
+print(f"12M total, projected vs actual: {arr_bt_grid.sum() / arr_actual.sum() - 1:+.2%}")
+
+
+# -----------------------------------------------------------
+# Projection from the data end
+# -----------------------------------------------------------
+
+as_of           = stress.default_as_of()
+arr_transition, arr_rate = cashflow.fit(df_steps, as_of)
+
+print(pd.DataFrame(arr_transition, index=cashflow.STATES, columns=cashflow.STATES).round(3))
+print(pd.Series(arr_rate, index=cashflow.STATES, name="collection_rate").round(3))
+
+time_start                          = time.perf_counter()
+df_projection, df_loans, arr_grid   = cashflow.project(as_of, raw=raw, df_delinquency=df_delinquency,
+                                                       params=(arr_transition, arr_rate))
+print(f"{len(df_loans)} open loans x {cashflow.HORIZON_MONTHS} months projected in {time.perf_counter() - time_start:.3f}s")
+
+tables.save_generated(df_projection, "04_4_forward_cash_flow_projection")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+df_monthly      = df_projection.groupby("year_month")[["scheduled_due", "expected_collections",
+                                                       "expected_arrears_end", "expected_defaulted_loans"]].sum()
+df_monthly["collection_ratio"] = df_monthly["expected_collections"] / df_monthly["scheduled_due"]
+print(df_monthly)
+
+df_pivot_tier   = df_projection.pivot_table(index="year_month", columns="risk_tier_at_signup",
+                                            values="expected_collections", aggfunc="sum").fillna(0)
+df_pivot_tier.columns = [f"Tier {c}" for c in df_pivot_tier.columns]
+print(df_projection.groupby("acquisition_channel")[["scheduled_due", "expected_collections"]].sum())
+
+
+# -----------------------------------------------------------
+# Chart: expected inflows by tier, and the 2025 backtest
+# -----------------------------------------------------------
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 7))
+
+ax_left.stackplot(df_pivot_tier.index, [df_pivot_tier[c] for c in df_pivot_tier.columns],
+                  labels=list(df_pivot_tier.columns), alpha=0.8)
+ax_left.plot(df_monthly.index, df_monthly["scheduled_due"], color="black", linewidth=2, linestyle="--",
+             marker="o", label="Scheduled Due")
+
+ax_right.plot(df_backtest["year_month"], df_backtest["actual_collections"], color="black", linewidth=2.5,
+              marker="o", label="Actual Collections")
+ax_right.plot(df_backtest["year_month"], df_backtest["expected_collections"], color="tab:blue", linewidth=2.5,
+              marker="o", label="Projected (as of 2024-12-31)")
+ax_right.plot(df_backtest["year_month"], df_backtest["scheduled_due"], color="grey", linewidth=1.5,
+              linestyle="--", label="Scheduled Due")
+
+ax_left.set_title(f"Expected Cash Inflows by Risk Tier (as of {as_of:%Y-%m-%d})", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_title("Backtest: Projected vs Actual Collections, 2025", fontsize=15, fontweight="bold", pad=14)
+
+for ax in [ax_left, ax_right]:
+    ax.set_xlabel("Month", fontsize=12, fontweight="bold", labelpad=12)
+    ax.set_ylabel("Cash Collected", fontsize=12, fontweight="bold", labelpad=12)
+    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+    ax.legend(loc="upper right", frameon=False, fontsize=10)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("04_4_forward_cash_flow_projection"), dpi=200)
+plt.show()
@@ -0,0 +1,144 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from cica import amortization, paths, plotting, tables
+
+
+# Pandas display settings
+pd.set_option("display.max_columns", 200)
+pd.set_option("display.max_rows", 100)
+pd.set_option("display.width", 2000)
+
+# -----------------------------------------------------------
+# Load data
+# -----------------------------------------------------------
+
+df_loans        = tables.load_raw("loans").sort_values("loan_id").reset_index(drop=True)
+df_customers    = tables.load_raw("customers")
+df_schedule     = tables.load_raw("payment_schedule")
+
+df_loans["risk_tier_at_signup"] = (df_customers.set_index("customer_id")["risk_tier_at_signup"]
+                                    .reindex(df_loans["customer_id"].to_numpy()).to_numpy())
+
+
+# -----------------------------------------------------------
+# Reproduce payment_schedule from the loan terms
+# -----------------------------------------------------------
+
+arr_cents       = amortization.cents_rounded(df_schedule).reindex(df_loans["loan_id"].to_numpy()).fillna(True).to_numpy()
+
+time_start      = time.perf_counter()
+df_generated    = amortization.to_frame(df_loans, amortization.generate(df_loans, cents=arr_cents))
+print(f"{len(df_generated)} installments generated in {time.perf_counter() - time_start:.3f}s "
+      f"({arr_cents.sum()} cent-rounded loans, {(~arr_cents).sum()} unrounded)")
+
+df_compare      = df_schedule.merge(df_generated, on=["loan_id", "installment_no"], how="outer",
+                                    suffixes=("", "_generated"), indicator=True)
+print(f"Rows only on one side : {(df_compare['_merge'] != 'both').sum()}")
+print(f"due_date mismatches   : {(df_compare['due_date'] != df_compare['due_date_generated']).sum()}")
+for col in ["due_principal", "due_fee_interest", "due_total", "scheduled_balance_after"]:
+    print(f"{col:<24}: max abs diff {(df_compare[col] - df_compare[col + '_generated']).abs().max():.2e}")
+
+
+# -----------------------------------------------------------
+# What-if repricing of the whole book (closed form, one value per loan)
+# -----------------------------------------------------------
+
+dict_scenarios = {
+    "Current terms"         : {},
+    "APR +100bp"            : {"apr_shift": 0.01},
+    "APR +200bp"            : {"apr_shift": 0.02},
+    "APR -200bp"            : {"apr_shift": -0.02},
+    "4M terms -> 6M"        : {"term_months": np.where(df_loans["term_months"] == 4, 6, df_loans["term_months"])},
+    "Fee rate +50bp"        : {"fee_rate_shift": 0.005},
+}
+
+list_results = []
+for scenario_name, dict_kwargs in dict_scenarios.items():
+    df_what_if = amortization.reprice_summary(df_loans, **dict_kwargs)
+    df_what_if["risk_tier_at_signup"]   = df_loans["risk_tier_at_signup"].to_numpy()
+    df_what_if["principal"]             = df_loans["principal"].to_numpy()
+
+    df_tier = (df_what_if
+                .groupby("risk_tier_at_signup")
+                .agg(
+                    n_loans                 = ("loan_id", "size"),
+                    principal               = ("principal", "sum"),
+                    avg_installment         = ("installment", "mean"),
+                    total_fee_interest      = ("total_fee_interest", "sum"),
+                    origination_fee_amount  = ("origination_fee_amount", "sum"),
+                )
+                .reset_index()
+              )
+    df_tier.insert(0, "scenario_name", scenario_name)
+    list_results.append(df_tier)
+
+df_what_if_tier = pd.concat(list_results, ignore_index=True)
+df_what_if_tier["total_revenue"]        = df_what_if_tier["total_fee_interest"] + df_what_if_tier["origination_fee_amount"]
+df_what_if_tier["revenue_to_principal"] = df_what_if_tier["total_revenue"] / df_what_if_tier["principal"]
+
+tables.save_generated(df_what_if_tier, "04_5_amortization_what_if")
+
+# Same repricing on a book 400x the size
+df_big          = pd.concat([df_loans[["loan_id", "principal", "term_months", "apr", "origination_fee_rate"]]] * 400,
+                            ignore_index=True)
+time_start      = time.perf_counter()
+amortization.reprice_summary(df_big, apr_shift=0.02)
+print(f"APR +200bp over {len(df_big):,} loans in {time.perf_counter() - time_start:.3f}s")
+
+
+# -----------------------------------------------------------
+# Business Answer Starts here
+# -----------------------------------------------------------
+
+df_scenarios    = (df_what_if_tier
+                    .groupby("scenario_name", sort=False)[["principal", "total_fee_interest", "origination_fee_amount", "total_revenue"]]
+                    .sum()
+                  )
+df_scenarios["revenue_to_principal"]    = df_scenarios["total_revenue"] / df_scenarios["principal"]
+df_scenarios["change_vs_current"]       = df_scenarios["total_revenue"] / df_scenarios.loc["Current terms", "total_revenue"] - 1
+print(df_scenarios)
+
+df_pivot_tier   = df_what_if_tier.pivot(index="risk_tier_at_signup", columns="scenario_name", values="avg_installment")
+df_pivot_tier   = df_pivot_tier[list(dict_scenarios)]
+print(df_pivot_tier)
+
+
+# -----------------------------------------------------------
+# Chart: scheduled revenue by scenario, and average installment by tier
+# -----------------------------------------------------------
+
+fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 7))
+
+bars = ax_left.bar(df_scenarios.index, df_scenarios["total_revenue"], color="tab:blue", alpha=0.85)
+plotting.bar_value_labels(ax_left, bars, fmt="{:,.0f}", fontsize=10)
+
+arr_x           = np.arange(len(df_pivot_tier))
+bar_width       = 0.8 / len(df_pivot_tier.columns)
+for i, scenario_name in enumerate(df_pivot_tier.columns):
+    ax_right.bar(arr_x + (i - (len(df_pivot_tier.columns) - 1) / 2) * bar_width, df_pivot_tier[scenario_name],
+                 width=bar_width, label=scenario_name)
+ax_right.set_xticks(arr_x)
+ax_right.set_xticklabels([f"Tier {t}" for t in df_pivot_tier.index])
+
+ax_left.set_title("Scheduled Fee, Interest & Origination Revenue by Scenario", fontsize=15, fontweight="bold", pad=14)
+ax_left.set_xlabel("Scenario", fontsize=12, fontweight="bold", labelpad=12)
+ax_left.set_ylabel("Revenue over the Loan Terms", fontsize=12, fontweight="bold", labelpad=12)
+ax_left.tick_params(axis="x", labelrotation=20)
+ax_left.set_ylim(0, df_scenarios["total_revenue"].max() * 1.12)
+
+ax_right.set_title("Average Monthly Installment by Risk Tier", fontsize=15, fontweight="bold", pad=14)
+ax_right.set_xlabel("Risk Tier", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.set_ylabel("Installment", fontsize=12, fontweight="bold", labelpad=12)
+ax_right.legend(loc="upper right", frameon=False, fontsize=10)
+
+for ax in [ax_left, ax_right]:
+    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("{x:,.0f}"))
+    ax.grid(axis="y", linestyle="--", alpha=0.35)
+
+plt.tight_layout()
+plt.savefig(paths.chart_path("04_5_amortization_what_if"), dpi=200)
+plt.show()
@@ -0,0 +1,8 @@
+# -----------------------------------------------------------
+# cica — shared engines behind the numbered analysis scripts
+# -----------------------------------------------------------
+#
+# The numbered scripts in /Python stay the "report" layer (load, print, chart).
+# Anything heavier than a groupby lives here so several scripts can reuse it.
+#
+# Scripts run from /Python, so "from cica.stress import ..." just works.
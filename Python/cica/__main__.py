@@ -0,0 +1,3 @@
+from cica.cli import main
+
+main()
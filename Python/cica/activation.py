@@ -0,0 +1,207 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cica import compact, index, paths, tables
+from cica.sketch import KLLSketch, KLL_K
+
+# -----------------------------------------------------------
+# Activation timing sketches: one KLL sketch per (signup month, channel)
+# -----------------------------------------------------------
+#
+# Activation days follow SQL/02_1: days from signup_date to the customer's first
+# loan originated on or after signup. Each activated customer lands in exactly one
+# cell, keyed by signup month and acquisition_channel, so a query over any set of
+# months and channels is a merge of the matching cells; no rescan of loans or
+# customers is needed.
+#
+# update() takes new first-loan events and skips customers already counted (their
+# ids are kept in a sorted array). Events are expected roughly in time order: a
+# loan that turns out to predate a customer's counted activation is not revisited.
+# The store is saved next to the generated outputs with the size/mtime signature
+# of loans.csv it last saw. load_sketches() tops it up with any customers that
+# activated since, but only re-reads loans and customers when that signature has
+# moved; build() starts over from the raw tables.
+#
+# Cells smaller than the sketch capacity (k = 200) still hold every value, so their
+# p50 is exactly the SQL PERCENTILE_CONT(0.5) median.
+
+SKETCH_PATH     = os.path.join(paths.data_dir, ".activation_sketches.npz")
+QUANTILES       = [0.10, 0.50, 0.90, 0.99]
+SOURCE_TABLE    = "loans"
+
+
+def quantile_label(q):
+    return f"p{int(round(q * 100))}_activation_days"
+
+
+def first_loans(df_loans, df_customers, ex=None):
+    # One row per customer: signup month, channel and activation days of the first loan.
+    # Borrower columns come through the entity index, so ex must be built over df_customers
+    # (default: the saved index over the raw tables).
+    ex              = ex or index.load_index()
+    arr_cust_row    = ex.customer_rows(df_loans["customer_id"].to_numpy())
+
+    df = pd.DataFrame({
+                        "customer_id"           : df_loans["customer_id"].to_numpy(),
+                        "origination_date"      : df_loans["origination_date"].to_numpy(),
+                        "signup_date"           : df_customers["signup_date"].to_numpy()[arr_cust_row],
+                        "acquisition_channel"   : df_customers["acquisition_channel"].to_numpy()[arr_cust_row],
+                      })
+    df = df.loc[df["origination_date"] >= df["signup_date"]]
+    df = (df
+            .groupby(["customer_id", "signup_date", "acquisition_channel"], as_index=False)["origination_date"]
+            .min()
+         )
+    df["activation_days"] = compact.to_days(df["origination_date"]) - compact.to_days(df["signup_date"])
+    return df
+
+
+class ActivationSketches:
+
+    def __init__(self, k=KLL_K, signature=""):
+        self.k          = k
+        self.signature  = signature
+        self.cells      = {}
+        self.activated  = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.activated)
+
+    def update(self, customer_ids, signup_dates, channels, activation_days):
+        # Adds first-loan events; returns how many customers were new
+        arr_customer    = np.asarray(customer_ids, dtype=np.int64)
+        _, arr_first    = np.unique(arr_customer, return_index=True)
+        mask_new        = np.zeros(len(arr_customer), dtype=bool)
+        mask_new[arr_first] = True
+        mask_new        &= ~np.isin(arr_customer, self.activated, assume_unique=False)
+        if not mask_new.any():
+            return 0
+
+        df_new = pd.DataFrame({
+                                "signup_month"      : pd.to_datetime(np.asarray(signup_dates)[mask_new]).to_period("M").to_timestamp(),
+                                "channel"           : np.asarray(channels)[mask_new],
+                                "activation_days"   : np.asarray(activation_days, dtype=np.float64)[mask_new],
+                              })
+
+        for (month, channel), srs_days in df_new.groupby(["signup_month", "channel"])["activation_days"]:
+            self.cells.setdefault((month, channel), KLLSketch(self.k)).update(srs_days.to_numpy())
+
+        self.activated = np.union1d(self.activated, arr_customer[mask_new])
+        return int(mask_new.sum())
+
+    def update_from_loans(self, df_loans, df_customers, ex=None):
+        # New loan rows (plus the customers they belong to) -> first-loan events
+        df = first_loans(df_loans, df_customers, ex)
+        return self.update(df["customer_id"], df["signup_date"], df["acquisition_channel"], df["activation_days"])
+
+    # --- queries -------------------------------------------------------------
+
+    def months(self):
+        return sorted({month for month, _ in self.cells})
+
+    def channels(self):
+        return sorted({channel for _, channel in self.cells})
+
+    def merged(self, months=None, channels=None):
+        # One sketch over every cell whose month and channel are selected
+        set_months      = None if months is None else {pd.Timestamp(m) for m in np.atleast_1d(months)}
+        set_channels    = None if channels is None else set(np.atleast_1d(channels))
+        sketch          = KLLSketch(self.k)
+
+        for (month, channel), cell in self.cells.items():
+            if (set_months is None or month in set_months) and (set_channels is None or channel in set_channels):
+                sketch.merge(cell)
+        return sketch
+
+    def quantiles(self, months=None, channels=None, quantiles=QUANTILES):
+        sketch      = self.merged(months, channels)
+        dict_out    = dict(zip([quantile_label(q) for q in quantiles], sketch.quantile(quantiles)))
+        return pd.Series({**dict_out, "n_customers": len(sketch)})
+
+    def table(self, by=("signup_month", "acquisition_channel"), quantiles=QUANTILES):
+        # One row per group in `by`; "signup_month" and/or "acquisition_channel"
+        list_by     = [by] if isinstance(by, str) else list(by)
+        dict_groups = {}
+        for month, channel in self.cells:
+            key = tuple({"signup_month": month, "acquisition_channel": channel}[col] for col in list_by)
+            dict_groups.setdefault(key, ([], []))
+            dict_groups[key][0].append(month)
+            dict_groups[key][1].append(channel)
+
+        list_rows = []
+        for key in sorted(dict_groups):
+            list_months, list_channels = dict_groups[key]
+            srs = self.quantiles(list_months if "signup_month" in list_by else None,
+                                 list_channels if "acquisition_channel" in list_by else None, quantiles)
+            list_rows.append({**dict(zip(list_by, key)), **srs.to_dict()})
+
+        df = pd.DataFrame(list_rows)
+        df["n_customers"] = df["n_customers"].astype(int)
+        return df
+
+    # --- persistence ---------------------------------------------------------
+
+    def save(self, path=SKETCH_PATH):
+        list_keys   = list(self.cells)
+        list_parts  = [self.cells[key].to_arrays() for key in list_keys]
+        np.savez(
+                    path,
+                    k               = np.array(self.k),
+                    signature       = np.array(self.signature),
+                    activated       = self.activated,
+                    cell_month      = np.array([month for month, _ in list_keys], dtype="datetime64[D]"),
+                    cell_channel    = np.array([channel for _, channel in list_keys], dtype=str),
+                    item_count      = np.array([len(p[0]) for p in list_parts]),
+                    level_count     = np.array([len(p[1]) for p in list_parts]),
+                    items           = np.concatenate([p[0] for p in list_parts]) if list_parts else np.empty(0),
+                    level_sizes     = np.concatenate([p[1] for p in list_parts]) if list_parts else np.empty(0, dtype=int),
+                    counts          = np.stack([p[2] for p in list_parts]) if list_parts else np.empty((0, 3), dtype=np.uint64),
+                    ranges          = np.stack([p[3] for p in list_parts]) if list_parts else np.empty((0, 2)),
+                )
+
+    @classmethod
+    def load(cls, path=SKETCH_PATH):
+        with np.load(path) as npz:
+            out             = cls(int(npz["k"]), str(npz["signature"]) if "signature" in npz.files else "")
+            out.activated   = npz["activated"]
+            arr_items       = np.split(npz["items"], np.cumsum(npz["item_count"])[:-1])
+            arr_sizes       = np.split(npz["level_sizes"], np.cumsum(npz["level_count"])[:-1])
+
+            for i, (month, channel) in enumerate(zip(npz["cell_month"], npz["cell_channel"])):
+                out.cells[(pd.Timestamp(month), str(channel))] = KLLSketch.from_arrays(
+                                                                        arr_items[i], arr_sizes[i], npz["counts"][i], npz["ranges"][i])
+        return out
+
+
+def source_signature():
+    stat = os.stat(paths.raw_path(SOURCE_TABLE))
+    return f"{SOURCE_TABLE}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def build(df_loans=None, df_customers=None, k=KLL_K):
+    # Frames left as None are read from the raw tables, and the store records their signature
+    store = ActivationSketches(k, source_signature() if df_loans is None else "")
+    store.update_from_loans(tables.load_raw("loans") if df_loans is None else df_loans,
+                            tables.load_raw("customers") if df_customers is None else df_customers)
+    return store
+
+
+def load_sketches(refresh=True):
+    # Saved store, topped up with first loans of customers it has not counted yet
+    if not os.path.exists(SKETCH_PATH):
+        store = build()
+        store.save()
+        return store
+
+    store       = ActivationSketches.load()
+    signature   = source_signature()
+    if refresh and store.signature != signature:
+        df_loans = tables.load_raw("loans")
+        df_loans = df_loans.loc[~np.isin(df_loans["customer_id"].to_numpy(), store.activated)]
+        if len(df_loans):
+            store.update_from_loans(df_loans, tables.load_raw("customers"))
+        store.signature = signature
+        store.save()
+    return store
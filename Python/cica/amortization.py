@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------
+# Installment schedules from loan terms (closed-form annuity)
+# -----------------------------------------------------------
+#
+# payment_schedule is a level-payment annuity at a monthly rate r = apr / 12
+# over term_months installments:
+#
+#   payment         A       = P r / (1 - (1 + r)^-n)            (P / n when r = 0)
+#   balance before  B(k)    = P (1 + r)^(k-1) - A ((1 + r)^(k-1) - 1) / r
+#   fee / interest  B(k) r          principal   A - B(k) r
+#
+# Installment k is due k calendar months after origination_date, on the same
+# day of the month, or on the month's last day when that day does not exist.
+#
+# Every loan is one row of a (loans x max_term) array, with padding cells
+# beyond term_months masked, so a whole book is a few broadcast expressions
+# with no loop over loans or installments.
+#
+# The source system wrote schedules in one of two ways, fixed per loan:
+#
+#   cents       fee and principal rounded to cents independently; balance after
+#               = rounded principal amount less the cumulative rounded
+#               principal; the last installment takes the remaining balance
+#   unrounded   the raw annuity floats
+#
+# cents_rounded(df_schedule) tells the two apart, so generate() can reproduce
+# the existing file to the cent. origination_fee_amount is charged upfront
+# (principal x origination_fee_rate, rounded to cents) and never appears in
+# the installments.
+#
+# For what-if repricing of large books, reprice_summary() skips the grid
+# entirely and works from the closed-form totals, one value per loan. When the
+# installments themselves are needed for millions of loans, iter_chunks() keeps
+# the grid at CHUNK_LOANS rows at a time.
+
+SCHEDULE_COLUMNS = ["loan_id", "installment_no", "due_date", "due_principal", "due_fee_interest",
+                    "due_total", "scheduled_balance_after"]
+CHUNK_LOANS     = 250_000
+
+
+def monthly_rate(apr):
+    return np.asarray(apr, dtype=np.float64) / 12.0
+
+
+def annuity_payment(principal, rate, n_installments):
+    # Level installment; a zero rate falls back to straight-line principal
+    arr_p       = np.asarray(principal, dtype=np.float64)
+    arr_r       = np.asarray(rate, dtype=np.float64)
+    arr_n       = np.asarray(n_installments, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arr_pay = arr_p * arr_r / (1.0 - (1.0 + arr_r) ** -arr_n)
+    return np.where(arr_r > 0, arr_pay, arr_p / arr_n)
+
+
+def due_dates(origination_dates, max_term):
+    # (loans x max_term) datetime64[D]: origination + k months, clamped to month end
+    arr_orig    = np.asarray(pd.to_datetime(origination_dates).to_numpy(), dtype="datetime64[D]")
+    arr_month   = arr_orig.astype("datetime64[M]")
+    arr_day     = (arr_orig - arr_month.astype("datetime64[D]")).astype(np.int64)
+
+    arr_target  = arr_month[:, None] + np.arange(1, max_term + 1)
+    arr_days_in = ((arr_target + 1).astype("datetime64[D]") - arr_target.astype("datetime64[D]")).astype(np.int64)
+    return arr_target.astype("datetime64[D]") + np.minimum(arr_day[:, None], arr_days_in - 1)
+
+
+def generate(df_loans, apr=None, term_months=None, cents=True):
+    # Padded schedules for every loan. apr / term_months override the loan terms
+    # (what-if); cents is a scalar or one flag per loan (see cents_rounded).
+    arr_p       = df_loans["principal"].to_numpy(dtype=np.float64)
+    arr_r       = monthly_rate(df_loans["apr"] if apr is None else apr) * np.ones(len(arr_p))
+    arr_n       = (df_loans["term_months"].to_numpy() if term_months is None else np.asarray(term_months)) * np.ones(len(arr_p), dtype=np.int64)
+    arr_n       = arr_n.astype(np.int64)
+    arr_cents   = np.asarray(cents, dtype=bool) * np.ones(len(arr_p), dtype=bool)
+    max_term    = int(arr_n.max(initial=0))
+
+    arr_k       = np.arange(1, max_term + 1)[None, :]
+    mask        = arr_k <= arr_n[:, None]
+    arr_pay     = annuity_payment(arr_p, arr_r, arr_n)[:, None]
+
+    # Balance before installment k; growth^(k-1) - 1 over r is (k - 1) when r = 0
+    arr_growth  = (1.0 + arr_r[:, None]) ** (arr_k - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arr_factor  = np.where(arr_r[:, None] > 0, (arr_growth - 1.0) / arr_r[:, None], arr_k - 1.0)
+    arr_bal_before  = arr_p[:, None] * arr_growth - arr_pay * arr_factor
+    arr_fee         = arr_bal_before * arr_r[:, None]
+    arr_prin        = arr_pay - arr_fee
+    arr_bal_after   = np.maximum(arr_bal_before - arr_prin, 0.0)
+
+    # Cent-rounded loans: integer cents, running balance off the rounded principal
+    if arr_cents.any():
+        arr_fee_c       = np.round(arr_fee * 100)
+        arr_prin_c      = np.where(mask, np.round(arr_prin * 100), 0.0)
+        arr_prev_c      = np.round(arr_p * 100)[:, None] - (np.cumsum(arr_prin_c, axis=1) - arr_prin_c)
+        arr_prin_c      = np.where(arr_k == arr_n[:, None], arr_prev_c, arr_prin_c)
+
+        rows            = arr_cents[:, None]
+        arr_fee         = np.where(rows, arr_fee_c / 100, arr_fee)
+        arr_prin        = np.where(rows, arr_prin_c / 100, arr_prin)
+        arr_bal_after   = np.where(rows, (arr_prev_c - arr_prin_c) / 100, arr_bal_after)
+
+    arr_fee         = np.where(mask, arr_fee, 0.0)
+    arr_prin        = np.where(mask, arr_prin, 0.0)
+
+    return {
+        "mask"                      : mask,
+        "installment_no"            : np.broadcast_to(arr_k, mask.shape),
+        "due_principal"             : arr_prin,
+        "due_fee_interest"          : arr_fee,
+        "due_total"                 : arr_prin + arr_fee,
+        "scheduled_balance_after"   : np.where(mask, arr_bal_after, 0.0),
+    }
+
+
+def iter_chunks(df_loans, apr=None, term_months=None, cents=True, chunk_loans=CHUNK_LOANS):
+    # (row slice, grid) for consecutive blocks of loans; overrides may be scalars or per loan
+    n_loans = len(df_loans)
+
+    def part(value, rows):
+        return value[rows] if np.ndim(value) else value
+
+    for start in range(0, n_loans, chunk_loans):
+        rows = slice(start, min(start + chunk_loans, n_loans))
+        yield rows, generate(df_loans.iloc[rows],
+                             apr=None if apr is None else part(np.asarray(apr), rows),
+                             term_months=None if term_months is None else part(np.asarray(term_months), rows),
+                             cents=part(np.asarray(cents), rows))
+
+
+def to_frame(df_loans, dict_grid):
+    # Long table in the payment_schedule layout (masked cells dropped)
+    mask            = dict_grid["mask"]
+    arr_dates       = due_dates(df_loans["origination_date"], mask.shape[1])
+
+    df = pd.DataFrame({
+                        "loan_id"           : np.broadcast_to(df_loans["loan_id"].to_numpy()[:, None], mask.shape)[mask],
+                        "installment_no"    : dict_grid["installment_no"][mask],
+                        "due_date"          : arr_dates[mask].astype("datetime64[us]"),
+                      })
+    for col in SCHEDULE_COLUMNS[3:]:
+        df[col] = dict_grid[col][mask]
+    return df
+
+
+def cents_rounded(df_schedule):
+    # Per loan_id: True when every amount of its schedule is a whole number of cents
+    arr_cents       = df_schedule[["due_principal", "due_fee_interest", "scheduled_balance_after"]].to_numpy() * 100
+    arr_whole       = (np.abs(arr_cents - np.round(arr_cents)) < 1e-6).all(axis=1)
+    return pd.Series(arr_whole).groupby(df_schedule["loan_id"].to_numpy()).all()
+
+
+def reprice_summary(df_loans, apr_shift=0.0, term_months=None, fee_rate_shift=0.0):
+    # Closed-form per-loan totals under shifted terms; O(loans), no schedule grid.
+    # apr_shift / fee_rate_shift in absolute rate units (0.02 = +200bp).
+    arr_p           = df_loans["principal"].to_numpy(dtype=np.float64)
+    arr_apr         = np.maximum(df_loans["apr"].to_numpy(dtype=np.float64) + apr_shift, 0.0)
+    arr_n           = (df_loans["term_months"].to_numpy() if term_months is None else np.asarray(term_months)) * np.ones(len(arr_p), dtype=np.int64)
+    arr_fee_rate    = np.maximum(df_loans["origination_fee_rate"].to_numpy(dtype=np.float64) + fee_rate_shift, 0.0)
+
+    arr_pay         = annuity_payment(arr_p, monthly_rate(arr_apr), arr_n)
+
+    return pd.DataFrame({
+                            "loan_id"               : df_loans["loan_id"].to_numpy(),
+                            "apr"                   : arr_apr,
+                            "term_months"           : arr_n.astype(np.int64),
+                            "installment"           : arr_pay,
+                            "total_fee_interest"    : arr_pay * arr_n - arr_p,
+                            "origination_fee_amount": np.round(arr_p * arr_fee_rate, 2),
+                        })
@@ -0,0 +1,475 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cica import compact, index, paths, tables
+
+# -----------------------------------------------------------
+# Point-in-time (as-of) recomputation of the 02_2 / 03_x outputs
+# -----------------------------------------------------------
+#
+# The SQL hard-codes its observation cutoffs for a 2025-12-31 data end:
+#
+#   03_1  is_pd_eligible        origination_date <= DATE '2024-12-31'   (as_of - 12 months)
+#   02_2  inactive_flag NULL    first_loan_date + 180 days > '2025-12-31' (as_of)
+#   03_4a / 03_4b vintages      origination_date <  DATE '2025-01-01'   (12M window closed by as_of)
+#
+# Here every cutoff is derived from an as_of date, and every event is filtered
+# by its own date: loans by origination_date, defaults by default_date and
+# payments by payment_date. snapshot(as_of) returns the same tables the SQL
+# writes, as they would have looked on that date.
+#
+# The raw tables carry events dated after DATA_END (defaults and recoveries on
+# loans booked before it), and the SQL counts them: its cutoffs sit on DATA_END
+# but it has no event horizon. snapshot(DATA_END) with the default horizon
+# (events_through = as_of) drops them, so 03_2 / 03_3 come out at 215 / 105 rows
+# against the exported 366 / 190. sql_snapshot() is the reconciliation path: as_of
+# DATA_END with events_through = SQL_EVENTS_THROUGH, which matches every export.
+#
+# EventIndex is built once on the cica.index CSR layout and shared by every as_of:
+#
+#   - dates, months and money come from cica.compact: day numbers, month
+#     indexes on the dim_month spine, and cents (NO_EVENT for missing dates)
+#   - payments come (loan, payment_date) sorted from the CSR index, with a
+#     running sum of paid_principal, so "principal paid by loan i up to day d"
+#     is one searchsorted on the combined key loan * DAY_SPAN + day
+#   - loans come grouped by customer in origination order, so first / second
+#     loan are offsets, and per-customer totals are reduceat over the offsets
+#   - the raw tables are requested together through tables.submit_raw, and the
+#     loan / customer arrays are built while payments is still being read
+#
+# A sweep over N month-ends is then N rounds of O(loans * log payments) array
+# work, instead of N reloads and re-joins of the raw tables.
+
+NO_EVENT            = int(compact.MISSING_DAY)
+DAY_SPAN            = 1 << 20
+DATA_END            = pd.Timestamp("2025-12-31")
+SQL_EVENTS_THROUGH  = pd.Timestamp.max
+VINTAGE_START       = pd.Timestamp("2023-01-01")
+PD_WINDOW_MONTHS    = 12
+INACTIVITY_DAYS     = 180
+SWEEP_MONTHS        = 36
+TIERS               = ["A", "B", "C", "D"]
+LTV_PAYMENT_TYPES   = ["scheduled", "partial"]
+EVENT_TABLES        = ["customers", "loans", "payments"]
+
+
+def month_end_dates(end=DATA_END, n_months=SWEEP_MONTHS):
+    return list(pd.date_range(end=pd.Timestamp(end), periods=n_months, freq="ME"))
+
+
+class EventIndex:
+
+    def __init__(self, raw=None):
+        # Raw tables the caller did not pass are read in the background; loans and
+        # customers are compacted while payments (the largest table) is still parsing
+        raw             = dict(raw or {})
+        dict_futures    = tables.submit_raw([name for name in EVENT_TABLES if name not in raw])
+        ex              = index.load_index(raw or None)
+
+        df_customers    = raw["customers"] if "customers" in raw else dict_futures["customers"].result()
+        df_raw_loans    = raw["loans"] if "loans" in raw else dict_futures["loans"].result()
+
+        # Loans in CSR order (customer_id, origination_date, loan_id): the 02_2 ROW_NUMBER order
+        df_loans        = df_raw_loans.iloc[ex.loan_row].reset_index(drop=True)
+        df_cust_attr    = df_customers.drop(columns="customer_id").iloc[ex.customer_row[ex.loan_customer_pos]]
+        for col in df_cust_attr.columns:
+            df_loans[col] = df_cust_attr[col].to_numpy()
+
+        self.ex         = ex
+        self.df_loans   = df_loans
+        self.spine      = compact.MonthSpine(raw.get("dim_month"))
+
+        ct_loans        = compact.compact_table(df_raw_loans, "loans", self.spine)
+        ct_customers    = compact.compact_table(df_customers, "customers", self.spine)
+
+        # Working arrays are int64 (combined keys, day arithmetic); MISSING_DAY doubles as NO_EVENT
+        self.loan_id            = ct_loans["loan_id"][ex.loan_row]
+        self.customer_id        = ct_loans["customer_id"][ex.loan_row]
+        self.principal          = compact.from_cents(ct_loans["principal"][ex.loan_row])
+        self.orig_day           = ct_loans["origination_date"][ex.loan_row].astype(np.int64)
+        self.default_day        = ct_loans["default_date"][ex.loan_row].astype(np.int64)
+        self.customer_signup_day = ct_customers["signup_date"][ex.customer_row].astype(np.int64)
+        self.signup_day         = self.customer_signup_day[ex.loan_customer_pos]
+        self.pd_window_day      = compact.to_days(df_loans["origination_date"] + pd.DateOffset(months=PD_WINDOW_MONTHS)).astype(np.int64)
+        self.orig_month         = self.spine.month_of_day(self.orig_day).astype(np.int64)
+        self.default_month      = self.spine.month_of_day(self.default_day).astype(np.int64)
+        self.tier_code          = pd.Categorical(df_loans["risk_tier_at_signup"], categories=TIERS).codes.astype(np.int64)
+
+        # First / second loan per borrowing customer (CSR loan positions)
+        arr_n_loans             = ex.n_loans()
+        arr_has_loan            = arr_n_loans > 0
+        self.first_pos          = ex.customer_offsets[:-1][arr_has_loan]
+        self.second_pos         = np.where(arr_n_loans[arr_has_loan] >= 2, self.first_pos + 1, -1)
+
+        # Payments are already (loan, payment_date) sorted in the CSR index: running sums only.
+        # Money is in cents per row, as the Postgres tables store it.
+        df_payments             = raw["payments"] if "payments" in raw else dict_futures["payments"].result()
+        ct_payments             = compact.compact_table(df_payments, "payments", self.spine)
+        arr_pay_row             = ex.payment_row
+        list_ltv_codes          = [i for i, label in enumerate(ct_payments.labels["payment_type"]) if label in LTV_PAYMENT_TYPES]
+        self.pay_loan_pos       = ex.payment_loan_pos()
+        self.pay_day            = ct_payments["payment_date"][arr_pay_row].astype(np.int64)
+        self.pay_principal      = np.nan_to_num(compact.from_cents(ct_payments["paid_principal"][arr_pay_row]))
+        self.pay_amount         = np.nan_to_num(compact.from_cents(ct_payments["payment_amount"][arr_pay_row]))
+        self.pay_is_ltv         = np.isin(ct_payments["payment_type"][arr_pay_row], list_ltv_codes)
+
+        self.pay_key            = self.pay_loan_pos * DAY_SPAN + np.minimum(self.pay_day, DAY_SPAN - 1)
+        self.pay_cum            = np.concatenate([[0.0], np.cumsum(self.pay_principal)])
+        self.loan_pay_start     = ex.payment_offsets[:-1]
+
+    def payments_through(self, arr_pos, arr_day):
+        # (principal paid, payment count) for loans arr_pos with payment_date <= arr_day
+        arr_day     = np.minimum(arr_day, DAY_SPAN - 1)
+        arr_end     = np.searchsorted(self.pay_key, arr_pos * DAY_SPAN + arr_day, side="right")
+        arr_start   = self.loan_pay_start[arr_pos]
+        return self.pay_cum[arr_end] - self.pay_cum[arr_start], arr_end - arr_start
+
+    def state(self, as_of, events_through=None):
+        # Every per-loan / per-customer quantity the outputs need, as seen on as_of.
+        # events_through (default: as_of) moves only the event horizon, leaving the
+        # cutoffs on as_of; the SQL exports are as_of=DATA_END with no event horizon.
+        as_of           = pd.Timestamp(as_of)
+        day_as_of       = compact.day_number(as_of)
+        day_events      = day_as_of if events_through is None else compact.day_number(events_through)
+        day_pd_cutoff   = compact.day_number(as_of - pd.DateOffset(months=PD_WINDOW_MONTHS))
+        month_vintage   = self.spine.month_number(as_of + pd.Timedelta(days=1)) - 13
+        month_start     = self.spine.month_number(VINTAGE_START)
+
+        mask_booked     = self.orig_day <= day_events
+        mask_defaulted  = mask_booked & (self.default_day <= day_events)
+
+        # 03_2 / 03_3 : exposure and recoveries on defaults seen by as_of
+        arr_def_pos                 = np.flatnonzero(mask_defaulted)
+        arr_paid_at_default, arr_n_at_default  = self.payments_through(arr_def_pos, self.default_day[arr_def_pos])
+        arr_paid_as_of, arr_n_pay               = self.payments_through(arr_def_pos, np.full(len(arr_def_pos), day_events))
+
+        arr_unpaid      = np.maximum(self.principal[arr_def_pos] - arr_paid_at_default, 0)
+        arr_recovered   = arr_paid_as_of - arr_paid_at_default
+        arr_loss        = np.maximum(arr_unpaid - arr_recovered, 0)
+
+        # 03_3 keeps loans with no payments at all, or at least one payment after default
+        mask_lgd_row    = ((arr_n_pay == 0) | (arr_n_pay > arr_n_at_default)) & (arr_unpaid != 0)
+
+        arr_unpaid_all                  = np.zeros(len(self.loan_id))
+        arr_unpaid_all[arr_def_pos]     = arr_unpaid
+
+        # 03_1 : PD eligibility and 12M default flag
+        mask_pd_eligible    = mask_booked & (self.orig_day <= day_pd_cutoff)
+        mask_default_12m    = mask_defaulted & (self.default_day <= self.pd_window_day)
+
+        # 03_4a / 03_4b : vintages whose 12M window has closed by as_of
+        mask_vintage        = mask_booked & (self.orig_month >= month_start) & (self.orig_month <= month_vintage)
+        mask_vintage_def    = mask_vintage & mask_defaulted & (self.default_month <= self.orig_month + 12)
+
+        # 02_2 : first / second loan visibility and the 180-day inactivity window
+        arr_first_day       = self.orig_day[self.first_pos]
+        arr_second_day      = np.where(self.second_pos >= 0, self.orig_day[np.maximum(self.second_pos, 0)], NO_EVENT)
+        arr_second_day      = np.where(arr_second_day <= day_events, arr_second_day, NO_EVENT)
+        mask_customer       = arr_first_day <= min(day_as_of, day_events)
+        mask_observable     = arr_first_day + INACTIVITY_DAYS <= day_as_of
+        arr_inactive        = (arr_second_day == NO_EVENT) | (arr_second_day > arr_first_day + INACTIVITY_DAYS)
+
+        return {
+                    "as_of"             : as_of,
+                    "day_events"        : day_events,
+                    "booked"            : mask_booked,
+                    "pd_eligible"       : mask_pd_eligible,
+                    "default_12m"       : mask_default_12m,
+                    "default_pos"       : arr_def_pos,
+                    "paid_at_default"   : arr_paid_at_default,
+                    "unpaid"            : arr_unpaid,
+                    "unpaid_all"        : arr_unpaid_all,
+                    "recovered"         : arr_recovered,
+                    "loss"              : arr_loss,
+                    "lgd_row"           : mask_lgd_row,
+                    "vintage"           : mask_vintage,
+                    "vintage_default"   : mask_vintage_def,
+                    "customer"          : mask_customer,
+                    "observable"        : mask_observable,
+                    "inactive"          : arr_inactive,
+                    "second_day"        : arr_second_day,
+               }
+
+
+# -----------------------------------------------------------
+# Output tables (same columns as the SQL exports)
+# -----------------------------------------------------------
+
+def _month_start(ix, arr_months):
+    # Month index -> month_start date, by lookup on the spine
+    return ix.spine.to_month_start(arr_months).to_numpy()
+
+
+def probability_of_default(ix, st):
+    df          = ix.df_loans.loc[st["booked"], ["loan_id", "customer_id", "origination_date", "default_date", "risk_tier_at_signup"]].copy()
+    df["origination_month"] = _month_start(ix, ix.orig_month[st["booked"]])
+    df["default_date"]      = df["default_date"].where(ix.default_day[st["booked"]] <= st["day_events"])
+    df["is_pd_eligible"]    = st["pd_eligible"][st["booked"]].astype(int)
+    df["is_default_12m"]    = st["default_12m"][st["booked"]].astype(int)
+
+    return df[["loan_id", "customer_id", "origination_date", "origination_month", "default_date",
+               "risk_tier_at_signup", "is_pd_eligible", "is_default_12m"]].reset_index(drop=True)
+
+
+def exposure_at_default(ix, st):
+    arr_pos     = st["default_pos"]
+    df          = ix.df_loans.iloc[arr_pos][["customer_id", "loan_id", "origination_date", "default_date", "risk_tier_at_signup"]].copy()
+    df.insert(3, "origination_month", _month_start(ix, ix.orig_month[arr_pos]))
+    df["principal"]                     = ix.principal[arr_pos]
+    df["principal_paid_on_default"]     = st["paid_at_default"].round(2)
+    df["principal_unpaid_on_default"]   = st["unpaid"].round(2)
+
+    return df.reset_index(drop=True)
+
+
+def loss_given_default(ix, st):
+    mask        = st["lgd_row"]
+    arr_pos     = st["default_pos"][mask]
+    df          = ix.df_loans.iloc[arr_pos][["loan_id", "risk_tier_at_signup"]].copy()
+
+    df["origination_month"]                 = _month_start(ix, ix.orig_month[arr_pos])
+    df["principal_unpaid_on_default"]       = st["unpaid"][mask].round(2)
+    df["recovered_principal_after_default"] = st["recovered"][mask].round(2)
+    df["principal_loss"]                    = st["loss"][mask].round(2)
+    df["lgd_rate"]                          = (st["loss"][mask] * 100 / st["unpaid"][mask]).round(2)
+
+    return (df[["loan_id", "origination_month", "risk_tier_at_signup", "principal_unpaid_on_default",
+                "recovered_principal_after_default", "principal_loss", "lgd_rate"]]
+                .sort_values("origination_month", kind="mergesort")
+                .reset_index(drop=True)
+           )
+
+
+def _vintage_frame(ix, st):
+    mask        = st["vintage"]
+    return pd.DataFrame({
+                            "origination_month" : _month_start(ix, ix.orig_month[mask]),
+                            "principal"         : ix.principal[mask],
+                            "is_default_12m"    : st["vintage_default"][mask].astype(int),
+                            "loss_12m"          : np.where(st["vintage_default"][mask], st["unpaid_all"][mask].round(2), 0.0),
+                        })
+
+
+def cumulative_default_rate(ix, st):
+    df = (_vintage_frame(ix, st)
+                .groupby("origination_month")
+                .agg(
+                        n_loans_in_vintage      = ("is_default_12m", "size"),
+                        n_default_12m_loans     = ("is_default_12m", "sum"),
+                    )
+                .reset_index()
+         )
+    df["cdr_12m"] = (df["n_default_12m_loans"] * 100.0 / df["n_loans_in_vintage"]).round(2)
+    return df
+
+
+def cumulative_loss_rate(ix, st):
+    df = (_vintage_frame(ix, st)
+                .groupby("origination_month")
+                .agg(
+                        n_loans_in_vintage          = ("loss_12m", "size"),
+                        total_principal_in_vintage  = ("principal", "sum"),
+                        total_loss_12m              = ("loss_12m", "sum"),
+                    )
+                .reset_index()
+         )
+    df["clr_12m"] = (df["total_loss_12m"] * 100.0 / df["total_principal_in_vintage"].replace(0, np.nan)).round(4)
+    return df
+
+
+def borrower_inactivity(ix, st):
+    mask        = st["customer"]
+    arr_first   = ix.first_pos[mask]
+    arr_second  = ix.second_pos[mask]
+    mask_second = st["second_day"][mask] != NO_EVENT
+
+    df_first    = ix.df_loans.iloc[arr_first].reset_index(drop=True)
+    df_second   = ix.df_loans.iloc[np.maximum(arr_second, 0)].reset_index(drop=True)
+
+    df = pd.DataFrame({
+                        "customer_id"       : df_first["customer_id"],
+                        "first_loan_id"     : df_first["loan_id"],
+                        "first_loan_date"   : df_first["origination_date"],
+                        "second_loan_id"    : df_second["loan_id"].where(mask_second).astype("Int64"),
+                        "second_loan_date"  : df_second["origination_date"].where(mask_second),
+                        "daydate_180"       : df_first["origination_date"] + pd.Timedelta(days=INACTIVITY_DAYS),
+                        "inactive_flag"     : pd.Series(st["inactive"][mask].astype(int)).where(st["observable"][mask]).astype("Int64"),
+                      })
+
+    for col in ["acquisition_channel", "risk_tier_at_signup", "income_band", "age_band", "region"]:
+        df[col] = df_first[col]
+
+    return df
+
+
+def customer_activation_timing(ix, st):
+    # First loan on or after signup, per customer, then averaged by signup month
+    mask_loan       = (ix.orig_day <= st["day_events"]) & (ix.orig_day >= ix.signup_day)
+    arr_first_day   = index.segment_min(np.where(mask_loan, ix.orig_day, NO_EVENT), ix.ex.customer_offsets, NO_EVENT)
+    mask_active     = arr_first_day != NO_EVENT
+
+    df = pd.DataFrame({
+                        "year_month"        : _month_start(ix, ix.spine.month_of_day(ix.customer_signup_day[mask_active])),
+                        "activation_days"   : arr_first_day[mask_active] - ix.customer_signup_day[mask_active],
+                      })
+
+    df = (df
+            .groupby("year_month")
+            .agg(
+                    avg_activation_days     = ("activation_days", "mean"),
+                    median_activation_days  = ("activation_days", "median"),
+                    n_customers             = ("activation_days", "size"),
+                )
+            .reset_index()
+         )
+    df["avg_activation_days"] = df["avg_activation_days"].round(2)
+    return df
+
+
+def customer_ltv_180d(ix, st):
+    # Scheduled + partial payments inside 180 days of origination, less principal
+    # still unpaid on loans that defaulted inside the same window
+    day_events      = st["day_events"]
+    arr_cutoff_day  = ix.orig_day + INACTIVITY_DAYS
+
+    mask_pay_seen   = ix.pay_is_ltv & (ix.pay_day <= day_events)
+    mask_pay_in     = mask_pay_seen & (ix.pay_day <= arr_cutoff_day[ix.pay_loan_pos])
+
+    arr_n_seen      = index.segment_sum(mask_pay_seen, ix.ex.payment_offsets)
+    arr_n_in        = index.segment_sum(mask_pay_in, ix.ex.payment_offsets)
+    arr_cum_payment = index.segment_sum(np.where(mask_pay_in, ix.pay_amount, 0.0), ix.ex.payment_offsets)
+    arr_cum_prin    = index.segment_sum(np.where(mask_pay_in, ix.pay_principal, 0.0), ix.ex.payment_offsets)
+
+    # 02_3a keeps loans with no scheduled/partial payments at all, or at least one inside the window
+    mask_loan       = (ix.orig_day <= day_events) & ((arr_n_seen == 0) | (arr_n_in > 0))
+    mask_default    = (ix.default_day <= day_events) & (ix.default_day <= arr_cutoff_day)
+    arr_loss        = np.where(mask_default, ix.principal - arr_cum_prin, 0.0)
+
+    arr_payment_c   = index.segment_sum(np.where(mask_loan, arr_cum_payment, 0.0), ix.ex.customer_offsets)
+    arr_loss_c      = index.segment_sum(np.where(mask_loan, arr_loss, 0.0), ix.ex.customer_offsets)
+    mask_customer   = index.segment_sum(mask_loan, ix.ex.customer_offsets) > 0
+
+    df = pd.DataFrame({
+                        "customer_id"           : ix.ex.customer_id[mask_customer],
+                        "total_payment_180d"    : arr_payment_c[mask_customer].round(2),
+                        "total_loss_180d"       : arr_loss_c[mask_customer].round(2),
+                      })
+    df["net_ltv_180d"] = (df["total_payment_180d"] - df["total_loss_180d"]).round(2)
+
+    return df.sort_values("net_ltv_180d", ascending=False, kind="mergesort").reset_index(drop=True)
+
+
+OUTPUTS = {
+    "02_1_customer_activation_timing"           : customer_activation_timing,
+    "02_2_borrower_inactivity_and_churn_risk"   : borrower_inactivity,
+    "02_3a_customer_LTV_180d"                   : customer_ltv_180d,
+    "03_1_probability_of_default"               : probability_of_default,
+    "03_2_exposure_at_default"                  : exposure_at_default,
+    "03_3_loss_given_default"                   : loss_given_default,
+    "03_4a_cumulative_default_rate"             : cumulative_default_rate,
+    "03_4b_cumulative_loss_rate"                : cumulative_loss_rate,
+}
+
+
+def snapshot(as_of, ix=None, events_through=None):
+    # {output_name: DataFrame} for every output, as of the given date
+    ix = ix or EventIndex()
+    st = ix.state(as_of, events_through)
+    return {name: build(ix, st) for name, build in OUTPUTS.items()}
+
+
+def sql_snapshot(ix=None):
+    # The SQL exports: cutoffs on DATA_END, every event in the raw tables counted
+    return snapshot(DATA_END, ix, events_through=SQL_EVENTS_THROUGH)
+
+
+def save_snapshot(as_of, ix=None, events_through=None):
+    # Writes Data_Generated/as_of/<date>/<output>.csv, NULL for missing like the SQL exports
+    out_dir = os.path.join(paths.data_dir, "as_of", pd.Timestamp(as_of).strftime("%Y-%m-%d"))
+    os.makedirs(out_dir, exist_ok=True)
+
+    for output_name, df in snapshot(as_of, ix, events_through).items():
+        df.to_csv(os.path.join(out_dir, f"{output_name}.csv"), index=False, na_rep=tables.NULL_VALUES[0])
+
+    return out_dir
+
+
+# -----------------------------------------------------------
+# Sweep: headline rates by tier for a run of as_of dates
+# -----------------------------------------------------------
+
+def _tier_rates(metric, arr_tier, arr_num, arr_den):
+    # Numerator / denominator per tier plus an "All" row
+    n_tiers     = len(TIERS)
+    arr_num_t   = np.bincount(arr_tier, weights=arr_num, minlength=n_tiers + 1)[:n_tiers]
+    arr_den_t   = np.bincount(arr_tier, weights=arr_den, minlength=n_tiers + 1)[:n_tiers]
+    arr_num_t   = np.append(arr_num_t, arr_num.sum())
+    arr_den_t   = np.append(arr_den_t, arr_den.sum())
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr_value = np.where(arr_den_t > 0, arr_num_t / arr_den_t, np.nan)
+
+    return pd.DataFrame({
+                            "metric"                : metric,
+                            "risk_tier_at_signup"   : TIERS + ["All"],
+                            "numerator"             : arr_num_t,
+                            "denominator"           : arr_den_t,
+                            "value"                 : arr_value,
+                        })
+
+
+def rate_elements(ix, st):
+    # {metric: (loan position, numerator, denominator)} per element of each 03_x / 02_2 rate,
+    # money rounded to the cent as in the SQL exports. Inactivity has one element per
+    # observable customer, placed on their first loan.
+    arr_def_pos     = st["default_pos"]
+    mask_lgd        = st["lgd_row"]
+    arr_pd_pos      = np.flatnonzero(st["pd_eligible"])
+    arr_vin_pos     = np.flatnonzero(st["vintage"])
+    arr_vin_default = st["vintage_default"][arr_vin_pos]
+    mask_obs        = st["observable"]
+
+    return {
+        "pd_12m"            : (arr_pd_pos, st["default_12m"][arr_pd_pos].astype(float), np.ones(len(arr_pd_pos))),
+        "lgd"               : (arr_def_pos[mask_lgd], st["loss"][mask_lgd].round(2), st["unpaid"][mask_lgd].round(2)),
+        "cdr_12m"           : (arr_vin_pos, arr_vin_default.astype(float), np.ones(len(arr_vin_pos))),
+        "clr_12m"           : (arr_vin_pos, np.where(arr_vin_default, st["unpaid_all"][arr_vin_pos].round(2), 0.0),
+                               ix.principal[arr_vin_pos]),
+        "inactivity_180d"   : (ix.first_pos[mask_obs], st["inactive"][mask_obs].astype(float), np.ones(mask_obs.sum())),
+    }
+
+
+def sweep(list_as_of=None, ix=None):
+    ix          = ix or EventIndex()
+    list_as_of  = list_as_of or month_end_dates()
+    # tier_code -1 (unknown tier) lands in an extra bincount slot that is dropped
+    arr_tier    = np.where(ix.tier_code < 0, len(TIERS), ix.tier_code)
+    arr_tier_c  = arr_tier[ix.first_pos]
+
+    list_frames = []
+    for as_of in list_as_of:
+        st          = ix.state(as_of)
+        arr_def_t   = arr_tier[st["default_pos"]]
+        mask_lgd    = st["lgd_row"]
+        mask_obs    = st["observable"]
+
+        list_parts  = [
+            _tier_rates("pd_12m",          arr_tier[st["pd_eligible"]],    st["default_12m"][st["pd_eligible"]].astype(float),
+                                                                           np.ones(st["pd_eligible"].sum())),
+            _tier_rates("ead_share",       arr_def_t,                      st["unpaid"],           ix.principal[st["default_pos"]]),
+            _tier_rates("lgd",             arr_def_t[mask_lgd],            st["loss"][mask_lgd],   st["unpaid"][mask_lgd]),
+            _tier_rates("cdr_12m",         arr_tier[st["vintage"]],        st["vintage_default"][st["vintage"]].astype(float),
+                                                                           np.ones(st["vintage"].sum())),
+            _tier_rates("clr_12m",         arr_tier[st["vintage"]],        np.where(st["vintage_default"], st["unpaid_all"], 0)[st["vintage"]],
+                                                                           ix.principal[st["vintage"]]),
+            _tier_rates("inactivity_180d", arr_tier_c[mask_obs],           st["inactive"][mask_obs].astype(float),
+                                                                           np.ones(mask_obs.sum())),
+        ]
+
+        df_as_of            = pd.concat(list_parts, ignore_index=True)
+        df_as_of.insert(0, "as_of", pd.Timestamp(as_of))
+        list_frames.append(df_as_of)
+
+    return pd.concat(list_frames, ignore_index=True)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cica import paths, tables
+
+# -----------------------------------------------------------
+# Rolling-origin backtest and order selection for monthly forecasts
+# -----------------------------------------------------------
+#
+# For every series and every origin t (MIN_TRAIN_MONTHS, ..., n - horizon) each
+# spec is fitted on y[:t] and forecasts y[t : t + horizon]. Errors are scored as
+#
+#   MAPE    mean |y - f| / |y| over forecasts whose actual is not zero
+#   MASE    mean |y - f| / the in-sample MAE of the seasonal naive forecast
+#           (y[i] vs y[i - 12], or y[i - 1] when the window is under two years),
+#           scaled per origin, so series on different scales can be averaged
+#
+# and the spec with the lowest MASE is selected per series. Both are means over
+# the forecasts that exist, so a spec with any failed fit (n_failed > 0) would be
+# scored on its easier origins only; such specs are left unranked and are never
+# selected.
+#
+# Every (series, spec, origin) fit is independent, so they fan out across a
+# process pool the way montecarlo.simulate does. Each forecast is cached on disk
+# under a hash of the spec, the training values and the horizon: a nightly
+# rerun only fits the origins that are new, or the series whose history was
+# restated, and re-running the same grid costs only the reads.
+
+SPECS = [
+    {"name": "SARIMA(0,1,1)",              "kind": "sarimax", "order": [0, 1, 1], "seasonal_order": [0, 0, 0, 0]},
+    {"name": "SARIMA(1,1,0)",              "kind": "sarimax", "order": [1, 1, 0], "seasonal_order": [0, 0, 0, 0]},
+    {"name": "SARIMA(1,1,1)",              "kind": "sarimax", "order": [1, 1, 1], "seasonal_order": [0, 0, 0, 0]},
+    {"name": "SARIMA(2,1,1)",              "kind": "sarimax", "order": [2, 1, 1], "seasonal_order": [0, 0, 0, 0]},
+    {"name": "SARIMA(0,1,1)(0,1,1,12)",    "kind": "sarimax", "order": [0, 1, 1], "seasonal_order": [0, 1, 1, 12]},
+    {"name": "SARIMA(1,1,1)(1,1,1,12)",    "kind": "sarimax", "order": [1, 1, 1], "seasonal_order": [1, 1, 1, 12]},
+    {"name": "ETS(A,N,N)",                 "kind": "ets", "trend": None, "damped_trend": False},
+    {"name": "ETS(A,A,N)",                 "kind": "ets", "trend": "add", "damped_trend": False},
+    {"name": "ETS(A,Ad,N)",                "kind": "ets", "trend": "add", "damped_trend": True},
+    {"name": "Seasonal naive",             "kind": "naive"},
+]
+
+SERIES_SOURCES = {
+    "revenue"   : ("01_3a_actual_revenue", "actual_revenue"),
+    "cash"      : ("01_3b_actual_cash", "actual_cash"),
+    "loss"      : ("01_3c_actual_loss", "actual_loss"),
+}
+
+MIN_TRAIN_MONTHS    = 24
+HORIZON_MONTHS      = 3
+SEASONAL_PERIOD     = 12
+CACHE_DIR           = os.path.join(paths.data_dir, ".forecast_cache")
+
+
+def load_series():
+    # Monthly SQL totals as month-start indexed series
+    dict_series = {}
+    for series_name, (file_name, col) in SERIES_SOURCES.items():
+        df = tables.load_generated(file_name)
+        dict_series[series_name] = df.set_index(pd.to_datetime(df["year_month"]))[col].astype(float).asfreq("MS")
+    return dict_series
+
+
+def fit_key(spec, arr_train, horizon):
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(arr_train, dtype=np.float64).tobytes())
+    digest.update(str(horizon).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, key[:2], key + ".npy")
+
+
+def fit_forecast(task):
+    # (spec, training values, horizon) -> forecast of length horizon; NaN when the fit fails
+    spec, arr_train, horizon = task
+    period          = SEASONAL_PERIOD if len(arr_train) >= SEASONAL_PERIOD else 1
+
+    if spec["kind"] == "naive":
+        return np.resize(arr_train[-period:], horizon).astype(np.float64)
+
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            if spec["kind"] == "sarimax":
+                model = SARIMAX(arr_train, order=tuple(spec["order"]), seasonal_order=tuple(spec["seasonal_order"]))
+                return np.asarray(model.fit(disp=False).forecast(horizon), dtype=np.float64)
+            model = ExponentialSmoothing(arr_train, trend=spec["trend"], damped_trend=spec["damped_trend"],
+                                         initialization_method="estimated")
+            return np.asarray(model.fit().forecast(horizon), dtype=np.float64)
+        except (ValueError, np.linalg.LinAlgError):
+            return np.full(horizon, np.nan)
+
+
+def rolling_tasks(dict_series, specs=SPECS, min_train=MIN_TRAIN_MONTHS, horizon=HORIZON_MONTHS):
+    # One row per (series, spec, origin) with the training values it needs
+    list_rows = []
+    for series_name, srs in dict_series.items():
+        arr_y = srs.to_numpy(dtype=np.float64)
+        for origin in range(min_train, len(arr_y) - horizon + 1):
+            for spec in specs:
+                list_rows.append({
+                    "series"    : series_name,
+                    "spec"      : spec["name"],
+                    "origin"    : srs.index[origin],
+                    "task"      : (spec, arr_y[:origin], horizon),
+                    "actual"    : arr_y[origin:origin + horizon],
+                })
+    return list_rows
+
+
+def run_fits(list_tasks, n_workers=None, use_cache=True):
+    # Forecasts for every task, in order; cached fits are read, the rest run on the pool
+    list_keys       = [fit_key(*task) for task in list_tasks]
+    list_forecasts  = [None] * len(list_tasks)
+
+    if use_cache:
+        for i, key in enumerate(list_keys):
+            if os.path.exists(_cache_path(key)):
+                list_forecasts[i] = np.load(_cache_path(key))
+
+    list_todo       = [i for i, forecast in enumerate(list_forecasts) if forecast is None]
+    n_workers       = n_workers or os.cpu_count() or 1
+
+    if n_workers == 1 or len(list_todo) <= 1:
+        list_results = [fit_forecast(list_tasks[i]) for i in list_todo]
+    else:
+        chunksize = max(1, len(list_todo) // (n_workers * 8))
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            list_results = list(pool.map(fit_forecast, [list_tasks[i] for i in list_todo], chunksize=chunksize))
+
+    for i, forecast in zip(list_todo, list_results):
+        list_forecasts[i] = forecast
+        if use_cache:
+            os.makedirs(os.path.dirname(_cache_path(list_keys[i])), exist_ok=True)
+            np.save(_cache_path(list_keys[i]), forecast)
+
+    return list_forecasts, len(list_todo)
+
+
+def _naive_scale(arr_train):
+    period      = SEASONAL_PERIOD if len(arr_train) >= 2 * SEASONAL_PERIOD else 1
+    arr_diff    = np.abs(arr_train[period:] - arr_train[:-period])
+    return arr_diff.mean() if len(arr_diff) else np.nan
+
+
+def backtest(dict_series=None, specs=SPECS, min_train=MIN_TRAIN_MONTHS, horizon=HORIZON_MONTHS,
+             n_workers=None, use_cache=True):
+    # (errors, scores): one errors row per forecast month, one scores row per (series, spec)
+    dict_series     = dict_series or load_series()
+    list_rows       = rolling_tasks(dict_series, specs, min_train, horizon)
+    list_forecasts, n_fitted = run_fits([row["task"] for row in list_rows], n_workers, use_cache)
+
+    list_errors = []
+    for row, arr_forecast in zip(list_rows, list_forecasts):
+        arr_train   = row["task"][1]
+        list_errors.append(pd.DataFrame({
+                                "series"        : row["series"],
+                                "spec"          : row["spec"],
+                                "origin"        : row["origin"],
+                                "step"          : np.arange(1, horizon + 1),
+                                "actual"        : row["actual"],
+                                "forecast"      : arr_forecast,
+                                "naive_scale"   : _naive_scale(arr_train),
+                            }))
+
+    df_errors = pd.concat(list_errors, ignore_index=True)
+    df_errors["abs_error"]      = (df_errors["actual"] - df_errors["forecast"]).abs()
+    df_errors["ape"]            = (df_errors["abs_error"] / df_errors["actual"].abs()).where(df_errors["actual"] != 0)
+    df_errors["scaled_error"]   = (df_errors["abs_error"] / df_errors["naive_scale"]).where(df_errors["naive_scale"] > 0)
+
+    df_scores = (df_errors
+                    .groupby(["series", "spec"], sort=False)
+                    .agg(
+                        n_origins   = ("origin", "nunique"),
+                        n_failed    = ("forecast", lambda s: int(s.isna().sum())),
+                        mape        = ("ape", "mean"),
+                        mase        = ("scaled_error", "mean"),
+                    )
+                    .reset_index()
+                )
+    srs_mase_complete       = df_scores["mase"].where(df_scores["n_failed"] == 0)
+    df_scores["rank"]       = srs_mase_complete.groupby(df_scores["series"]).rank(method="first")
+    df_scores["selected"]   = df_scores["rank"] == 1
+
+    df_scores.attrs["n_fitted"] = n_fitted
+    return df_errors, df_scores
+
+
+def selected_specs(df_scores, specs=SPECS, kind=None):
+    # {series: spec dict} for the lowest-MASE spec of each series (specs without failed fits);
+    # kind (e.g. "sarimax") restricts the choice to that model family
+    dict_specs  = {spec["name"]: spec for spec in specs}
+    df_ranked   = df_scores.loc[df_scores["rank"].notna() & df_scores["spec"].isin(list(dict_specs))]
+    if kind is not None:
+        df_ranked = df_ranked.loc[df_ranked["spec"].map(lambda name: dict_specs[name]["kind"]) == kind]
+    df_best     = df_ranked.sort_values("rank", kind="mergesort").drop_duplicates("series")
+    return {row.series: dict_specs[row.spec] for row in df_best.itertuples()}
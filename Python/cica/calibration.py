@@ -0,0 +1,223 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from cica import index, policy, tables
+
+# -----------------------------------------------------------
+# Calibration and discrimination tracking (3.6B)
+# -----------------------------------------------------------
+#
+# Predicted PD (the decision_score curve from 3.5) against the realized
+# is_default_12m in 03_1, for every segment in one pass. The curve is fit on these
+# same loans, so every figure here is in-sample.
+#
+#   AUC     : rank-sum (Mann-Whitney) on ranks within segment
+#   KS      : max gap between cumulative default / non-default shares, taken
+#             only between tie groups of predicted PD
+#   Brier   : mean (predicted PD - outcome)^2
+#   deciles : predicted vs observed default rate per within-segment PD decile
+#
+# Rows are sorted once by (segment, predicted PD). After that every statistic is
+# a cumulative sum or a reduceat over segment boundaries.
+#
+# Bootstrap bands use Poisson(1) weights: a (replicates x loans) weight matrix is
+# pushed through the same cumulative sums, so 1,000 replicates are a few array
+# operations, not 1,000 resamples. Replicates are processed in blocks to bound memory.
+
+N_DECILES           = 10
+N_BOOTSTRAP         = 1_000
+BOOTSTRAP_BLOCK     = 250
+BOOTSTRAP_SEED      = 20260201
+CI_LEVEL            = 0.95
+
+SEGMENT_LEVELS = {
+    "portfolio"             : [],
+    "origination_month"     : ["origination_month"],
+    "risk_tier_at_signup"   : ["risk_tier_at_signup"],
+    "vintage_x_tier"        : ["origination_month", "risk_tier_at_signup"],
+}
+
+
+def scored_loans(df_apps=None):
+    # PD-eligible loans with predicted PD and realized 12M default
+    if df_apps is None:
+        df_apps = policy.application_economics()
+
+    df_pd_table     = tables.load_generated("03_1_probability_of_default", date_cols=["origination_month"])
+    ex              = index.load_index()
+
+    df_scored       = (df_pd_table
+                        .loc[df_pd_table["is_pd_eligible"] == 1, ["loan_id", "origination_month", "risk_tier_at_signup", "is_default_12m"]]
+                        .reset_index(drop=True)
+                      )
+
+    # loan -> application through the entity index, application -> predicted PD by key
+    df_scored["application_id"] = tables.load_raw("loans")["application_id"].to_numpy()[ex.loan_rows(df_scored["loan_id"].to_numpy())]
+    df_scored["predicted_pd"]   = df_scored["application_id"].map(df_apps.set_index("application_id")["expected_pd"])
+
+    return df_scored.dropna(subset=["predicted_pd"]).reset_index(drop=True)
+
+
+class _SortedSegments:
+    # One sort by (segment, predicted PD) shared by every statistic
+
+    def __init__(self, arr_segment_code, arr_pred, arr_outcome):
+        self.order          = np.lexsort((arr_pred, arr_segment_code))
+        self.seg            = arr_segment_code[self.order]
+        self.pred           = arr_pred[self.order]
+        self.y              = arr_outcome[self.order]
+
+        self.starts         = np.flatnonzero(np.r_[True, self.seg[1:] != self.seg[:-1]])
+        self.sizes          = np.diff(np.r_[self.starts, len(self.seg)])
+        self.seg_codes      = self.seg[self.starts]
+
+    def restart_cumsum(self, arr_values):
+        # Cumulative sum along the last axis that restarts at each segment
+        arr_cum     = np.cumsum(arr_values, axis=-1)
+        arr_pad     = np.concatenate([np.zeros(arr_cum.shape[:-1] + (1,)), arr_cum], axis=-1)
+        arr_base    = arr_pad[..., self.starts]
+        return arr_cum - np.repeat(arr_base, self.sizes, axis=-1)
+
+    def segment_sum(self, arr_values):
+        return np.add.reduceat(arr_values, self.starts, axis=-1)
+
+    def segment_max(self, arr_values):
+        return np.maximum.reduceat(arr_values, self.starts, axis=-1)
+
+
+def _auc_ks_brier(ss, arr_w):
+    # arr_w: (replicates, rows) weights in sorted order; all-ones gives the point estimate
+    arr_pos_w       = arr_w * ss.y
+    arr_neg_w       = arr_w * (1.0 - ss.y)
+
+    arr_w_pos       = ss.segment_sum(arr_pos_w)
+    arr_w_neg       = ss.segment_sum(arr_neg_w)
+
+    # Ties in predicted PD share credit half-and-half
+    arr_cum_neg     = ss.restart_cumsum(arr_neg_w)
+    is_tie_start    = np.r_[True, (ss.pred[1:] != ss.pred[:-1]) | (ss.seg[1:] != ss.seg[:-1])]
+    is_tie_end      = np.r_[is_tie_start[1:], True]
+    arr_tie_id      = np.cumsum(is_tie_start) - 1
+    arr_tie_starts  = np.flatnonzero(is_tie_start)
+    arr_tie_sizes   = np.diff(np.r_[arr_tie_starts, len(ss.pred)])
+
+    arr_neg_in_tie  = np.add.reduceat(arr_neg_w, arr_tie_starts, axis=-1)
+    arr_neg_before  = np.repeat(arr_cum_neg[..., arr_tie_starts] - arr_neg_w[..., arr_tie_starts], arr_tie_sizes, axis=-1)
+    arr_neg_tie_row = arr_neg_in_tie[..., arr_tie_id]
+
+    arr_pair_credit = arr_pos_w * (arr_neg_before + 0.5 * arr_neg_tie_row)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr_auc     = ss.segment_sum(arr_pair_credit) / (arr_w_pos * arr_w_neg)
+
+        # KS: scan from highest PD down (same as low-to-high on the complement).
+        # A threshold cannot split a tie, so only the last row of each tie group
+        # is a valid cut
+        arr_tpr     = ss.restart_cumsum(arr_pos_w) / np.repeat(arr_w_pos, ss.sizes, axis=-1)
+        arr_fpr     = arr_cum_neg / np.repeat(arr_w_neg, ss.sizes, axis=-1)
+        arr_gap     = np.where(is_tie_end, np.nan_to_num(np.abs(arr_tpr - arr_fpr), nan=0.0), 0.0)
+        arr_ks      = ss.segment_max(arr_gap)
+
+        arr_brier   = ss.segment_sum(arr_w * (ss.pred - ss.y) ** 2) / ss.segment_sum(arr_w)
+
+    return arr_auc, arr_ks, arr_brier
+
+
+def segment_metrics(df_scored, segment_cols, n_bootstrap=N_BOOTSTRAP, seed=BOOTSTRAP_SEED):
+    if segment_cols:
+        arr_segment_code, df_keys = _factorize_segments(df_scored, segment_cols)
+    else:
+        arr_segment_code    = np.zeros(len(df_scored), dtype=np.int64)
+        df_keys             = pd.DataFrame(index=[0])
+
+    ss = _SortedSegments(
+            arr_segment_code,
+            df_scored["predicted_pd"].to_numpy(dtype=float),
+            df_scored["is_default_12m"].to_numpy(dtype=float)
+         )
+
+    arr_auc, arr_ks, arr_brier = _auc_ks_brier(ss, np.ones((1, len(ss.pred))))
+
+    df_metrics                          = df_keys.iloc[ss.seg_codes].reset_index(drop=True)
+    df_metrics["n_loans"]               = ss.sizes
+    df_metrics["n_defaults"]            = ss.segment_sum(ss.y).astype(int)
+    df_metrics["mean_predicted_pd"]     = ss.segment_sum(ss.pred) / ss.sizes
+    df_metrics["observed_default_rate"] = df_metrics["n_defaults"] / ss.sizes
+    df_metrics["auc"]                   = arr_auc[0]
+    df_metrics["ks"]                    = arr_ks[0]
+    df_metrics["brier"]                 = arr_brier[0]
+
+    # Poisson-weight bootstrap, in blocks of replicates
+    if n_bootstrap:
+        rng         = np.random.default_rng(seed)
+        list_auc, list_ks, list_brier = [], [], []
+
+        for block_start in range(0, n_bootstrap, BOOTSTRAP_BLOCK):
+            n_block     = min(BOOTSTRAP_BLOCK, n_bootstrap - block_start)
+            arr_w       = rng.poisson(1.0, size=(n_block, len(ss.pred))).astype(float)
+            boot_auc, boot_ks, boot_brier = _auc_ks_brier(ss, arr_w)
+            list_auc.append(boot_auc)
+            list_ks.append(boot_ks)
+            list_brier.append(boot_brier)
+
+        # Segments with no defaults (or no non-defaults) have no AUC in any replicate
+        alpha = (1.0 - CI_LEVEL) / 2.0
+        for name, list_boot in [("auc", list_auc), ("ks", list_ks), ("brier", list_brier)]:
+            arr_boot = np.concatenate(list_boot, axis=0)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                df_metrics[f"{name}_ci_low"]    = np.nanquantile(arr_boot, alpha, axis=0)
+                df_metrics[f"{name}_ci_high"]   = np.nanquantile(arr_boot, 1.0 - alpha, axis=0)
+
+    # Within-segment PD deciles for the reliability table
+    arr_rank        = np.arange(len(ss.pred)) - np.repeat(ss.starts, ss.sizes)
+    arr_decile      = (arr_rank * N_DECILES) // np.repeat(ss.sizes, ss.sizes)
+    arr_cell        = np.searchsorted(ss.seg_codes, ss.seg) * N_DECILES + arr_decile
+    n_cells         = len(ss.seg_codes) * N_DECILES
+
+    arr_n           = np.bincount(arr_cell, minlength=n_cells)
+    arr_pred_sum    = np.bincount(arr_cell, weights=ss.pred, minlength=n_cells)
+    arr_obs_sum     = np.bincount(arr_cell, weights=ss.y, minlength=n_cells)
+
+    is_filled       = arr_n > 0
+    df_reliability  = df_keys.iloc[np.repeat(ss.seg_codes, N_DECILES)[is_filled]].reset_index(drop=True)
+    df_reliability["pd_decile"]             = np.tile(np.arange(1, N_DECILES + 1), len(ss.seg_codes))[is_filled]
+    df_reliability["n_loans"]               = arr_n[is_filled]
+    df_reliability["mean_predicted_pd"]     = arr_pred_sum[is_filled] / arr_n[is_filled]
+    df_reliability["observed_default_rate"] = arr_obs_sum[is_filled] / arr_n[is_filled]
+
+    return df_metrics, df_reliability
+
+
+def _factorize_segments(df_scored, segment_cols):
+    df_keys_all     = df_scored[segment_cols]
+    arr_code, arr_uniques = pd.factorize(pd.MultiIndex.from_frame(df_keys_all), sort=True)
+    df_keys         = pd.DataFrame(list(arr_uniques), columns=segment_cols)
+    return arr_code.astype(np.int64), df_keys
+
+
+def calibration_tables(df_scored=None, n_bootstrap=N_BOOTSTRAP):
+    if df_scored is None:
+        df_scored = scored_loans()
+
+    list_metrics, list_reliability = [], []
+
+    for level_name, segment_cols in SEGMENT_LEVELS.items():
+        df_metrics, df_reliability = segment_metrics(df_scored, segment_cols, n_bootstrap)
+
+        for df_out in [df_metrics, df_reliability]:
+            df_out.insert(0, "segment_level", level_name)
+
+        list_metrics.append(df_metrics)
+        list_reliability.append(df_reliability)
+
+    list_key_cols   = ["segment_level", "origination_month", "risk_tier_at_signup"]
+    df_metrics      = pd.concat(list_metrics, ignore_index=True)
+    df_reliability  = pd.concat(list_reliability, ignore_index=True)
+
+    df_metrics      = df_metrics[list_key_cols + [c for c in df_metrics.columns if c not in list_key_cols]]
+    df_reliability  = df_reliability[list_key_cols + [c for c in df_reliability.columns if c not in list_key_cols]]
+
+    return df_metrics, df_reliability
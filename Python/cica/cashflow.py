@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from cica import index, risk_params, stress, tables
+
+# -----------------------------------------------------------
+# Forward cash-flow projection on the remaining payment_schedule
+# -----------------------------------------------------------
+#
+# Delinquency states come from the 01_4c month-end DPD buckets, plus an
+# absorbing Default state. Two sets of parameters are fitted on consecutive
+# month-ends of every loan still in repayment, using only months up to as_of:
+#
+#   P(s -> s')      monthly transition matrix between states; a loan whose
+#                   default_date falls in the next month moves to Default
+#   c(s)            collection rate: cash paid in the next month (01_4b, net of
+#                   refunds) / amount owed next month (installment falling due +
+#                   arrears carried in), amount-weighted over loans in state s
+#
+# Projection, for every open loan at as_of (cica.stress.open_book):
+#
+#   start       one-hot state from its 01_4c bucket at as_of (Current when the
+#               loan has no month-end row yet), arrears = unpaid_at_month_end,
+#               or a credit when it has paid ahead of schedule
+#   month k     owed      = due_total falling due in month k + arrears
+#               collected = sum_s pi(s) c(s) x owed
+#               arrears   = owed - collected / P(alive)   (arrears of a loan still alive)
+#               pi        = pi @ P
+#
+# Installments are a padded (loans x horizon) grid built with one bincount, and
+# each month is one (loans x states) @ (states x states) product, so the whole
+# book runs in milliseconds. Loans defaulting in the projection stop paying;
+# recoveries are not projected.
+
+STATES          = ["Current", "1-29", "30-59", "60-89", "90+", "Default"]
+DEFAULT_STATE   = STATES.index("Default")
+HORIZON_MONTHS  = 12
+SEGMENT_COLUMNS = ["risk_tier_at_signup", "acquisition_channel"]
+
+
+def monthly_steps(df_delinquency, df_loans):
+    # One row per (loan, month-end t) with the state at t and what happened in t + 1
+    df          = df_delinquency.sort_values(["loan_id", "year_month"], kind="mergesort").reset_index(drop=True)
+    arr_loan    = df["loan_id"].to_numpy()
+    arr_month   = risk_params.month_index(df["year_month"])
+    arr_state   = pd.Categorical(df["dpd_bucket"], categories=STATES).codes.astype(np.int64)
+    arr_due     = df["due_at_month_end"].to_numpy()
+    arr_paid    = df["paid_at_month_end"].to_numpy()
+    arr_unpaid  = df["unpaid_at_month_end"].to_numpy()
+
+    srs_default = df_loans.set_index("loan_id")["default_date"]
+    arr_def_m   = risk_params.month_index(srs_default.reindex(arr_loan))
+    arr_def_m   = np.nan_to_num(np.asarray(arr_def_m, dtype=np.float64), nan=np.inf)
+
+    # Consecutive month-ends of the same loan
+    is_step     = (arr_loan[1:] == arr_loan[:-1]) & (arr_month[1:] == arr_month[:-1] + 1)
+    i, j        = np.flatnonzero(is_step), np.flatnonzero(is_step) + 1
+
+    arr_owed    = (arr_due[j] - arr_due[i]) + arr_unpaid[i]
+    df_steps    = pd.DataFrame({
+                                "loan_id"       : arr_loan[i],
+                                "month"         : arr_month[i],
+                                "state"         : arr_state[i],
+                                "next_state"    : np.where(arr_def_m[i] <= arr_month[j], DEFAULT_STATE, arr_state[j]),
+                                "owed_next"     : arr_owed,
+                                "collected_next": arr_paid[j] - arr_paid[i],
+                              })
+
+    # Still in repayment at t: not yet defaulted, and something owed next month
+    mask_keep   = (arr_def_m[i] > arr_month[i]) & (arr_owed > 0.005)
+    return df_steps.loc[mask_keep].reset_index(drop=True)
+
+
+def fit(df_steps, as_of):
+    # (transition matrix, collection rate per state) from steps whose next month <= as_of
+    as_of_month     = risk_params.month_index(pd.Series([pd.Timestamp(as_of)]))[0]
+    df              = df_steps.loc[df_steps["month"] + 1 <= as_of_month]
+    n_states        = len(STATES)
+
+    arr_counts      = np.bincount(df["state"] * n_states + df["next_state"], minlength=n_states ** 2).reshape(n_states, n_states)
+    arr_counts[DEFAULT_STATE, DEFAULT_STATE] = 1
+    arr_rows        = arr_counts.sum(axis=1, keepdims=True)
+    # States never seen stay where they are
+    arr_transition  = np.where(arr_rows > 0, arr_counts / np.maximum(arr_rows, 1), np.eye(n_states))
+
+    arr_owed        = np.bincount(df["state"], weights=df["owed_next"], minlength=n_states)
+    arr_collected   = np.bincount(df["state"], weights=df["collected_next"], minlength=n_states)
+    arr_rate        = np.where(arr_owed > 0, arr_collected / np.maximum(arr_owed, 1e-9), 0.0)
+    arr_rate[DEFAULT_STATE] = 0.0
+
+    return arr_transition, arr_rate
+
+
+def due_grid(df_book, df_schedule, as_of, horizon_months):
+    # (book loan x month ahead) due_total, months ahead 1..horizon
+    as_of_month     = risk_params.month_index(pd.Series([pd.Timestamp(as_of)]))[0]
+    arr_book_id     = df_book["loan_id"].to_numpy()
+    arr_order       = np.argsort(arr_book_id, kind="stable")
+
+    arr_sched_id    = df_schedule["loan_id"].to_numpy()
+    arr_found       = np.minimum(np.searchsorted(arr_book_id, arr_sched_id, sorter=arr_order), len(arr_book_id) - 1)
+    arr_pos         = arr_order[arr_found]
+    arr_ahead       = risk_params.month_index(df_schedule["due_date"]) - as_of_month
+
+    mask            = (arr_book_id[arr_pos] == arr_sched_id) & (arr_ahead >= 1) & (arr_ahead <= horizon_months)
+    arr_cell        = arr_pos[mask] * horizon_months + arr_ahead[mask] - 1
+    return np.bincount(arr_cell, weights=df_schedule["due_total"].to_numpy()[mask],
+                       minlength=len(arr_book_id) * horizon_months).reshape(len(arr_book_id), horizon_months)
+
+
+def starting_state(df_book, df_delinquency, as_of):
+    # (state code, signed arrears) per book loan from its 01_4c row at the as_of month-end
+    month_start     = pd.Timestamp(as_of).to_period("M").to_timestamp()
+    df_now          = (df_delinquency
+                        .loc[df_delinquency["year_month"] == month_start]
+                        .set_index("loan_id")
+                        .reindex(df_book["loan_id"].to_numpy())
+                      )
+    arr_state       = pd.Categorical(df_now["dpd_bucket"].fillna("Current"), categories=STATES).codes.astype(np.int64)
+    arr_arrears     = (df_now["due_at_month_end"] - df_now["paid_at_month_end"]).fillna(0.0).to_numpy()
+    return arr_state, arr_arrears
+
+
+def run(arr_due, arr_state, arr_arrears, arr_transition, arr_rate):
+    # Loan-level expected collections, arrears and default probability per month ahead
+    n_loans, n_months   = arr_due.shape
+    arr_pi              = np.eye(len(STATES))[arr_state]
+    arr_owed_carry      = arr_arrears.astype(np.float64).copy()
+
+    arr_collected       = np.zeros((n_loans, n_months))
+    arr_arrears_out     = np.zeros((n_loans, n_months))
+    arr_default_p       = np.zeros((n_loans, n_months))
+
+    for k in range(n_months):
+        arr_alive       = 1.0 - arr_pi[:, DEFAULT_STATE]
+        arr_owed        = arr_due[:, k] + arr_owed_carry
+        arr_paid        = np.where(arr_owed > 0, (arr_pi @ arr_rate) * arr_owed, 0.0)
+        arr_owed_carry  = np.where(arr_owed > 0, arr_owed - arr_paid / np.maximum(arr_alive, 1e-12), arr_owed)
+
+        arr_pi          = arr_pi @ arr_transition
+
+        arr_collected[:, k]     = arr_paid
+        arr_arrears_out[:, k]   = np.maximum(arr_owed_carry, 0.0) * (1.0 - arr_pi[:, DEFAULT_STATE])
+        arr_default_p[:, k]     = arr_pi[:, DEFAULT_STATE]
+
+    return arr_collected, arr_arrears_out, arr_default_p
+
+
+def project(as_of=None, horizon_months=HORIZON_MONTHS, raw=None, df_delinquency=None, params=None):
+    # Expected inflows per month ahead x risk tier x channel for the book open at as_of.
+    # Returns (segment projection, loan-level frame, loan x month expected collections);
+    # params = (transition, rate) skips fitting.
+    raw             = dict(raw or {})
+    ex              = index.load_index(raw or None)
+    raw             = tables.load_raw_tables(["loans", "customers", "payments", "payment_schedule"], raw)
+    if df_delinquency is None:
+        df_delinquency = tables.load_generated("01_4c_delinquency_at_month_end", date_cols=["year_month", "month_end"])
+
+    as_of           = pd.Timestamp(as_of) if as_of is not None else stress.default_as_of()
+    idx_months      = stress.projection_months(as_of, horizon_months)
+
+    if params is None:
+        params = fit(monthly_steps(df_delinquency, raw["loans"]), as_of)
+    arr_transition, arr_rate = params
+
+    df_book         = stress.open_book(raw["loans"], raw["customers"], raw["payments"], as_of, ex)
+    df_book["acquisition_channel"] = (raw["customers"].set_index("customer_id")["acquisition_channel"]
+                                        .reindex(df_book["customer_id"].to_numpy()).to_numpy())
+
+    arr_due                     = due_grid(df_book, raw["payment_schedule"], as_of, horizon_months)
+    arr_state, arr_arrears      = starting_state(df_book, df_delinquency, as_of)
+    arr_collected, arr_arrears_end, arr_default_p = run(arr_due, arr_state, arr_arrears, arr_transition, arr_rate)
+
+    # Segment cells: (tier, channel) code x month ahead
+    arr_seg_code, df_segments   = _segment_codes(df_book)
+    n_seg           = len(df_segments)
+    arr_cell        = (arr_seg_code[:, None] * horizon_months + np.arange(horizon_months)[None, :]).ravel()
+
+    def by_cell(arr):
+        return np.bincount(arr_cell, weights=arr.ravel(), minlength=n_seg * horizon_months)
+
+    df_projection   = pd.DataFrame({
+                            "year_month"            : np.tile(idx_months, n_seg),
+                            "months_ahead"          : np.tile(np.arange(1, horizon_months + 1), n_seg),
+                            "risk_tier_at_signup"   : np.repeat(df_segments["risk_tier_at_signup"].to_numpy(), horizon_months),
+                            "acquisition_channel"   : np.repeat(df_segments["acquisition_channel"].to_numpy(), horizon_months),
+                            "n_open_loans"          : np.repeat(np.bincount(arr_seg_code, minlength=n_seg), horizon_months),
+                            "scheduled_due"         : by_cell(arr_due),
+                            "expected_collections"  : by_cell(arr_collected),
+                            "expected_arrears_end"  : by_cell(arr_arrears_end),
+                            "expected_defaulted_loans": by_cell(arr_default_p),
+                        })
+
+    df_loans_out    = df_book[["loan_id", "customer_id"] + SEGMENT_COLUMNS].copy()
+    df_loans_out["start_state"]             = np.array(STATES)[arr_state]
+    df_loans_out["start_arrears"]           = arr_arrears
+    df_loans_out["expected_collections"]    = arr_collected.sum(axis=1)
+
+    return df_projection.sort_values(["year_month"] + SEGMENT_COLUMNS).reset_index(drop=True), df_loans_out, arr_collected
+
+
+def _segment_codes(df_book):
+    # (tier, channel) code per book loan, and the segments in code order
+    df_keys         = df_book[SEGMENT_COLUMNS].astype(str)
+    arr_code        = df_keys.groupby(SEGMENT_COLUMNS, sort=True).ngroup().to_numpy()
+    df_segments     = df_keys.drop_duplicates().sort_values(SEGMENT_COLUMNS).reset_index(drop=True)
+    return arr_code, df_segments
+
+
+def actual_collections(df_delinquency, arr_loan_ids, as_of, horizon_months):
+    # (loan x month ahead) cash actually paid (01_4b increments), for backtests
+    as_of_month     = risk_params.month_index(pd.Series([pd.Timestamp(as_of)]))[0]
+    df              = df_delinquency.sort_values(["loan_id", "year_month"], kind="mergesort")
+    arr_loan        = df["loan_id"].to_numpy()
+    arr_ahead       = risk_params.month_index(df["year_month"]) - as_of_month
+    arr_paid        = df["paid_at_month_end"].to_numpy()
+    arr_increment   = np.where(np.r_[False, arr_loan[1:] == arr_loan[:-1]], arr_paid - np.r_[0.0, arr_paid[:-1]], arr_paid)
+
+    arr_order       = np.argsort(arr_loan_ids, kind="stable")
+    arr_found       = np.minimum(np.searchsorted(arr_loan_ids, arr_loan, sorter=arr_order), len(arr_loan_ids) - 1)
+    arr_pos         = arr_order[arr_found]
+    mask            = (arr_loan_ids[arr_pos] == arr_loan) & (arr_ahead >= 1) & (arr_ahead <= horizon_months)
+
+    return np.bincount(arr_pos[mask] * horizon_months + arr_ahead[mask] - 1, weights=arr_increment[mask],
+                       minlength=len(arr_loan_ids) * horizon_months).reshape(len(arr_loan_ids), horizon_months)
@@ -0,0 +1,236 @@
+import ast
+import functools
+import os
+
+from cica import paths
+
+# -----------------------------------------------------------
+# Chart specs: which script draws which charts from which inputs
+# -----------------------------------------------------------
+#
+# script    : file in /Python that draws the charts
+# inputs    : data files the charts depend on ("raw/<table>" or "generated/<output>")
+# charts    : chart names in /Charts, in the order the script calls plt.show()
+# outputs   : extra /Data_Generated files the script writes as a side effect
+#
+# modules is not written by hand: it is the cica import closure of the script,
+# found by walking the ast of the script and of every cica module it reaches
+# (function-level imports included). Their source is part of the fingerprint, so
+# a change anywhere in that closure re-renders the chart.
+
+CHART_SPECS = [
+    {
+        "script"    : "01_1_revenue_performance_and_outlook.py",
+        "inputs"    : ["generated/01_1_revenue_performance_and_outlook", "generated/01_5_forecast_backtest_scores"],
+        "charts"    : ["01_1_revenue_performance_and_outlook_a_STL", "01_1_revenue_performance_and_outlook_b_SARIMAX"],
+    },
+    {
+        "script"    : "01_2_scheduled_vs_actual_cash_flow.py",
+        "inputs"    : ["generated/01_2_scheduled_vs_actual_cash_flow"],
+        "charts"    : ["01_2_scheduled_vs_actual_cash_flow"],
+    },
+    {
+        "script"    : "01_3a_budget_vs_actual_on_revenue.py",
+        "inputs"    : ["generated/01_3a_actual_revenue", "raw/budget_plan_monthly"],
+        "charts"    : ["01_3a_budget_vs_actual_on_revenue"],
+    },
+    {
+        "script"    : "01_3b_budget_vs_actual_on_cash.py",
+        "inputs"    : ["generated/01_3b_actual_cash", "raw/budget_plan_monthly"],
+        "charts"    : ["01_3b_budget_vs_actual_on_cash"],
+    },
+    {
+        "script"    : "01_3c_budget_vs_actual_on_credit_loss.py",
+        "inputs"    : ["generated/01_3c_actual_loss", "raw/budget_plan_monthly"],
+        "charts"    : ["01_3c_budget_vs_actual_on_credit_loss"],
+    },
+    {
+        "script"    : "01_4_portfolio_delinquency_trend.py",
+        "inputs"    : ["generated/01_4d_portfolio_delinquency_trend"],
+        "charts"    : ["01_4a_delinquency_vs_default", "01_4b_dpd_bucket_shares_overtime"],
+    },
+    {
+        "script"    : "01_5_forecast_backtest.py",
+        "inputs"    : ["generated/01_3a_actual_revenue", "generated/01_3b_actual_cash", "generated/01_3c_actual_loss"],
+        "charts"    : ["01_5_forecast_backtest"],
+        "outputs"   : ["01_5_forecast_backtest_scores"],
+    },
+    {
+        "script"    : "02_1_customer_activation_timing.py",
+        "inputs"    : ["generated/02_1_customer_activation_timing"],
+        "charts"    : ["02_1_customer_activation_timing"],
+    },
+    {
+        "script"    : "02_1b_activation_percentile_sketches.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/dim_month", "generated/02_1_customer_activation_timing"],
+        "charts"    : ["02_1b_activation_percentile_sketches"],
+        "outputs"   : ["02_1b_activation_percentiles"],
+    },
+    {
+        "script"    : "02_2_borrower_inactivity_and_churn_risk.py",
+        "inputs"    : ["generated/02_2_borrower_inactivity_and_churn_risk"],
+        "charts"    : [f"02_2{s}_borrower_inactivity_and_churn_risk" for s in "abcde"],
+    },
+    {
+        "script"    : "02_4_value_concentration.py",
+        "inputs"    : ["generated/02_4_value_concentration"],
+        "charts"    : ["02_4_value_concentration_pareto_curve"],
+    },
+    {
+        "script"    : "02_5_signup_cohort_matrix.py",
+        "inputs"    : ["raw/customers", "raw/loans", "raw/payments", "raw/dim_month",
+                       "generated/01_3a_actual_revenue", "generated/01_3c_actual_loss"],
+        "charts"    : ["02_5_signup_cohort_matrix"],
+        "outputs"   : ["02_5_signup_cohort_matrix"],
+    },
+    {
+        "script"    : "03_1_probability_of_default.py",
+        "inputs"    : ["generated/03_1_probability_of_default", "raw/loans", "raw/customers", "raw/payments",
+                       "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_1a_pd_by_risk_tier", "03_1b_pd_by_vintage"],
+    },
+    {
+        "script"    : "03_2_exposure_at_default.py",
+        "inputs"    : ["generated/03_2_exposure_at_default"],
+        "charts"    : ["03_2a_ead_by_risk_tier", "03_2b_ead_by_vintage"],
+    },
+    {
+        "script"    : "03_3_loss_given_default.py",
+        "inputs"    : ["generated/03_3_loss_given_default", "raw/loans", "raw/customers", "raw/payments",
+                       "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_3a_lgd_by_risk_tier", "03_3b_lgd_by_vintage"],
+    },
+    {
+        "script"    : "03_4a_cumulative_default_rate.py",
+        "inputs"    : ["generated/03_4a_cumulative_default_rate", "raw/loans", "raw/customers", "raw/payments",
+                       "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_4a_cumulative_default_rate"],
+    },
+    {
+        "script"    : "03_4b_cumulative_loss_rate.py",
+        "inputs"    : ["generated/03_4b_cumulative_loss_rate", "raw/loans", "raw/customers", "raw/payments",
+                       "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_4b_cumulative_loss_rate"],
+    },
+    {
+        "script"    : "03_5_credit_policy_thresholds.py",
+        "inputs"    : ["raw/applications", "raw/customers", "raw/loans", "raw/payment_schedule",
+                       "generated/03_1_probability_of_default", "generated/03_3_loss_given_default"],
+        "charts"    : ["03_5_credit_policy_thresholds"],
+        "outputs"   : ["03_5a_policy_threshold_sweep", "03_5b_policy_band_sweep"],
+    },
+    {
+        "script"    : "03_6a_model_stability_monitoring.py",
+        "inputs"    : ["raw/applications", "raw/customers", "raw/loans"],
+        "charts"    : ["03_6a_model_stability_monitoring"],
+        "outputs"   : ["03_6a_model_stability_monitoring"],
+    },
+    {
+        "script"    : "03_6b_model_calibration_discrimination.py",
+        "inputs"    : ["raw/applications", "raw/customers", "raw/loans", "raw/payment_schedule",
+                       "generated/03_1_probability_of_default", "generated/03_3_loss_given_default"],
+        "charts"    : ["03_6b_model_calibration_discrimination"],
+        "outputs"   : ["03_6b_model_calibration_discrimination", "03_6c_model_reliability_deciles"],
+    },
+    {
+        "script"    : "03_7_point_in_time_backtest.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "generated/03_1_probability_of_default",
+                       "generated/03_2_exposure_at_default", "generated/03_3_loss_given_default",
+                       "generated/03_4a_cumulative_default_rate", "generated/03_4b_cumulative_loss_rate",
+                       "generated/02_1_customer_activation_timing", "generated/02_2_borrower_inactivity_and_churn_risk",
+                       "generated/02_3a_customer_LTV_180d", "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_7_point_in_time_backtest"],
+        "outputs"   : ["03_7_point_in_time_sweep"],
+    },
+    {
+        "script"    : "03_8_survival_analysis.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "raw/payment_schedule", "raw/dim_month",
+                       "generated/02_2_borrower_inactivity_and_churn_risk", "generated/03_1_probability_of_default"],
+        "charts"    : ["03_8_survival_analysis"],
+        "outputs"   : ["03_8_survival_curves", "03_8_survival_horizons"],
+    },
+    {
+        "script"    : "03_9_sampled_rates_with_error_bars.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/applications", "raw/payments", "raw/payment_schedule", "raw/dim_month"],
+        "charts"    : ["03_9_sampled_rates_with_error_bars"],
+        "outputs"   : ["03_9_sampled_rates"],
+    },
+    {
+        "script"    : "04_1_macro_stress_projection.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "raw/payment_schedule", "raw/macro_monthly", "raw/dim_month",
+                       "generated/03_1_probability_of_default", "generated/03_3_loss_given_default"],
+        "charts"    : ["04_1_macro_stress_projection"],
+        "outputs"   : ["04_1_macro_stress_projection"],
+    },
+    {
+        "script"    : "04_2_monte_carlo_loss_distribution.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "raw/payment_schedule", "raw/macro_monthly", "raw/dim_month",
+                       "generated/03_1_probability_of_default", "generated/03_3_loss_given_default"],
+        "charts"    : ["04_2_monte_carlo_loss_distribution"],
+        "outputs"   : ["04_2_monte_carlo_loss_distribution"],
+    },
+    {
+        "script"    : "04_3_expected_credit_loss.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "raw/payment_schedule",
+                       "generated/01_4c_delinquency_at_month_end",
+                       "generated/03_1_probability_of_default", "generated/03_3_loss_given_default"],
+        "charts"    : ["04_3_expected_credit_loss"],
+        "outputs"   : ["04_3a_ecl_monthly_balance", "04_3b_ecl_stage_migration"],
+    },
+    {
+        "script"    : "04_4_forward_cash_flow_projection.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payments", "raw/payment_schedule",
+                       "generated/01_4c_delinquency_at_month_end"],
+        "charts"    : ["04_4_forward_cash_flow_projection"],
+        "outputs"   : ["04_4_forward_cash_flow_projection"],
+    },
+    {
+        "script"    : "04_5_amortization_what_if.py",
+        "inputs"    : ["raw/loans", "raw/customers", "raw/payment_schedule"],
+        "charts"    : ["04_5_amortization_what_if"],
+        "outputs"   : ["04_5_amortization_what_if"],
+    },
+]
+
+
+# -----------------------------------------------------------
+# cica import closure
+# -----------------------------------------------------------
+
+def imported_modules(tree):
+    # cica module names imported anywhere in a parsed file
+    set_names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            set_names |= {alias.name.split(".")[1] for alias in node.names if alias.name.startswith("cica.")}
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if node.level == 0 and module == "cica" or node.level > 0 and not module:
+                set_names |= {alias.name for alias in node.names}
+            elif node.level == 0 and module.startswith("cica."):
+                set_names.add(module.split(".")[1])
+            elif node.level > 0:
+                set_names.add(module.split(".")[0])
+    return set_names
+
+
+@functools.lru_cache(maxsize=None)
+def file_imports(path):
+    with open(path, encoding="utf-8") as f:
+        return frozenset(imported_modules(ast.parse(f.read(), filename=path)))
+
+
+def module_closure(script):
+    set_seen    = set()
+    list_todo   = [os.path.join(paths.script_dir, script)]
+    while list_todo:
+        for name in file_imports(list_todo.pop()) - set_seen:
+            path_module = os.path.join(paths.package_dir, f"{name}.py")
+            if os.path.exists(path_module):
+                set_seen.add(name)
+                list_todo.append(path_module)
+    return sorted(set_seen)
+
+
+for spec in CHART_SPECS:
+    spec["modules"] = module_closure(spec["script"])
@@ -0,0 +1,289 @@
+import time
+
+TIME_START = time.perf_counter()
+
+import argparse
+import os
+import subprocess
+import sys
+
+from cica import paths
+
+# -----------------------------------------------------------
+# cica — one command line for the numbered scripts
+# -----------------------------------------------------------
+#
+# Run from /Python:
+#
+#   python -m cica list                 every script, with its chart spec
+#   python -m cica run 03_1             one script (any prefix works: 03_, 04_2)
+#   python -m cica run all              every numbered script, in order
+#   python -m cica run 03_1 --save      headless, write Charts/ instead of showing
+#   python -m cica validate             key / integrity checks on the raw tables
+#   python -m cica build                validate, refresh the Parquet exports, then stale charts
+#   python -m cica export               partitioned Parquet copies of 01_4a / b / c (cica.partitions)
+#   python -m cica portfolios A B       build several portfolio roots on one worker pool (cica.portfolios)
+#   python -m cica sql 03_3             run SQL/ queries, unchanged upstream served from cache (cica.querycache)
+#   python -m cica asof 2024-06-30      02_2 / 03_x outputs as they stood on that date
+#   python -m cica imports              import-time budget of the heavy libraries
+#   python -m cica memory               raw tables as frames vs compact columns
+#
+# This module only pulls in the standard library and cica.paths. numpy, pandas,
+# matplotlib, statsmodels and scipy are imported by the scripts / cica modules
+# that actually use them, so "python -m cica list" starts in a few tens of ms.
+
+STARTUP_BUDGET_SECONDS  = 0.25
+HEAVY_MODULES           = [
+    "numpy",
+    "pandas",
+    "matplotlib.pyplot",
+    "scipy.special",
+    "statsmodels.tsa.seasonal",
+    "statsmodels.tsa.statespace.sarimax",
+]
+
+
+def list_scripts():
+    return sorted(f for f in os.listdir(paths.script_dir) if f[:2].isdigit() and f.endswith(".py"))
+
+
+def resolve_scripts(list_names):
+    list_all = list_scripts()
+    if "all" in list_names:
+        return list_all
+
+    list_scripts_out = []
+    for name in list_names:
+        list_match = [f for f in list_all if f.startswith(name)]
+        if not list_match:
+            raise SystemExit(f"cica: no script matches '{name}' (see 'python -m cica list')")
+        list_scripts_out += [f for f in list_match if f not in list_scripts_out]
+    return list_scripts_out
+
+
+def spec_for(script):
+    from cica.charts import CHART_SPECS
+    return next((s for s in CHART_SPECS if s["script"] == script), None)
+
+
+def run_script(script, save=False):
+    import runpy
+
+    spec = spec_for(script)
+    if save and spec is not None:
+        from cica import render
+        return render.render_spec(spec, quiet=False)[2]
+
+    if paths.script_dir not in sys.path:
+        sys.path.insert(0, paths.script_dir)
+
+    time_start = time.perf_counter()
+    runpy.run_path(os.path.join(paths.script_dir, script), run_name="__main__")
+    return time.perf_counter() - time_start
+
+
+def import_seconds(module_name):
+    # Fresh interpreter per module, so nothing is already in sys.modules
+    code = f"import time; t = time.perf_counter(); import {module_name}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+
+def cmd_list(args):
+    for script in list_scripts():
+        spec = spec_for(script)
+        print(f"{script:<48} {len(spec['charts']) if spec else 0} chart(s)")
+
+
+def cmd_run(args):
+    for script in resolve_scripts(args.names):
+        print(f"--- {script}")
+        seconds = run_script(script, save=args.save)
+        print(f"--- {script} done in {seconds:.2f}s")
+
+
+def run_validation(save=False):
+    # Prints the failing checks; returns the number of error-severity violations
+    from cica import tables, validate
+
+    time_start              = time.perf_counter()
+    df_summary, df_violations = validate.validate()
+    df_failed               = df_summary.loc[df_summary["n_violations"] > 0]
+
+    if save:
+        tables.save_generated(df_summary, "00_data_validation_summary")
+        tables.save_generated(df_violations, "00_data_validation_violations")
+
+    print(f"validation: {len(df_summary)} checks, {len(df_failed)} with violations, "
+          f"{validate.n_errors(df_summary)} error rows, {time.perf_counter() - time_start:.2f}s")
+    if len(df_failed):
+        print(df_failed[["check_name", "severity", "table_name", "detail", "n_violations"]].to_string(index=False))
+    return validate.n_errors(df_summary)
+
+
+def cmd_validate(args):
+    if run_validation(save=args.save):
+        raise SystemExit(1)
+
+
+def cmd_build(args):
+    from cica import render
+
+    if not args.skip_validation and run_validation():
+        raise SystemExit("cica: raw tables failed validation, nothing rendered (--skip-validation to override)")
+
+    run_export()
+
+    time_start = time.perf_counter()
+    list_rendered, list_skipped = render.render_all(args.force, args.workers, args.only)
+    print(f"{len(list_rendered)} rendered, {len(list_skipped)} up to date, {time.perf_counter() - time_start:.2f}s")
+
+
+def run_export(force=False):
+    from cica import partitions
+
+    time_start  = time.perf_counter()
+    dict_written = partitions.export(force=force)
+    for output_name, n_partitions in dict_written.items():
+        print(f"export: {output_name} -> {n_partitions} month partitions")
+    print(f"export: {len(dict_written)} dataset(s) rewritten, "
+          f"{len(partitions.PARTITIONED_OUTPUTS) - len(dict_written)} up to date, {time.perf_counter() - time_start:.2f}s")
+
+
+def cmd_export(args):
+    run_export(force=args.force)
+
+
+def cmd_portfolios(args):
+    from cica import portfolios
+
+    time_start  = time.perf_counter()
+    try:
+        list_rows = portfolios.run(args.roots, args.workers, args.reference, args.force, args.only)
+    except ValueError as exc:
+        raise SystemExit(f"cica: {exc}") from None
+    for row in list_rows:
+        print(f"{row['portfolio']:<24} {row['rendered']} rendered, {row['skipped']} up to date, {row['failed']} failed, "
+              f"{row['n_errors']} validation errors")
+
+    if args.out:
+        list_names = portfolios.consolidate(args.roots, args.out)
+        print(f"consolidated {len(list_names)} tables into {args.out}")
+    print(f"{len(list_rows)} portfolios in {time.perf_counter() - time_start:.2f}s")
+
+    if any(row["n_errors"] or row["failed"] for row in list_rows):
+        raise SystemExit(1)
+
+
+def cmd_sql(args):
+    from cica import querycache
+
+    list_all    = querycache.query_names()
+    list_names  = []
+    for name in args.names:
+        list_match = [q for q in list_all if q.startswith(name)]
+        if not list_match:
+            raise SystemExit(f"cica: no SQL file matches '{name}'")
+        list_names += [q for q in list_match if q not in list_names]
+
+    if args.plan:
+        for row in querycache.plan(list_names or None, args.force):
+            print(f"{row['name']:<44} {'cached' if row['cached'] else 'execute':<9} {row['key'][:12]}")
+        return
+
+    budget      = querycache.CACHE_BUDGET_BYTES if args.budget_mb is None else int(args.budget_mb * 2**20)
+    time_start  = time.perf_counter()
+    list_rows   = querycache.run(list_names or None, force=args.force, budget_bytes=budget)
+    n_executed  = sum(row["status"] == "executed" for row in list_rows)
+    print(f"sql: {n_executed} executed, {len(list_rows) - n_executed} from cache, {time.perf_counter() - time_start:.2f}s")
+
+
+def cmd_asof(args):
+    from cica import asof
+
+    ix = asof.EventIndex()
+    for date in args.dates:
+        print(f"as of {date}: {asof.save_snapshot(date, ix)}")
+
+
+def cmd_imports(args):
+    for module_name in HEAVY_MODULES:
+        seconds = import_seconds(module_name)
+        print(f"{module_name:<40} {'not installed' if seconds is None else f'{seconds:.3f}s'}")
+
+
+def cmd_memory(args):
+    from cica import compact
+
+    print(compact.memory_report(args.tables or None).to_string(index=False))
+
+
+def build_parser():
+    parser      = argparse.ArgumentParser(prog="cica", description="Run the CICA Prime analysis scripts.")
+    parser.add_argument("--timings", action="store_true", help="print CLI startup time against its budget")
+    subparsers  = parser.add_subparsers(dest="command", required=True)
+
+    p_list      = subparsers.add_parser("list", help="list the numbered scripts")
+    p_list.set_defaults(func=cmd_list)
+
+    p_run       = subparsers.add_parser("run", help="run scripts by prefix, or 'all'")
+    p_run.add_argument("names", nargs="+", help="script prefixes, e.g. 03_1 04_ all")
+    p_run.add_argument("--save", action="store_true", help="headless: save charts to /Charts instead of showing them")
+    p_run.set_defaults(func=cmd_run)
+
+    p_build     = subparsers.add_parser("build", help="re-render charts whose inputs changed")
+    p_build.add_argument("only", nargs="*", help="spec name prefixes, e.g. 03_1 04_")
+    p_build.add_argument("--force", action="store_true", help="re-render even when the fingerprint matches")
+    p_build.add_argument("--workers", type=int, default=None)
+    p_build.add_argument("--skip-validation", action="store_true", help="render even if the raw tables fail validation")
+    p_build.set_defaults(func=cmd_build)
+
+    p_validate  = subparsers.add_parser("validate", help="key and integrity checks on the raw tables")
+    p_validate.add_argument("--save", action="store_true", help="write the summary and violations to /Data_Generated")
+    p_validate.set_defaults(func=cmd_validate)
+
+    p_export    = subparsers.add_parser("export", help="write 01_4a / b / c as Parquet datasets partitioned by month")
+    p_export.add_argument("--force", action="store_true", help="rewrite even when the CSV has not changed")
+    p_export.set_defaults(func=cmd_export)
+
+    p_books     = subparsers.add_parser("portfolios", help="build several portfolio roots on one shared worker pool")
+    p_books.add_argument("roots", nargs="+", help="portfolio folders, each with Data_RAW / Data_Generated / Charts")
+    p_books.add_argument("--only", nargs="*", default=None, help="spec name prefixes, e.g. 03_1 04_")
+    p_books.add_argument("--workers", type=int, default=None)
+    p_books.add_argument("--reference", default=None, help="root holding the shared reference tables (default: this repo)")
+    p_books.add_argument("--out", default=None, help="folder for the consolidated tables, one portfolio column each")
+    p_books.add_argument("--force", action="store_true", help="re-render even when the fingerprint matches")
+    p_books.set_defaults(func=cmd_portfolios)
+
+    p_sql       = subparsers.add_parser("sql", help="run SQL/ queries through the result cache")
+    p_sql.add_argument("names", nargs="*", help="query prefixes; their upstream queries are included (default: all)")
+    p_sql.add_argument("--plan", action="store_true", help="only show which queries would run and which are cached")
+    p_sql.add_argument("--force", action="store_true", help="execute even when the cache holds the result")
+    p_sql.add_argument("--budget-mb", type=float, default=None, help="disk budget of the result cache (default 2 GB)")
+    p_sql.set_defaults(func=cmd_sql)
+
+    p_asof      = subparsers.add_parser("asof", help="write the 02_2 / 03_x outputs as of one or more dates")
+    p_asof.add_argument("dates", nargs="+", help="as_of dates, e.g. 2024-06-30")
+    p_asof.set_defaults(func=cmd_asof)
+
+    p_imports   = subparsers.add_parser("imports", help="time the heavy library imports")
+    p_imports.set_defaults(func=cmd_imports)
+
+    p_memory    = subparsers.add_parser("memory", help="bytes per raw table as frames vs compact columns")
+    p_memory.add_argument("tables", nargs="*", help="raw table names (default: all)")
+    p_memory.set_defaults(func=cmd_memory)
+
+    return parser
+
+
+def main(argv=None):
+    args            = build_parser().parse_args(argv)
+    startup_seconds = time.perf_counter() - TIME_START
+
+    if args.timings:
+        flag = "" if startup_seconds <= STARTUP_BUDGET_SECONDS else "  OVER BUDGET"
+        print(f"cica startup {startup_seconds:.3f}s (budget {STARTUP_BUDGET_SECONDS:.2f}s){flag}")
+
+    args.func(args)
@@ -0,0 +1,301 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cica import compact, index, paths, tables
+
+# -----------------------------------------------------------
+# Signup-cohort triangles: cohort (signup month) x months since signup
+# -----------------------------------------------------------
+#
+# Every customer gets a signup-month code c on the dim_month spine and every
+# event a calendar-month code t, so the event's cell is (c, t - c). Each metric
+# is one np.bincount over the flat cell index c * N_OFFSETS + (t - c):
+#
+#   active_borrowers    distinct customers that originated a loan or made a
+#                       scheduled / partial payment in the month
+#   originations        loans originated              originated_principal: principal
+#   revenue             paid_fee_interest of scheduled / partial payments (01_3a)
+#   net_loss            principal unpaid at default, by default month, less
+#                       recovery payment_amount by payment month (01_3c)
+#
+# Distinct customers per cell come from a dense (customer, month) bitmap rather
+# than a sort. Money is summed in cents, the way the Postgres numeric columns hold it.
+#
+# A matrix covers calendar months up to `through`. update(raw, through) only
+# bins events with through_old < t <= through, and those all fall on the new
+# anti-diagonals (c + offset = t); rows for new signup cohorts are appended.
+# The persisted matrix therefore grows by one diagonal per month instead of
+# being rebuilt. Cells past the diagonal (c + offset > through) are not
+# observed yet and come out as NaN in to_frame().
+#
+# The saved matrix carries two fingerprints. `signature` is the size/mtime of
+# the raw CSVs: while it holds, load_matrix() does not read them at all.
+# `covered` is a hash of the rows the matrix was binned from, i.e. those dated
+# on or before its last month (customers by signup_date, loans by
+# origination_date with default_date only once it has happened, payments by
+# payment_date, and the dim_month spine). A new month of data changes the CSVs
+# but not that slice, so only its diagonal is appended; a restated row inside
+# the slice changes `covered` and the matrix is rebuilt from scratch.
+#
+# update() only compacts the payments that can reach the new diagonals: those
+# dated after the last covered month, plus the earlier ones of loans that
+# default inside the new months (their principal unpaid at default). Loans and
+# payments are tied to their customer through cica.index.
+#
+# A handful of loans originate a few days before their customer's signup_date
+# (see cica.validate); their events would land on a negative offset and are
+# counted at offset 0 instead.
+
+MATRIX_PATH         = os.path.join(paths.data_dir, ".cohort_matrix.npz")
+MATRIX_TABLES       = ["customers", "loans", "payments", "dim_month"]
+METRICS             = ["active_borrowers", "originations", "originated_principal", "revenue", "net_loss"]
+MONEY_METRICS       = ["originated_principal", "revenue", "net_loss"]
+REVENUE_TYPES       = ["scheduled", "partial"]
+RECOVERY_TYPE       = "recovery"
+
+
+def _month_of(spine, srs_dates):
+    return spine.month_of_day(compact.to_days(srs_dates)).astype(np.int64)
+
+
+def _events(raw, spine, month_from, month_through, ex):
+    # (customer row, calendar month, {metric: weight}) arrays for events in (month_from, month_through];
+    # customer rows are positions in raw["customers"], which ex must be built over
+    ct_customers    = compact.compact_table(raw["customers"], "customers", spine)
+    ct_loans        = compact.compact_table(raw["loans"], "loans", spine)
+
+    # Payments that can reach the window: dated in it, or paid before a default that falls in it
+    df_payments     = raw["payments"]
+    arr_def_in      = _month_of(spine, raw["loans"]["default_date"])
+    arr_def_loans   = raw["loans"]["loan_id"].to_numpy()[(arr_def_in > month_from) & (arr_def_in <= month_through)]
+    mask_pay_needed = ((_month_of(spine, df_payments["payment_date"]) > month_from)
+                       | np.isin(df_payments["loan_id"].to_numpy(), arr_def_loans))
+    ct_payments     = compact.compact_table(df_payments.loc[mask_pay_needed].reset_index(drop=True), "payments", spine)
+
+    def in_window(arr_month):
+        arr_month = arr_month.astype(np.int64)
+        return (arr_month > month_from) & (arr_month <= month_through) & (arr_month != compact.MISSING_MONTH)
+
+    list_labels     = ct_payments.labels["payment_type"]
+    arr_type        = ct_payments["payment_type"]
+    mask_revenue    = np.isin(arr_type, [list_labels.index(t) for t in REVENUE_TYPES if t in list_labels])
+    mask_recovery   = arr_type == (list_labels.index(RECOVERY_TYPE) if RECOVERY_TYPE in list_labels else -1)
+
+    arr_pay_loan    = ex.loan_rows(ct_payments["loan_id"])
+    arr_pay_cust    = ex.customer_rows(ct_loans["customer_id"][arr_pay_loan])
+    arr_pay_month   = spine.month_of_day(ct_payments["payment_date"]).astype(np.int64)
+    arr_pay_day     = ct_payments["payment_date"].astype(np.int64)
+    arr_fee_cents   = np.where(ct_payments["paid_fee_interest"] == compact.MISSING_CENTS, 0, ct_payments["paid_fee_interest"]).astype(np.int64)
+    arr_prin_cents  = np.where(ct_payments["paid_principal"] == compact.MISSING_CENTS, 0, ct_payments["paid_principal"]).astype(np.int64)
+    arr_amt_cents   = np.where(ct_payments["payment_amount"] == compact.MISSING_CENTS, 0, ct_payments["payment_amount"]).astype(np.int64)
+
+    arr_loan_cust   = ex.customer_rows(ct_loans["customer_id"])
+    arr_orig_month  = spine.month_of_day(ct_loans["origination_date"]).astype(np.int64)
+    arr_def_day     = ct_loans["default_date"].astype(np.int64)
+    arr_def_month   = spine.month_of_day(ct_loans["default_date"]).astype(np.int64)
+    arr_principal   = ct_loans["principal"].astype(np.int64)
+
+    # Principal unpaid at default: scheduled / partial principal paid on or before default_date
+    mask_pre_def    = mask_revenue & (arr_pay_day <= arr_def_day[arr_pay_loan])
+    arr_paid_pre    = np.bincount(arr_pay_loan[mask_pre_def], weights=arr_prin_cents[mask_pre_def], minlength=len(arr_principal))
+    arr_unpaid      = arr_principal - arr_paid_pre
+
+    list_parts = []
+
+    mask = in_window(arr_orig_month)
+    list_parts.append((arr_loan_cust[mask], arr_orig_month[mask], {
+                            "active_borrowers"      : None,
+                            "originations"          : np.ones(mask.sum()),
+                            "originated_principal"  : arr_principal[mask],
+                      }))
+
+    mask = mask_revenue & in_window(arr_pay_month)
+    list_parts.append((arr_pay_cust[mask], arr_pay_month[mask], {
+                            "active_borrowers"      : None,
+                            "revenue"               : arr_fee_cents[mask],
+                      }))
+
+    mask = (arr_def_day != compact.MISSING_DAY) & in_window(arr_def_month)
+    list_parts.append((arr_loan_cust[mask], arr_def_month[mask], {"net_loss": arr_unpaid[mask]}))
+
+    mask = mask_recovery & in_window(arr_pay_month)
+    list_parts.append((arr_pay_cust[mask], arr_pay_month[mask], {"net_loss": -arr_amt_cents[mask]}))
+
+    arr_signup      = spine.month_of_day(ct_customers["signup_date"]).astype(np.int64)
+    return arr_signup, list_parts
+
+
+class CohortMatrix:
+
+    def __init__(self, spine=None, signature="", covered=""):
+        self.spine      = spine or compact.MonthSpine()
+        self.signature  = signature
+        self.covered    = covered
+        self.through    = -1
+        self.cohort_size = np.zeros(0, dtype=np.int64)
+        self.values     = {metric: np.zeros((0, 0)) for metric in METRICS}
+
+    def n_months(self):
+        return self.through + 1
+
+    def _grow(self, n_months):
+        # Square (cohort x offset) matrices big enough for n_months calendar months
+        for metric, arr in self.values.items():
+            arr_new = np.zeros((n_months, n_months))
+            arr_new[:arr.shape[0], :arr.shape[1]] = arr
+            self.values[metric] = arr_new
+
+    def month_through(self, through=None):
+        return self.spine.n_months - 1 if through is None else self.spine.month_number(through)
+
+    def update(self, raw=None, through=None, ex=None):
+        # Adds calendar months (self.through, through]; returns the number of months added.
+        # ex defaults to an index over raw (the saved one when raw is None).
+        month_through = self.month_through(through)
+        if month_through <= self.through:
+            return 0
+
+        ex          = ex or index.load_index(raw)
+        raw         = tables.load_raw_tables(["customers", "loans", "payments"], raw)
+        arr_signup, list_parts = _events(raw, self.spine, self.through, month_through, ex)
+        n_months    = month_through + 1
+        self._grow(n_months)
+
+        # Cohort sizes: customers that signed up by the new through month (rows only ever grow)
+        mask_signed         = (arr_signup >= 0) & (arr_signup <= month_through)
+        self.cohort_size    = np.bincount(arr_signup[mask_signed], minlength=n_months)
+
+        for arr_cust, arr_month, dict_weights in list_parts:
+            arr_cohort  = arr_signup[arr_cust]
+            mask_cohort = (arr_cohort >= 0) & (arr_cohort <= month_through)
+            arr_cohort  = arr_cohort[mask_cohort]
+            arr_offset  = np.maximum(arr_month[mask_cohort] - arr_cohort, 0)
+            arr_cell    = arr_cohort * n_months + arr_offset
+
+            for metric, arr_weight in dict_weights.items():
+                if arr_weight is None:
+                    continue
+                self.values[metric] += np.bincount(arr_cell, weights=arr_weight[mask_cohort],
+                                                   minlength=n_months * n_months).reshape(n_months, n_months)
+
+        # Active borrowers: dense (customer, month) bitmap over the new months only
+        n_new       = month_through - self.through
+        arr_seen    = np.zeros(len(arr_signup) * n_new, dtype=bool)
+        for arr_cust, arr_month, dict_weights in list_parts:
+            if "active_borrowers" in dict_weights:
+                arr_seen[arr_cust * n_new + (arr_month - self.through - 1)] = True
+
+        arr_key     = np.flatnonzero(arr_seen)
+        arr_cust    = arr_key // n_new
+        arr_month   = arr_key % n_new + self.through + 1
+        arr_cohort  = arr_signup[arr_cust]
+        mask_cohort = (arr_cohort >= 0) & (arr_cohort <= month_through)
+        arr_cell    = arr_cohort[mask_cohort] * n_months + np.maximum(arr_month[mask_cohort] - arr_cohort[mask_cohort], 0)
+        self.values["active_borrowers"] += np.bincount(arr_cell, minlength=n_months * n_months).reshape(n_months, n_months)
+
+        self.through = month_through
+        return n_new
+
+    # --- views ---------------------------------------------------------------
+
+    def matrix(self, metric):
+        # (cohort x offset) with unobserved cells as NaN; money in currency units
+        arr         = self.values[metric] / (100.0 if metric in MONEY_METRICS else 1.0)
+        arr_c, arr_k = np.indices(arr.shape)
+        return np.where(arr_c + arr_k <= self.through, arr, np.nan)
+
+    def by_calendar_month(self, metric):
+        # Column sums along the diagonals: metric per calendar month over all cohorts
+        arr         = np.nan_to_num(self.matrix(metric))
+        arr_c, arr_k = np.indices(arr.shape)
+        return np.bincount((arr_c + arr_k).ravel(), weights=arr.ravel(), minlength=self.n_months())[:self.n_months()]
+
+    def to_frame(self):
+        # Long table: one row per observed (cohort, months_since_signup) cell
+        arr_c, arr_k    = np.indices((self.n_months(), self.n_months()))
+        mask            = (arr_c + arr_k) <= self.through
+        arr_c, arr_k    = arr_c[mask], arr_k[mask]
+
+        df = pd.DataFrame({
+                            "cohort_month"          : self.spine.to_month_start(arr_c).to_numpy(),
+                            "months_since_signup"   : arr_k,
+                            "year_month"            : self.spine.to_month_start(arr_c + arr_k).to_numpy(),
+                            "cohort_size"           : self.cohort_size[arr_c],
+                          })
+        for metric in METRICS:
+            df[metric] = self.matrix(metric)[arr_c, arr_k]
+
+        df["retention_rate"]        = df["active_borrowers"] / df["cohort_size"].replace(0, np.nan)
+        df["cum_revenue_per_customer"] = (df.groupby("cohort_month")["revenue"].cumsum() / df["cohort_size"].replace(0, np.nan))
+        for col in MONEY_METRICS:
+            df[col] = df[col].round(2)
+        return df
+
+    # --- persistence ---------------------------------------------------------
+
+    def save(self, path=MATRIX_PATH):
+        np.savez(path, signature=np.array(self.signature), covered=np.array(self.covered), through=np.array(self.through),
+                 cohort_size=self.cohort_size, **self.values)
+
+    @classmethod
+    def load(cls, path=MATRIX_PATH, spine=None):
+        out = cls(spine)
+        with np.load(path) as npz:
+            out.signature   = str(npz["signature"]) if "signature" in npz.files else ""
+            out.covered     = str(npz["covered"]) if "covered" in npz.files else ""
+            out.through     = int(npz["through"])
+            out.cohort_size = npz["cohort_size"]
+            out.values      = {metric: npz[metric] for metric in METRICS}
+        return out
+
+
+def source_signature():
+    list_parts = []
+    for table_name in MATRIX_TABLES:
+        stat = os.stat(paths.raw_path(table_name))
+        list_parts.append(f"{table_name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(list_parts)
+
+
+def covered_digest(raw, spine, month_through):
+    # Order-free hash of the raw rows dated on or before month_through, as the matrix sees them
+    df_customers    = raw["customers"]
+    df_loans        = raw["loans"]
+    df_payments     = raw["payments"]
+
+    df_loans_seen   = df_loans.loc[_month_of(spine, df_loans["origination_date"]) <= month_through,
+                                   ["loan_id", "customer_id", "origination_date", "principal", "default_date"]].copy()
+    df_loans_seen["default_date"] = df_loans_seen["default_date"].where(
+                                        _month_of(spine, df_loans_seen["default_date"]) <= month_through)
+
+    list_frames = [
+        pd.DataFrame({"month_start": spine.to_month_start(np.arange(month_through + 1))}),
+        df_customers.loc[_month_of(spine, df_customers["signup_date"]) <= month_through, ["customer_id", "signup_date"]],
+        df_loans_seen,
+        df_payments.loc[_month_of(spine, df_payments["payment_date"]) <= month_through,
+                        ["loan_id", "payment_date", "payment_type", "payment_amount", "paid_principal", "paid_fee_interest"]],
+    ]
+    return "|".join(f"{len(df)}:{int(pd.util.hash_pandas_object(df, index=False).to_numpy().sum()):016x}"
+                    for df in list_frames)
+
+
+def load_matrix(through=None, raw=None):
+    # Saved matrix extended by any calendar months it does not cover yet. The raw tables are
+    # only read when their files changed or months are missing; a restated covered slice rebuilds.
+    signature   = source_signature()
+    mx          = CohortMatrix.load() if os.path.exists(MATRIX_PATH) else None
+    if mx is not None and raw is None and mx.signature == signature and mx.month_through(through) <= mx.through:
+        return mx
+
+    ex          = index.load_index(raw)
+    raw         = tables.load_raw_tables(["customers", "loans", "payments"], raw)
+    if mx is None or mx.covered != covered_digest(raw, mx.spine, mx.through):
+        mx = CohortMatrix()
+
+    mx.update(raw, through=through, ex=ex)
+    mx.signature    = signature
+    mx.covered      = covered_digest(raw, mx.spine, mx.through)
+    mx.save()
+    return mx
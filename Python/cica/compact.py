@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+
+from cica import tables
+
+# -----------------------------------------------------------
+# Compact column representation of the raw tables
+# -----------------------------------------------------------
+#
+#   dates       int32   days since 1970-01-01           (MISSING_DAY when NULL)
+#   months      int16   months since the first dim_month month_start
+#                                                       (MISSING_MONTH when NULL)
+#   ids         int32
+#   money       int32   cents, rounded half away from zero the way Postgres
+#                       rounds into numeric(.., 2)       (MISSING_CENTS when NULL)
+#                       int32 cents cap a single value at ~21.4M, far above any
+#                       row here; to_cents refuses anything larger, and numpy
+#                       sums of int32 accumulate in int64
+#   categories  uint8   codes into a per-column label list (MISSING_CODE when NULL)
+#
+# Everything else (rates, scores, macro indexes) stays float64.
+#
+# Day -> month is a lookup into a day-indexed int16 table built once from the
+# month spine, so month bucketing is array indexing rather than DATE_TRUNC /
+# pd.to_datetime, and month -> month_start day is another lookup. Months past
+# the end of dim_month (payments run to 2028) keep counting from the same origin.
+#
+# Money held as cents is exactly what the Postgres tables hold, so anything
+# rebuilt from compact columns matches the SQL exports to the cent.
+
+DAY_DTYPE       = np.int32
+MONTH_DTYPE     = np.int16
+ID_DTYPE        = np.int32
+CENTS_DTYPE     = np.int32
+CODE_DTYPE      = np.uint8
+
+MISSING_DAY     = np.iinfo(DAY_DTYPE).max
+MISSING_MONTH   = np.iinfo(MONTH_DTYPE).max
+MISSING_CENTS   = np.iinfo(CENTS_DTYPE).min
+MISSING_CODE    = np.iinfo(CODE_DTYPE).max
+
+SPINE_LUT_YEARS = 40
+
+ID_COLUMNS = {
+    "applications"          : ["application_id", "customer_id"],
+    "customers"             : ["customer_id"],
+    "loans"                 : ["loan_id", "customer_id", "application_id", "term_months"],
+    "payment_schedule"      : ["loan_id", "installment_no"],
+    "payments"              : ["payment_id", "loan_id"],
+    "budget_plan_monthly"   : ["planned_originations"],
+}
+
+MONEY_COLUMNS = {
+    "applications"          : ["approved_amount"],
+    "budget_plan_monthly"   : ["planned_cash_inflow", "planned_revenue", "planned_net_losses"],
+    "loans"                 : ["principal", "origination_fee_amount", "principal_paid_total", "outstanding_principal_end"],
+    "payment_schedule"      : ["due_principal", "due_fee_interest", "due_total", "scheduled_balance_after"],
+    "payments"              : ["payment_amount", "paid_principal", "paid_fee_interest"],
+}
+
+CATEGORY_COLUMNS = {
+    "applications"          : ["decision", "reason_code"],
+    "budget_plan_monthly"   : ["scenario_name"],
+    "customers"             : ["acquisition_channel", "risk_tier_at_signup", "income_band", "region", "age_band"],
+    "loans"                 : ["merchant_category", "loan_status"],
+    "macro_monthly"         : ["scenario_name"],
+    "payments"              : ["payment_type"],
+}
+
+# Date columns that are month starts by construction
+MONTH_COLUMNS = {
+    "budget_plan_monthly"   : ["month"],
+    "dim_month"             : ["month_start"],
+    "loans"                 : ["orig_month", "default_month"],
+    "macro_monthly"         : ["month"],
+}
+
+
+# -----------------------------------------------------------
+# Scalar column conversions
+# -----------------------------------------------------------
+
+def to_days(srs_dates):
+    arr_days = srs_dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(srs_dates.isna().to_numpy(), MISSING_DAY, arr_days).astype(DAY_DTYPE)
+
+
+def from_days(arr_days):
+    arr_days = np.asarray(arr_days)
+    return pd.Series(np.where(arr_days == MISSING_DAY, np.datetime64("NaT"),
+                              arr_days.astype("datetime64[D]")).astype("datetime64[us]"))
+
+
+def day_number(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), "D").astype(np.int64))
+
+
+def to_cents(srs_money):
+    arr_money = srs_money.to_numpy(dtype=np.float64, na_value=np.nan)
+    arr_cents = np.nan_to_num(np.trunc(arr_money * 100 + np.copysign(0.5, arr_money)))
+    if np.abs(arr_cents).max(initial=0) >= np.iinfo(CENTS_DTYPE).max:
+        raise ValueError(f"{srs_money.name}: amount too large for {np.dtype(CENTS_DTYPE).name} cents")
+    return np.where(np.isnan(arr_money), MISSING_CENTS, arr_cents).astype(CENTS_DTYPE)
+
+
+def from_cents(arr_cents):
+    arr_cents = np.asarray(arr_cents)
+    return np.where(arr_cents == MISSING_CENTS, np.nan, arr_cents / 100.0)
+
+
+def to_codes(srs_labels):
+    # (uint8 codes, label list); labels sorted so codes are stable across loads
+    arr_labels  = sorted(srs_labels.dropna().unique())
+    if len(arr_labels) >= MISSING_CODE:
+        raise ValueError(f"{srs_labels.name}: {len(arr_labels)} categories do not fit in uint8")
+    arr_codes   = pd.Categorical(srs_labels, categories=arr_labels).codes
+    return np.where(arr_codes < 0, MISSING_CODE, arr_codes).astype(CODE_DTYPE), list(arr_labels)
+
+
+def from_codes(arr_codes, list_labels):
+    arr_labels = np.array(list(list_labels) + [None], dtype=object)
+    return pd.Series(arr_labels[np.minimum(arr_codes, len(list_labels))])
+
+
+# -----------------------------------------------------------
+# Month spine (dim_month)
+# -----------------------------------------------------------
+
+class MonthSpine:
+
+    def __init__(self, df_dim_month=None):
+        if df_dim_month is None:
+            df_dim_month = tables.load_raw("dim_month")
+
+        srs_months          = df_dim_month["month_start"].sort_values()
+        self.month_0        = srs_months.iloc[0].to_numpy().astype("datetime64[M]")
+        self.n_months       = len(srs_months)
+
+        # month -> first day, and day -> month, over SPINE_LUT_YEARS from the spine start
+        arr_month_starts    = (self.month_0 + np.arange(SPINE_LUT_YEARS * 12 + 1)).astype("datetime64[D]").astype(np.int64)
+        self.month_start    = arr_month_starts.astype(DAY_DTYPE)
+        self.day_0          = int(arr_month_starts[0])
+        self.month_of_day_lut = np.repeat(np.arange(SPINE_LUT_YEARS * 12, dtype=MONTH_DTYPE), np.diff(arr_month_starts))
+
+    def month_of_day(self, arr_days):
+        # Month index of each day; MISSING_DAY -> MISSING_MONTH
+        arr_days    = np.asarray(arr_days, dtype=np.int64)
+        arr_offset  = arr_days - self.day_0
+        is_lut      = (arr_offset >= 0) & (arr_offset < len(self.month_of_day_lut))
+        arr_month   = np.full(arr_days.shape, MISSING_MONTH, dtype=MONTH_DTYPE)
+        arr_month[is_lut] = self.month_of_day_lut[arr_offset[is_lut]]
+
+        is_other    = ~is_lut & (arr_days != MISSING_DAY)
+        if is_other.any():
+            arr_month[is_other] = (arr_days[is_other].astype("datetime64[D]").astype("datetime64[M]") - self.month_0).astype(MONTH_DTYPE)
+        return arr_month
+
+    def start_day(self, arr_months):
+        # First day of each month index
+        return self.month_start[np.asarray(arr_months)]
+
+    def in_spine(self, arr_months):
+        return (np.asarray(arr_months) >= 0) & (np.asarray(arr_months) < self.n_months)
+
+    def month_number(self, date):
+        return int(self.month_of_day(np.array([day_number(date)]))[0])
+
+    def to_month_start(self, arr_months):
+        arr_months = np.asarray(arr_months)
+        arr_days   = np.where(arr_months == MISSING_MONTH, MISSING_DAY,
+                              (self.month_0 + np.where(arr_months == MISSING_MONTH, 0, arr_months)).astype("datetime64[D]").astype(np.int64))
+        return from_days(arr_days)
+
+
+# -----------------------------------------------------------
+# Tables
+# -----------------------------------------------------------
+
+class CompactTable:
+
+    def __init__(self, table_name, dict_columns, dict_labels, list_order, spine):
+        self.table_name     = table_name
+        self.columns        = dict_columns
+        self.labels         = dict_labels
+        self.order          = list_order
+        self.spine          = spine
+
+    def __getitem__(self, col):
+        return self.columns[col]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def nbytes(self):
+        return int(sum(arr.nbytes for arr in self.columns.values()))
+
+    def column_kind(self, col):
+        if col in CATEGORY_COLUMNS.get(self.table_name, []):
+            return "category"
+        if col in MONEY_COLUMNS.get(self.table_name, []):
+            return "money"
+        if col in MONTH_COLUMNS.get(self.table_name, []):
+            return "month"
+        if col in tables.RAW_DATE_COLUMNS.get(self.table_name, []):
+            return "day"
+        return "plain"
+
+    def to_frame(self):
+        # Back to load_raw dtypes; money comes back at cents precision
+        dict_out = {}
+        for col in self.order:
+            kind = self.column_kind(col)
+            arr  = self.columns[col]
+            if kind == "category":
+                dict_out[col] = from_codes(arr, self.labels[col])
+            elif kind == "money":
+                dict_out[col] = from_cents(arr)
+            elif kind == "month":
+                dict_out[col] = self.spine.to_month_start(arr)
+            elif kind == "day":
+                dict_out[col] = from_days(arr)
+            else:
+                dict_out[col] = arr
+        return pd.DataFrame(dict_out)
+
+
+def compact_table(df, table_name, spine):
+    dict_columns    = {}
+    dict_labels     = {}
+
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS.get(table_name, []):
+            dict_columns[col], dict_labels[col] = to_codes(df[col])
+        elif col in MONEY_COLUMNS.get(table_name, []):
+            dict_columns[col] = to_cents(df[col])
+        elif col in MONTH_COLUMNS.get(table_name, []):
+            dict_columns[col] = spine.month_of_day(to_days(df[col]))
+        elif col in tables.RAW_DATE_COLUMNS.get(table_name, []):
+            dict_columns[col] = to_days(df[col])
+        elif col in ID_COLUMNS.get(table_name, []):
+            dict_columns[col] = df[col].to_numpy().astype(ID_DTYPE)
+        else:
+            dict_columns[col] = df[col].to_numpy()
+
+    return CompactTable(table_name, dict_columns, dict_labels, list(df.columns), spine)
+
+
+def load_compact(table_name, spine=None):
+    return compact_table(tables.load_raw(table_name), table_name, spine or MonthSpine())
+
+
+def memory_report(list_tables=None):
+    # Bytes per table (and per row) as load_raw frames vs compact columns
+    spine       = MonthSpine()
+    list_rows   = []
+
+    for table_name in list_tables or tables.RAW_TABLES:
+        df      = tables.load_raw(table_name)
+        ct      = compact_table(df, table_name, spine)
+        n_rows  = max(len(df), 1)
+
+        bytes_frame     = int(df.memory_usage(deep=True, index=False).sum())
+        bytes_compact   = ct.nbytes()
+
+        list_rows.append({
+                            "table_name"        : table_name,
+                            "rows"              : len(df),
+                            "bytes_frame"       : bytes_frame,
+                            "bytes_compact"     : bytes_compact,
+                            "bytes_per_row_frame"   : round(bytes_frame / n_rows, 1),
+                            "bytes_per_row_compact" : round(bytes_compact / n_rows, 1),
+                            "reduction"         : round(bytes_frame / max(bytes_compact, 1), 2),
+                         })
+
+    return pd.DataFrame(list_rows)
@@ -0,0 +1,266 @@
+import numpy as np
+import pandas as pd
+
+from cica import index, risk_params, tables
+
+# -----------------------------------------------------------
+# IFRS 9-style staging and expected credit loss (4.3)
+# -----------------------------------------------------------
+#
+# Stage per loan per month-end, from the DPD bucket in 01_4c:
+#
+#   Stage 1 : Current / 1-29 DPD        -> 12-month ECL
+#   Stage 2 : 30-59 / 60-89 DPD         -> lifetime ECL
+#   Stage 3 : 90+ DPD or defaulted      -> lifetime ECL with PD = 1
+#
+# For Stage 1/2 the ECL walks the remaining payment_schedule installments:
+#
+#   ECL = sum_k  marginal PD(k) x LGD x balance before installment k x (1 + apr/12)^-k
+#
+# where k is months from the month-end to the installment due month.
+# Stage 3 uses the actual principal still outstanding at the month-end.
+#
+# Loans drop out once their principal is fully repaid, and are treated as written
+# off from the month after their default month (the loss then sits in 01_3c).
+#
+# The loan-month x installment grid is a padded 2D array (rows x max term), so the
+# whole history is one batch of array maths.
+
+STAGE_BY_BUCKET = {
+    "Current"   : 1,
+    "1-29"      : 1,
+    "30-59"     : 2,
+    "60-89"     : 2,
+    "90+"       : 3,
+}
+
+TWELVE_MONTHS   = 12
+
+
+def padded_schedule(df_schedule, ex):
+    # (CSR loan, installment) arrays padded to the longest schedule
+    df_sched        = df_schedule.iloc[ex.schedule_row]
+    arr_pos         = ex.schedule_loan_pos()
+    arr_slot        = np.arange(len(arr_pos)) - ex.schedule_offsets[arr_pos]
+    max_term        = int(np.diff(ex.schedule_offsets).max())
+    n_loans         = len(ex.loan_id)
+
+    arr_due_month   = np.full((n_loans, max_term), np.iinfo(np.int64).max // 2, dtype=np.int64)
+    arr_bal_before  = np.zeros((n_loans, max_term))
+
+    arr_due_month[arr_pos, arr_slot]    = risk_params.month_index(df_sched["due_date"])
+    arr_bal_before[arr_pos, arr_slot]   = (df_sched["scheduled_balance_after"] + df_sched["due_principal"]).to_numpy()
+
+    return arr_due_month, arr_bal_before
+
+
+def principal_paid_to_date(df_payments, ex, arr_row_pos, arr_row_date):
+    # Cumulative paid principal per (CSR loan, date): payments are already (loan, date)
+    # sorted in the index, so this is one searchsorted on a combined key
+    df_pay          = df_payments.iloc[ex.payment_row]
+    arr_pay_pos     = ex.payment_loan_pos()
+    arr_pay_day     = df_pay["payment_date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    day_span        = int(max(arr_pay_day.max(initial=0), arr_row_date.max()) + 1)
+    arr_key         = arr_pay_pos * day_span + arr_pay_day
+    arr_cum_paid    = np.concatenate([[0.0], np.cumsum(df_pay["paid_principal"].to_numpy())])
+
+    arr_query_hi    = np.searchsorted(arr_key, arr_row_pos * day_span + arr_row_date, side="right")
+    arr_query_lo    = ex.payment_offsets[arr_row_pos]
+
+    return arr_cum_paid[arr_query_hi] - arr_cum_paid[arr_query_lo]
+
+
+def stage_2_pd_multiplier(arr_stage, arr_month_end_day, arr_default_day):
+    # Empirical uplift per row: 12M default rate seen from Stage 2 month-ends vs Stage 1 month-ends.
+    # A row only learns from month-ends whose 12-month window had closed by its own month-end,
+    # so the history never uses defaults that were not yet observed.
+    arr_close       = arr_month_end_day + 365
+    is_default_12m  = (arr_default_day > arr_month_end_day) & (arr_default_day <= arr_close)
+
+    arr_order       = np.argsort(arr_close, kind="stable")
+    arr_n_closed    = np.searchsorted(arr_close[arr_order], arr_month_end_day, side="right")
+
+    def closed_rate(stage):
+        # Default rate over the closed windows of one stage, as of each row
+        is_stage    = (arr_stage == stage)[arr_order]
+        arr_n       = np.concatenate([[0], np.cumsum(is_stage)])[arr_n_closed]
+        arr_d       = np.concatenate([[0], np.cumsum(is_stage & is_default_12m[arr_order])])[arr_n_closed]
+        return np.divide(arr_d, arr_n, out=np.full(len(arr_n), np.nan), where=arr_n > 0)
+
+    arr_rate_1      = closed_rate(1)
+    arr_rate_2      = closed_rate(2)
+
+    arr_mult        = np.divide(arr_rate_2, arr_rate_1, out=np.ones(len(arr_stage)),
+                                where=(arr_rate_1 > 0) & np.isfinite(arr_rate_2))
+
+    return np.maximum(arr_mult, 1.0)
+
+
+def loan_month_ecl(raw=None, df_delinquency=None):
+    raw             = dict(raw or {})
+    ex              = index.load_index(raw or None)
+    raw             = tables.load_raw_tables(["loans", "customers", "payments", "payment_schedule"], raw)
+
+    if df_delinquency is None:
+        df_delinquency = tables.load_generated("01_4c_delinquency_at_month_end", date_cols=["year_month", "month_end"])
+
+    # Loan and borrower columns gathered through the entity index
+    df_rows         = df_delinquency.loc[df_delinquency["loan_id"].isin(ex.loan_id),
+                                         ["loan_id", "year_month", "month_end", "dpd_bucket", "unpaid_at_month_end"]
+                                        ].reset_index(drop=True)
+
+    arr_row_pos     = ex.loan_pos(df_rows["loan_id"].to_numpy())
+    arr_loan_row    = ex.loan_rows(df_rows["loan_id"].to_numpy())
+    arr_cust_row    = ex.borrower_rows(df_rows["loan_id"].to_numpy())
+
+    for col in ["principal", "apr", "default_date"]:
+        df_rows[col] = raw["loans"][col].to_numpy()[arr_loan_row]
+    df_rows["risk_tier_at_signup"] = raw["customers"]["risk_tier_at_signup"].to_numpy()[arr_cust_row]
+
+    arr_month_end   = df_rows["month_end"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    arr_month       = risk_params.month_index(df_rows["year_month"])
+
+    # Stage from DPD, overridden to 3 in the default month
+    srs_unknown         = df_rows["dpd_bucket"].loc[~df_rows["dpd_bucket"].isin(list(STAGE_BY_BUCKET))]
+    if len(srs_unknown):
+        raise ValueError(f"01_4c has dpd_bucket values with no stage: {sorted(srs_unknown.astype(str).unique())}")
+
+    df_rows["stage"]    = df_rows["dpd_bucket"].map(STAGE_BY_BUCKET).astype(np.int8)
+    arr_default_month   = risk_params.month_index(df_rows["default_date"].fillna(pd.Timestamp.max.normalize()))
+    has_default         = df_rows["default_date"].notna().to_numpy()
+    df_rows.loc[has_default & (arr_default_month == arr_month), "stage"] = 3
+
+    # Actual principal outstanding -> drop repaid loans and written-off months
+    arr_paid            = principal_paid_to_date(raw["payments"], ex, arr_row_pos, arr_month_end)
+    arr_outstanding     = np.maximum(df_rows["principal"].to_numpy() - arr_paid, 0.0)
+
+    is_open             = (arr_outstanding > 0.005) & ~(has_default & (arr_month > arr_default_month))
+
+    arr_default_day     = df_rows["default_date"].to_numpy().astype("datetime64[D]").astype(np.float64)
+    arr_stage_2_mult    = stage_2_pd_multiplier(df_rows["stage"].to_numpy()[is_open],
+                                                arr_month_end[is_open].astype(np.float64), arr_default_day[is_open])
+
+    df_rows             = df_rows.loc[is_open].reset_index(drop=True)
+    arr_row_pos         = arr_row_pos[is_open]
+    arr_month           = arr_month[is_open]
+    arr_outstanding     = arr_outstanding[is_open]
+
+    # Tier PD / LGD
+    list_tiers                  = sorted(raw["customers"]["risk_tier_at_signup"].dropna().unique())
+    srs_pd_12m, overall_pd_12m  = risk_params.pd_12m_by_tier()
+    srs_lgd, overall_lgd        = risk_params.lgd_by_tier()
+
+    arr_tier_code       = pd.Categorical(df_rows["risk_tier_at_signup"], categories=list_tiers).codes
+    arr_tier_code       = np.where(arr_tier_code < 0, 0, arr_tier_code)
+    arr_hazard          = risk_params.pd_12m_to_monthly_hazard(risk_params.align_to_tiers(srs_pd_12m, overall_pd_12m, list_tiers))
+    arr_lgd_tier        = risk_params.align_to_tiers(srs_lgd, overall_lgd, list_tiers)
+
+    arr_stage           = df_rows["stage"].to_numpy()
+    arr_row_hazard      = arr_hazard[arr_tier_code] * np.where(arr_stage == 2, arr_stage_2_mult, 1.0)
+    arr_row_hazard      = np.minimum(arr_row_hazard, 1.0)
+    arr_row_lgd         = arr_lgd_tier[arr_tier_code]
+
+    # Remaining installments: (rows x max term)
+    arr_due_month, arr_bal_before   = padded_schedule(raw["payment_schedule"], ex)
+
+    arr_k               = arr_due_month[arr_row_pos] - arr_month[:, None]
+    is_remaining        = (arr_k >= 1) & (arr_k < 10_000)
+    is_in_window        = is_remaining & ((arr_stage[:, None] != 1) | (arr_k <= TWELVE_MONTHS))
+
+    # Marginal PD between the previous remaining installment and this one
+    arr_k_clip          = np.where(is_remaining, arr_k, 0)
+    arr_k_prev          = np.concatenate([np.zeros((len(arr_k), 1), dtype=arr_k.dtype), np.maximum.accumulate(arr_k_clip, axis=1)[:, :-1]], axis=1)
+
+    arr_surv_base       = (1.0 - arr_row_hazard)[:, None]
+    arr_marginal_pd     = arr_surv_base ** arr_k_prev - arr_surv_base ** arr_k_clip
+    arr_discount        = (1.0 + df_rows["apr"].to_numpy()[:, None] / 12.0) ** (-arr_k_clip)
+
+    arr_ecl_grid        = np.where(is_in_window, arr_marginal_pd * arr_bal_before[arr_row_pos] * arr_discount, 0.0)
+    arr_ecl_12          = arr_ecl_grid.sum(axis=1) * arr_row_lgd
+
+    # Scheduled exposure at month-end = balance before the next remaining installment
+    arr_first_slot      = np.argmax(is_remaining, axis=1)
+    arr_sched_exposure  = np.where(is_remaining.any(axis=1), arr_bal_before[arr_row_pos, arr_first_slot], 0.0)
+
+    arr_ecl             = np.where(arr_stage == 3, arr_row_lgd * arr_outstanding, arr_ecl_12)
+
+    df_rows["principal_outstanding"]    = arr_outstanding
+    df_rows["scheduled_exposure"]       = arr_sched_exposure
+    df_rows["pd_hazard_monthly"]        = np.where(arr_stage == 3, 1.0, arr_row_hazard)
+    df_rows["lgd_rate"]                 = arr_row_lgd
+    df_rows["ecl"]                      = arr_ecl
+
+    # Stage 2 uplift in force at each month-end
+    srs_stage_2_mult    = pd.Series(arr_stage_2_mult, index=df_rows["year_month"]).groupby(level=0).max()
+    srs_stage_2_mult.name = "stage_2_pd_multiplier"
+
+    list_cols = [
+        "loan_id",
+        "year_month",
+        "month_end",
+        "risk_tier_at_signup",
+        "dpd_bucket",
+        "stage",
+        "principal_outstanding",
+        "scheduled_exposure",
+        "pd_hazard_monthly",
+        "lgd_rate",
+        "ecl",
+    ]
+
+    return df_rows[list_cols].sort_values(["loan_id", "year_month"]).reset_index(drop=True), srs_stage_2_mult
+
+
+def monthly_ecl_balance(df_ecl):
+    df_balance = (df_ecl
+                    .groupby(["year_month", "stage"], as_index=False)
+                    .agg(
+                            n_loans                 = ("loan_id", "size"),
+                            principal_outstanding   = ("principal_outstanding", "sum"),
+                            ecl                     = ("ecl", "sum"),
+                        )
+                 )
+
+    df_balance["coverage_ratio"] = np.where(
+                                        df_balance["principal_outstanding"] > 0,
+                                        df_balance["ecl"] / df_balance["principal_outstanding"],
+                                        np.nan
+                                    )
+
+    return df_balance
+
+
+def stage_migration(df_ecl):
+    # Month-over-month stage moves, including loans entering ("new") and leaving ("closed")
+    df_this             = df_ecl[["loan_id", "year_month", "stage", "principal_outstanding"]].copy()
+    df_this["stage"]    = df_this["stage"].map(lambda s: f"Stage {s}")
+
+    idx_months          = pd.DatetimeIndex(sorted(df_this["year_month"].unique()))
+    srs_next_month      = pd.Series(idx_months[1:], index=idx_months[:-1])
+
+    df_prev             = df_this.rename(columns={"stage": "from_stage", "principal_outstanding": "from_exposure"})
+    df_prev["year_month"] = df_prev["year_month"].map(srs_next_month)
+    df_prev             = df_prev.dropna(subset=["year_month"])
+
+    df_move             = df_prev.merge(
+                            df_this.rename(columns={"stage": "to_stage"}),
+                            on=["loan_id", "year_month"],
+                            how="outer"
+                          )
+
+    df_move["from_stage"]   = df_move["from_stage"].fillna("new")
+    df_move["to_stage"]     = df_move["to_stage"].fillna("closed")
+    df_move["principal_outstanding"] = df_move["principal_outstanding"].fillna(df_move["from_exposure"])
+
+    df_migration = (df_move
+                        .groupby(["year_month", "from_stage", "to_stage"], as_index=False)
+                        .agg(
+                                n_loans                 = ("loan_id", "size"),
+                                principal_outstanding   = ("principal_outstanding", "sum"),
+                            )
+                        .sort_values(["year_month", "from_stage", "to_stage"])
+                        .reset_index(drop=True)
+                   )
+
+    return df_migration
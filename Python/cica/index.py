@@ -0,0 +1,226 @@
+import os
+
+import numpy as np
+
+from cica import paths, tables
+
+# -----------------------------------------------------------
+# CSR entity index: customers -> loans -> payments / schedule
+# -----------------------------------------------------------
+#
+# loans are sorted by (customer_id, origination_date, loan_id), payments by
+# (loan, payment_date, payment_id) and payment_schedule by (loan, installment_no).
+# Offset arrays mark where each parent's children start:
+#
+#   loans of customer c     : loan_row[customer_offsets[c] : customer_offsets[c + 1]]
+#   payments of loan l      : payment_row[payment_offsets[l] : payment_offsets[l + 1]]
+#   schedule of loan l      : schedule_row[schedule_offsets[l] : schedule_offsets[l + 1]]
+#
+# c is a position in customer_id (sorted), l a position in CSR loan order. The
+# *_row arrays point back into the raw tables as tables.load_raw reads them, so
+# any column can be gathered in CSR order with one take, and grouped sums are
+# np.add.reduceat over the offsets instead of a merge + groupby.
+#
+# Id lookups (customer_pos, loan_pos and everything built on them) check that
+# each id is in the index and raise KeyError otherwise, so an id from a stale
+# generated CSV fails loudly instead of landing on a neighbouring entity.
+#
+# The index only depends on the raw CSVs, so it is saved next to the generated
+# outputs and rebuilt when any raw file's size or mtime changes.
+
+INDEX_PATH      = os.path.join(paths.data_dir, ".entity_index.npz")
+INDEX_TABLES    = ["customers", "loans", "payments", "payment_schedule"]
+
+ARRAY_NAMES     = [
+    "customer_id", "customer_row", "customer_offsets",
+    "loan_id", "loan_row", "loan_customer_pos", "payment_offsets", "schedule_offsets",
+    "payment_row", "schedule_row",
+]
+
+
+def source_signature():
+    list_parts = []
+    for table_name in INDEX_TABLES:
+        stat = os.stat(paths.raw_path(table_name))
+        list_parts.append(f"{table_name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(list_parts)
+
+
+def _checked_pos(arr_ids, ids, sorter, id_name):
+    # searchsorted position of every id in arr_ids (sorted, or sorted through sorter), which must hold it
+    arr_query   = np.asarray(ids)
+    arr_found   = np.minimum(np.searchsorted(arr_ids, arr_query, sorter=sorter), len(arr_ids) - 1)
+    arr_pos     = arr_found if sorter is None else sorter[arr_found]
+    mask_miss   = arr_ids[arr_pos] != arr_query
+    if np.any(mask_miss):
+        raise KeyError(f"{id_name} values missing from the index: {np.atleast_1d(arr_query)[np.atleast_1d(mask_miss)][:5].tolist()}")
+    return arr_pos
+
+
+def segment_ids(offsets):
+    # Parent position of every child row, e.g. loan position of every CSR payment
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def segment_sum(values, offsets):
+    # Sum per segment; empty segments give 0 (plain reduceat would repeat a neighbour)
+    arr_values  = np.append(np.asarray(values, dtype=np.float64), 0.0)
+    arr_start   = offsets[:-1]
+    arr_sum     = np.add.reduceat(arr_values, arr_start)
+    arr_sum[arr_start == offsets[1:]] = 0.0
+    return arr_sum
+
+
+def segment_min(values, offsets, empty):
+    arr_values  = np.append(np.asarray(values), empty)
+    arr_start   = offsets[:-1]
+    arr_min     = np.minimum.reduceat(arr_values, arr_start)
+    arr_min[arr_start == offsets[1:]] = empty
+    return arr_min
+
+
+def _csr_order(arr_parent_pos, n_parents, list_sort_keys):
+    # Row order sorted by parent then the sort keys, plus parent offsets
+    arr_order   = np.lexsort(list(reversed(list_sort_keys)) + [arr_parent_pos])
+    arr_counts  = np.bincount(arr_parent_pos, minlength=n_parents)
+    return arr_order, np.concatenate([[0], np.cumsum(arr_counts)])
+
+
+class EntityIndex:
+
+    def __init__(self, dict_arrays, signature=""):
+        for name in ARRAY_NAMES:
+            setattr(self, name, dict_arrays[name])
+        self.signature          = signature
+        self.loan_id_order      = np.argsort(self.loan_id, kind="stable")
+        self.loan_csr_pos       = np.empty_like(self.loan_row)
+        self.loan_csr_pos[self.loan_row] = np.arange(len(self.loan_row))
+
+    @classmethod
+    def build(cls, raw, signature=""):
+        df_customers    = raw["customers"]
+        df_loans        = raw["loans"]
+
+        # Customers sorted by id; loans grouped under them
+        arr_customer_row    = np.argsort(df_customers["customer_id"].to_numpy(), kind="stable")
+        arr_customer_id     = df_customers["customer_id"].to_numpy()[arr_customer_row]
+
+        arr_loan_cust_pos   = np.searchsorted(arr_customer_id, df_loans["customer_id"].to_numpy())
+        arr_loan_cust_pos   = np.minimum(arr_loan_cust_pos, len(arr_customer_id) - 1)
+        if (arr_customer_id[arr_loan_cust_pos] != df_loans["customer_id"].to_numpy()).any():
+            raise ValueError("loans reference customer_id values missing from customers")
+
+        arr_loan_row, arr_customer_offsets = _csr_order(
+                                                arr_loan_cust_pos, len(arr_customer_id),
+                                                [df_loans["origination_date"].to_numpy(), df_loans["loan_id"].to_numpy()]
+                                             )
+        arr_loan_id         = df_loans["loan_id"].to_numpy()[arr_loan_row]
+        arr_id_order        = np.argsort(arr_loan_id, kind="stable")
+
+        def child_csr(df_child, list_sort_cols):
+            # CSR order of a loan_id-keyed child table
+            arr_child_loan  = df_child["loan_id"].to_numpy()
+            arr_found       = np.minimum(np.searchsorted(arr_loan_id, arr_child_loan, sorter=arr_id_order), len(arr_loan_id) - 1)
+            arr_pos         = arr_id_order[arr_found]
+            if (arr_loan_id[arr_pos] != arr_child_loan).any():
+                raise ValueError("child rows reference loan_id values missing from loans")
+            return _csr_order(arr_pos, len(arr_loan_id), [df_child[c].to_numpy() for c in list_sort_cols])
+
+        arr_payment_row, arr_payment_offsets    = child_csr(raw["payments"], ["payment_date", "payment_id"])
+        arr_schedule_row, arr_schedule_offsets  = child_csr(raw["payment_schedule"], ["installment_no"])
+
+        return cls({
+                        "customer_id"       : arr_customer_id,
+                        "customer_row"      : arr_customer_row,
+                        "customer_offsets"  : arr_customer_offsets,
+                        "loan_id"           : arr_loan_id,
+                        "loan_row"          : arr_loan_row,
+                        "loan_customer_pos" : arr_loan_cust_pos[arr_loan_row],
+                        "payment_offsets"   : arr_payment_offsets,
+                        "schedule_offsets"  : arr_schedule_offsets,
+                        "payment_row"       : arr_payment_row,
+                        "schedule_row"      : arr_schedule_row,
+                   }, signature)
+
+    def save(self, path=INDEX_PATH):
+        np.savez(path, signature=np.array(self.signature), **{name: getattr(self, name) for name in ARRAY_NAMES})
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as npz:
+            return cls({name: npz[name] for name in ARRAY_NAMES}, str(npz["signature"]))
+
+    # --- lookups -------------------------------------------------------------
+
+    def customer_pos(self, customer_ids):
+        # CSR position of each customer_id; unknown ids raise KeyError
+        return _checked_pos(self.customer_id, customer_ids, None, "customer_id")
+
+    def loan_pos(self, loan_ids):
+        # CSR position of each loan_id; unknown ids raise KeyError
+        return _checked_pos(self.loan_id, loan_ids, self.loan_id_order, "loan_id")
+
+    def customer_rows(self, customer_ids):
+        # customers row of each customer_id
+        return self.customer_row[self.customer_pos(customer_ids)]
+
+    def loan_rows(self, loan_ids):
+        # loans row of each loan_id
+        return self.loan_row[self.loan_pos(loan_ids)]
+
+    def borrower_rows(self, loan_ids=None):
+        # customers row of each loan's borrower; every loan in loans row order when loan_ids is None
+        arr_pos     = self.loan_csr_pos if loan_ids is None else self.loan_pos(loan_ids)
+        return self.customer_row[self.loan_customer_pos[arr_pos]]
+
+    def loans_of(self, customer_id):
+        c = self.customer_pos(customer_id)
+        return self.loan_row[self.customer_offsets[c]:self.customer_offsets[c + 1]]
+
+    def payments_of(self, loan_id):
+        l = self.loan_pos(loan_id)
+        return self.payment_row[self.payment_offsets[l]:self.payment_offsets[l + 1]]
+
+    def schedule_of(self, loan_id):
+        l = self.loan_pos(loan_id)
+        return self.schedule_row[self.schedule_offsets[l]:self.schedule_offsets[l + 1]]
+
+    # --- grouped reductions --------------------------------------------------
+
+    def n_loans(self):
+        return np.diff(self.customer_offsets)
+
+    def sum_by_customer(self, loan_values):
+        # loan_values in CSR loan order
+        return segment_sum(loan_values, self.customer_offsets)
+
+    def sum_by_loan(self, payment_values):
+        # payment_values in CSR payment order
+        return segment_sum(payment_values, self.payment_offsets)
+
+    def sum_schedule_by_loan(self, schedule_values):
+        # schedule_values in CSR schedule order
+        return segment_sum(schedule_values, self.schedule_offsets)
+
+    def payment_loan_pos(self):
+        return segment_ids(self.payment_offsets)
+
+    def schedule_loan_pos(self):
+        return segment_ids(self.schedule_offsets)
+
+
+def load_index(raw=None):
+    # Caller-supplied frames get a fresh (unsaved) index; otherwise use the saved one
+    if raw is not None:
+        raw = tables.load_raw_tables(INDEX_TABLES, raw)
+        return EntityIndex.build(raw)
+
+    signature = source_signature()
+    if os.path.exists(INDEX_PATH):
+        ex = EntityIndex.load()
+        if ex.signature == signature:
+            return ex
+
+    ex = EntityIndex.build(tables.load_raw_tables(INDEX_TABLES), signature)
+    ex.save()
+    return ex
@@ -0,0 +1,237 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from cica import index, paths, tables
+
+# -----------------------------------------------------------
+# Population / characteristic stability monitoring (3.6A)
+# -----------------------------------------------------------
+#
+# PSI for decision_score (applications) and CSI for each PD feature (new loans),
+# month over month, against a frozen reference window.
+#
+# Bin edges (numeric) and category lists (categorical) are fixed once from the
+# reference window. After that a month is just searchsorted / category codes plus
+# one bincount per feature, added into running counts, so each new month only
+# costs that month's rows. The monitor keeps the rows it has produced, is pickled
+# after each run and picked up by the next one, which only feeds the months after
+# the last one seen. A saved monitor is dropped and rebuilt when its reference
+# end differs, or when its fingerprint no longer matches the data: a digest of
+# the reference window's feature values (a restated reference refits the bins and
+# expected shares), and a digest per month already seen (a restated or back-filled
+# month). A digest is the sum of pandas row hashes, so it ignores row order.
+#
+#   PSI / CSI = sum_bins (actual % - expected %) x ln(actual % / expected %)
+#   < 0.10 stable, 0.10 - 0.25 watch, > 0.25 shifted
+
+REFERENCE_END           = pd.Timestamp("2023-12-31")
+SCORE_MONITOR_PATH      = os.path.join(paths.data_dir, ".stability_monitor_score.pkl")
+PD_MONITOR_PATH         = os.path.join(paths.data_dir, ".stability_monitor_pd.pkl")
+N_BINS                  = 10
+MIN_SHARE               = 1e-4          # floor on bin shares so empty bins stay finite
+
+PSI_WATCH               = 0.10
+PSI_ALERT               = 0.25
+
+SCORE_FEATURE           = "decision_score"
+
+NUMERIC_PD_FEATURES     = ["principal", "term_months", "apr", "origination_fee_rate"]
+CATEGORICAL_PD_FEATURES = ["risk_tier_at_signup", "acquisition_channel", "income_band", "age_band", "merchant_category"]
+
+
+def rows_digest(df_rows, cols):
+    # Row-order-free digest of the given columns: per-row hashes summed mod 2^64
+    return int(pd.util.hash_pandas_object(df_rows[cols], index=False).to_numpy().sum(dtype=np.uint64))
+
+
+def month_digests(df_rows, srs_month, cols):
+    # {month: rows_digest} for every month in srs_month
+    arr_months, arr_code    = np.unique(srs_month.to_numpy(), return_inverse=True)
+    arr_digest              = np.zeros(len(arr_months), dtype=np.uint64)
+    np.add.at(arr_digest, arr_code, pd.util.hash_pandas_object(df_rows[cols], index=False).to_numpy())
+    return {pd.Timestamp(month): int(digest) for month, digest in zip(arr_months, arr_digest)}
+
+
+def stability_index(arr_actual_counts, arr_expected_share):
+    arr_actual_share    = arr_actual_counts / max(arr_actual_counts.sum(), 1)
+    arr_actual_share    = np.maximum(arr_actual_share, MIN_SHARE)
+    arr_expected_share  = np.maximum(arr_expected_share, MIN_SHARE)
+    return float(np.sum((arr_actual_share - arr_expected_share) * np.log(arr_actual_share / arr_expected_share)))
+
+
+class StabilityMonitor:
+
+    def __init__(self, df_reference, numeric_features, categorical_features, n_bins=N_BINS, reference_end=None):
+        self.reference_end          = reference_end
+        self.numeric_features       = list(numeric_features)
+        self.categorical_features   = list(categorical_features)
+        self.edges                  = {}
+        self.categories             = {}
+        self.expected_share         = {}
+        self.running_counts         = {}
+        self.months_seen            = []
+        self.month_digests          = {}
+        self.rows                   = []
+
+        # Numeric: inner quantile edges of the reference, plus a bin for missing
+        for col in self.numeric_features:
+            arr_values      = df_reference[col].dropna().to_numpy(dtype=float)
+            arr_edges       = np.unique(np.quantile(arr_values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            self.edges[col] = arr_edges
+
+        # Categorical: reference categories, plus "other" and missing
+        for col in self.categorical_features:
+            self.categories[col] = pd.Index(sorted(df_reference[col].dropna().astype(str).unique()))
+
+        for col in self.features:
+            arr_counts                  = self.bin_counts(df_reference, col)
+            self.expected_share[col]    = arr_counts / max(arr_counts.sum(), 1)
+            self.running_counts[col]    = np.zeros_like(arr_counts)
+
+        self.reference_digest       = rows_digest(df_reference, self.features)
+
+    @property
+    def features(self):
+        return self.numeric_features + self.categorical_features
+
+    def n_bins_for(self, col):
+        if col in self.edges:
+            return len(self.edges[col]) + 2
+        return len(self.categories[col]) + 2
+
+    def bin_counts(self, df_rows, col):
+        srs_values = df_rows[col]
+
+        if col in self.edges:
+            arr_values  = srs_values.to_numpy(dtype=float)
+            arr_bin     = np.searchsorted(self.edges[col], arr_values, side="right")
+            arr_bin     = np.where(np.isnan(arr_values), len(self.edges[col]) + 1, arr_bin)
+        else:
+            arr_code    = self.categories[col].get_indexer(srs_values.astype(str))
+            arr_bin     = np.where(arr_code < 0, len(self.categories[col]), arr_code)
+            arr_bin     = np.where(srs_values.isna().to_numpy(), len(self.categories[col]) + 1, arr_bin)
+
+        return np.bincount(arr_bin, minlength=self.n_bins_for(col)).astype(float)
+
+    def update(self, df_month, year_month):
+        # Add one month: per-month index plus the cumulative index since the reference
+        list_rows = []
+
+        for col in self.features:
+            arr_counts                  = self.bin_counts(df_month, col)
+            self.running_counts[col]    = self.running_counts[col] + arr_counts
+
+            list_rows.append({
+                "year_month"            : year_month,
+                "feature"               : col,
+                "metric"                : "psi" if col == SCORE_FEATURE else "csi",
+                "n_rows"                : int(arr_counts.sum()),
+                "stability_index"       : stability_index(arr_counts, self.expected_share[col]),
+                "cumulative_index"      : stability_index(self.running_counts[col], self.expected_share[col]),
+            })
+
+        self.months_seen.append(year_month)
+        self.month_digests[year_month] = rows_digest(df_month, self.features)
+        self.rows.extend(list_rows)
+
+        return list_rows
+
+    def matches(self, df_rows, date_col):
+        # True when the reference window and every month already added hash the same as before
+        srs_dates   = df_rows[date_col]
+        mask_ref    = (srs_dates <= self.reference_end).to_numpy()
+        if rows_digest(df_rows.loc[mask_ref], self.features) != getattr(self, "reference_digest", None):
+            return False
+        if not self.months_seen:
+            return True
+
+        srs_month   = srs_dates.dt.to_period("M").dt.to_timestamp()
+        mask_seen   = ~mask_ref & (srs_month <= self.months_seen[-1]).to_numpy()
+        return month_digests(df_rows.loc[mask_seen], srs_month.loc[mask_seen], self.features) == \
+               getattr(self, "month_digests", None)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def load_monitor(path):
+    # Saved monitor, or None when there is none yet
+    return StabilityMonitor.load(path) if os.path.exists(path) else None
+
+
+def run_by_month(df_rows, date_col, monitor, reference_end=REFERENCE_END):
+    # Feed every month after the reference window that the monitor has not seen yet, in order.
+    # Rows are sorted once and sliced per month, so each update touches only its month.
+    month_from  = monitor.months_seen[-1] if monitor.months_seen else reference_end
+    srs_month   = df_rows[date_col].dt.to_period("M").dt.to_timestamp()
+    df_after    = (df_rows
+                    .assign(_month=srs_month)
+                    .loc[(df_rows[date_col] > reference_end) & (srs_month > month_from)]
+                    .sort_values("_month")
+                  )
+
+    arr_months  = df_after["_month"].to_numpy()
+    if len(arr_months) == 0:
+        return pd.DataFrame()
+
+    arr_bounds  = np.flatnonzero(np.r_[True, arr_months[1:] != arr_months[:-1], True])
+
+    list_rows   = []
+    for start, end in zip(arr_bounds[:-1], arr_bounds[1:]):
+        list_rows.extend(monitor.update(df_after.iloc[start:end], pd.Timestamp(arr_months[start])))
+
+    return pd.DataFrame(list_rows)
+
+
+def resume_monitor(monitor, df_rows, date_col, reference_end, build):
+    # The saved monitor when it still fits the data, otherwise a fresh one from build()
+    if (monitor is not None and monitor.reference_end == reference_end
+            and monitor.matches(df_rows, date_col)):
+        return monitor
+    return build()
+
+
+def stability_table(raw=None, reference_end=REFERENCE_END, monitor_score=None, monitor_pd=None):
+    # monitor_score / monitor_pd: monitors saved by an earlier run; only months they have not seen are added
+    raw = dict(raw or {})
+    ex  = index.load_index(raw or None)
+    raw = tables.load_raw_tables(["applications", "customers", "loans"], raw)
+
+    # decision_score on every application
+    df_apps         = raw["applications"]
+    monitor_score   = resume_monitor(monitor_score, df_apps, "application_date", reference_end,
+                                     lambda: StabilityMonitor(df_apps.loc[df_apps["application_date"] <= reference_end],
+                                                              [SCORE_FEATURE], [], reference_end=reference_end))
+    run_by_month(df_apps, "application_date", monitor_score, reference_end)
+
+    # PD features on every booked loan; borrower columns gathered through the entity index
+    df_loans        = raw["loans"].copy()
+    arr_cust_row    = ex.borrower_rows()
+    for col in NUMERIC_PD_FEATURES + CATEGORICAL_PD_FEATURES:
+        if col not in df_loans:
+            df_loans[col] = raw["customers"][col].to_numpy()[arr_cust_row]
+
+    monitor_pd      = resume_monitor(monitor_pd, df_loans, "origination_date", reference_end,
+                                     lambda: StabilityMonitor(df_loans.loc[df_loans["origination_date"] <= reference_end],
+                                                              NUMERIC_PD_FEATURES, CATEGORICAL_PD_FEATURES,
+                                                              reference_end=reference_end))
+    run_by_month(df_loans, "origination_date", monitor_pd, reference_end)
+
+    df_monitor      = pd.DataFrame(monitor_score.rows + monitor_pd.rows)
+
+    df_monitor["status"] = np.select(
+                                [df_monitor["stability_index"] > PSI_ALERT, df_monitor["stability_index"] > PSI_WATCH],
+                                ["shifted", "watch"],
+                                default="stable"
+                           )
+
+    return df_monitor.sort_values(["year_month", "metric", "feature"], ascending=[True, False, True]).reset_index(drop=True), monitor_score, monitor_pd
@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from cica import index, risk_params, stress, tables
+
+# -----------------------------------------------------------
+# Monte Carlo portfolio loss distribution (4.2)
+# -----------------------------------------------------------
+#
+# One-factor Gaussian copula over the open book, run month by month:
+#
+#   z       ~ N(0, 1)                       systematic shock, one per path
+#   Z_t     = mu_t + z                      factor in horizon month t
+#   h_i,t   = Phi((Phi^-1(h_i) - sqrt(rho) Z_t) / sqrt(1 - rho))
+#   loan i defaults within the horizon with probability 1 - prod_t (1 - h_i,t)
+#
+# Z is read as a standardized consumer_stress_index shock: a factor Z corresponds
+# to an index level of (baseline level) - Z * CSI_SD. The scenario sets the mean
+# path mu_t from its consumer_stress_index month by month, measured against the
+# baseline level the base PD was observed under (cica.stress.calibration_path),
+# so "severe" pushes the factor down and the push follows the scenario path.
+#
+# Given z, every loan in a tier shares the same conditional horizon PD, so each
+# path only needs one uniform per loan compared against its tier threshold.
+#
+# Paths are cut into chunks sized from a byte budget over the number of loans, so
+# a worker's draws stay around CHUNK_BYTES however large the book is. Every chunk
+# gets its own child seed from one SeedSequence, so the result is identical no
+# matter how many workers run it.
+
+# Asset correlation per tier (retail-style, weaker tiers a bit more systematic)
+ASSET_CORRELATION = {
+    "A" : 0.04,
+    "B" : 0.06,
+    "C" : 0.08,
+    "D" : 0.10,
+}
+
+CONFIDENCE_LEVELS       = [0.95, 0.99, 0.995, 0.999]
+
+DEFAULT_N_PATHS         = 100_000
+DEFAULT_CHUNK_BYTES     = 256 * 2**20
+DEFAULT_HORIZON_MONTHS  = 12
+DEFAULT_SEED            = 20260101
+
+# Working memory per path x loan in a chunk: float32 uniform + bool default + float64 default for the matmul
+BYTES_PER_DRAW          = 4 + 1 + 8
+
+
+def chunk_paths_for(n_loans, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    # Paths per chunk that keep one chunk's draws inside chunk_bytes
+    return max(int(chunk_bytes // (BYTES_PER_DRAW * max(n_loans, 1))), 1)
+
+
+def loan_inputs(as_of=None, horizon_months=DEFAULT_HORIZON_MONTHS, raw=None):
+    # Per-loan tier code and EAD, plus monthly hazard and LGD per tier, for the open book
+    raw             = dict(raw or {})
+    ex              = index.load_index(raw or None)
+    raw             = tables.load_raw_tables(["loans", "customers", "payments", "payment_schedule", "macro_monthly"], raw)
+
+    as_of           = pd.Timestamp(as_of) if as_of is not None else stress.scenario_as_of(raw["macro_monthly"], horizon_months)
+
+    df_book         = stress.open_book(raw["loans"], raw["customers"], raw["payments"], as_of, ex)
+    list_tiers      = sorted(df_book["risk_tier_at_signup"].dropna().unique())
+    n_loans         = len(df_book)
+
+    srs_pd_12m, overall_pd_12m  = risk_params.pd_12m_by_tier()
+    srs_lgd, overall_lgd        = risk_params.lgd_by_tier()
+
+    arr_hazard      = risk_params.pd_12m_to_monthly_hazard(risk_params.align_to_tiers(srs_pd_12m, overall_pd_12m, list_tiers))
+    arr_lgd_tier    = risk_params.align_to_tiers(srs_lgd, overall_lgd, list_tiers)
+
+    # EAD = scheduled start-of-month balance averaged over the horizon
+    # (a default is equally likely in any month under a flat hazard)
+    dict_grid       = stress.schedule_grid(df_book, raw["payment_schedule"], as_of, np.arange(n_loans), n_loans, horizon_months)
+    arr_ead         = dict_grid["balance_start"].mean(axis=1)
+
+    arr_tier_code   = pd.Categorical(df_book["risk_tier_at_signup"], categories=list_tiers).codes.astype(np.int64)
+
+    return {
+        "loan_id"       : df_book["loan_id"].to_numpy(),
+        "as_of"         : as_of,
+        "tier_code"     : arr_tier_code,
+        "tiers"         : list_tiers,
+        "hazard_tier"   : arr_hazard,
+        "lgd_tier"      : arr_lgd_tier,
+        "rho_tier"      : np.array([ASSET_CORRELATION.get(t, max(ASSET_CORRELATION.values())) for t in list_tiers]),
+        "ead"           : arr_ead,
+    }
+
+
+def consumer_stress_factor(df_macro, scenario_name, idx_months, idx_calibration):
+    # Factor mean per horizon month for a scenario, the calibration index level,
+    # and the index scale used to read Z back as an index level
+    csi_sd          = float(df_macro["consumer_stress_index"].std())
+    csi_calibration = float(stress.calibration_path(df_macro, idx_calibration)["consumer_stress_index"].mean())
+
+    df_scn          = stress.scenario_path(df_macro, scenario_name, idx_months)
+    arr_factor_mean = -(df_scn["consumer_stress_index"].to_numpy() - csi_calibration) / csi_sd
+
+    return arr_factor_mean, csi_calibration, csi_sd
+
+
+# Worker state: the book is shipped once per process, not once per chunk
+_worker_book = {}
+
+
+def _init_worker(dict_book):
+    _worker_book.clear()
+    _worker_book.update(dict_book)
+
+
+def _simulate_chunk(task):
+    n_paths, seed_seq, arr_factor_mean = task
+    rng             = np.random.default_rng(seed_seq)
+
+    arr_tier_code   = _worker_book["tier_code"]
+    arr_loss_given  = _worker_book["ead"] * _worker_book["lgd_tier"][arr_tier_code]
+    arr_threshold   = ndtri(_worker_book["hazard_tier"])
+    arr_rho         = _worker_book["rho_tier"]
+
+    arr_shock       = rng.standard_normal(n_paths)
+    arr_z           = arr_factor_mean[None, :] + arr_shock[:, None]
+
+    # Conditional monthly hazard per path x month x tier, compounded to a horizon PD per path x tier
+    arr_cond_haz    = ndtr((arr_threshold[None, None, :] - np.sqrt(arr_rho)[None, None, :] * arr_z[:, :, None])
+                           / np.sqrt(1.0 - arr_rho)[None, None, :])
+    arr_cond_pd     = (1.0 - np.prod(1.0 - arr_cond_haz, axis=1)).astype(np.float32)
+
+    arr_u           = rng.random((n_paths, len(arr_tier_code)), dtype=np.float32)
+    arr_default     = arr_u < arr_cond_pd[:, arr_tier_code]
+
+    arr_loss        = arr_default.astype(np.float64) @ arr_loss_given
+    arr_n_default   = arr_default.sum(axis=1)
+
+    return arr_z.mean(axis=1), arr_loss, arr_n_default
+
+
+def simulate(dict_book, arr_factor_mean, n_paths=DEFAULT_N_PATHS, chunk_bytes=DEFAULT_CHUNK_BYTES,
+             seed=DEFAULT_SEED, n_workers=None):
+    # Loss per path. Same seed and book -> same paths, whatever n_workers is.
+    # arr_factor_mean: systematic factor mean per horizon month
+    chunk_paths     = chunk_paths_for(len(dict_book["ead"]), chunk_bytes)
+    list_sizes      = [chunk_paths] * (n_paths // chunk_paths)
+    if n_paths % chunk_paths:
+        list_sizes.append(n_paths % chunk_paths)
+
+    arr_factor_mean = np.asarray(arr_factor_mean, dtype=float)
+    list_seeds      = np.random.SeedSequence(seed).spawn(len(list_sizes))
+    list_tasks      = [(size, seed_seq, arr_factor_mean) for size, seed_seq in zip(list_sizes, list_seeds)]
+
+    dict_shared     = {key: dict_book[key] for key in ["tier_code", "hazard_tier", "lgd_tier", "rho_tier", "ead"]}
+    n_workers       = n_workers or os.cpu_count() or 1
+
+    if n_workers == 1:
+        _init_worker(dict_shared)
+        list_results = [_simulate_chunk(task) for task in list_tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(dict_shared,)) as pool:
+            list_results = list(pool.map(_simulate_chunk, list_tasks))
+
+    return pd.DataFrame({
+        "factor_z"      : np.concatenate([r[0] for r in list_results]),
+        "loss"          : np.concatenate([r[1] for r in list_results]),
+        "n_defaults"    : np.concatenate([r[2] for r in list_results]),
+    })
+
+
+def var_es(arr_loss, confidence_levels=CONFIDENCE_LEVELS):
+    # VaR = loss quantile, ES = average loss at or beyond VaR
+    arr_sorted      = np.sort(np.asarray(arr_loss))
+    n_paths         = len(arr_sorted)
+    list_rows       = []
+
+    for level in confidence_levels:
+        tail_start  = min(int(np.floor(level * n_paths)), n_paths - 1)
+        list_rows.append({
+            "confidence_level"  : level,
+            "var"               : arr_sorted[tail_start],
+            "expected_shortfall": arr_sorted[tail_start:].mean(),
+        })
+
+    return pd.DataFrame(list_rows)
+
+
+def run_all_scenarios(as_of=None, horizon_months=DEFAULT_HORIZON_MONTHS, n_paths=DEFAULT_N_PATHS,
+                      chunk_bytes=DEFAULT_CHUNK_BYTES, seed=DEFAULT_SEED, n_workers=None, raw=None):
+    # as_of defaults to the latest month end whose horizon macro_monthly covers (cica.stress.scenario_as_of)
+    raw             = tables.load_raw_tables(["macro_monthly", "dim_month"], raw)
+
+    dict_book       = loan_inputs(as_of, horizon_months, raw)
+    idx_months      = stress.projection_months(dict_book["as_of"], horizon_months)
+
+    list_summary    = []
+    dict_paths      = {}
+
+    for scenario_name in raw["macro_monthly"]["scenario_name"].drop_duplicates():
+        arr_factor_mean, csi_calibration, csi_sd = consumer_stress_factor(
+                                                        raw["macro_monthly"], scenario_name, idx_months,
+                                                        raw["dim_month"]["month_start"])
+
+        df_paths    = simulate(dict_book, arr_factor_mean, n_paths, chunk_bytes, seed, n_workers)
+        df_paths["consumer_stress_index"] = csi_calibration - df_paths["factor_z"] * csi_sd
+
+        df_risk     = var_es(df_paths["loss"])
+        df_risk.insert(0, "scenario_name", scenario_name)
+        df_risk["expected_loss"]        = df_paths["loss"].mean()
+        df_risk["total_ead"]            = dict_book["ead"].sum()
+        df_risk["n_loans"]              = len(dict_book["ead"])
+        df_risk["n_paths"]              = n_paths
+        df_risk["horizon_months"]       = horizon_months
+
+        list_summary.append(df_risk)
+        dict_paths[scenario_name]       = df_paths
+
+    return pd.concat(list_summary, ignore_index=True), dict_paths
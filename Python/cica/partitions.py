@@ -0,0 +1,146 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from cica import paths, tables
+
+# -----------------------------------------------------------
+# Partitioned Parquet copies of the large loan x month outputs
+# -----------------------------------------------------------
+#
+# 01_4a / 01_4b / 01_4c grow with loans x months and are only ever asked about
+# a few months or a few loans at a time. Next to each CSV we keep a Parquet
+# dataset, hive-partitioned by month:
+#
+#   Data_Generated/parquet/01_4c_delinquency_at_month_end/
+#       year_month=2025-10-01/part-0.parquet
+#       year_month=2025-11-01/part-0.parquet
+#       ...
+#
+# Rows inside a partition are sorted by loan_id and cut into row groups of
+# ROW_GROUP_ROWS, so each row group's min / max loan_id statistics are narrow.
+# read() turns its month and loan filters into one pyarrow expression:
+#
+#   month filters   decide which partition directories are opened at all
+#   loan_id filters skip row groups whose [min, max] cannot contain the ids
+#
+# so "the last 3 months" reads three files, and one loan's history reads one
+# row group per month.
+#
+# A dataset remembers the size and mtime of the CSV it came from (_SOURCE file),
+# and export() only rewrites datasets whose CSV has changed since.
+
+PARTITIONED_OUTPUTS = {
+    "01_4a_scheduled_payment_plan"      : ["year_month", "month_end"],
+    "01_4b_collected_payments"          : ["year_month", "month_end"],
+    "01_4c_delinquency_at_month_end"    : ["year_month", "month_end", "oldest_unpaid_due_date"],
+}
+
+PARTITION_COLUMN    = "year_month"
+ROW_GROUP_ROWS      = 256
+PARQUET_DIR         = os.path.join(paths.data_dir, "parquet")
+SOURCE_FILE         = "_SOURCE"
+
+
+def dataset_dir(output_name):
+    return os.path.join(PARQUET_DIR, output_name)
+
+
+def source_signature(output_name):
+    stat = os.stat(paths.generated_path(output_name))
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def is_stale(output_name):
+    path = os.path.join(dataset_dir(output_name), SOURCE_FILE)
+    if not os.path.exists(path):
+        return True
+    with open(path) as f:
+        return f.read().strip() != source_signature(output_name)
+
+
+def write(output_name, df=None):
+    # (Re)write one dataset from its CSV (or a frame already in memory); returns the partition count
+    df              = df if df is not None else tables.load_generated(output_name, date_cols=PARTITIONED_OUTPUTS[output_name])
+    out_dir         = dataset_dir(output_name)
+    tmp_dir         = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    df              = df.sort_values([PARTITION_COLUMN, "loan_id"], kind="mergesort").reset_index(drop=True)
+    arr_month       = df[PARTITION_COLUMN].to_numpy()
+    arr_bounds      = np.flatnonzero(np.r_[True, arr_month[1:] != arr_month[:-1], True])
+
+    # Dates as date32; the partition value lives in the directory name only
+    table           = pa.Table.from_pandas(df.drop(columns=[PARTITION_COLUMN]), preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+
+    for start, end in zip(arr_bounds[:-1], arr_bounds[1:]):
+        part_dir = os.path.join(tmp_dir, f"{PARTITION_COLUMN}={pd.Timestamp(arr_month[start]):%Y-%m-%d}")
+        os.makedirs(part_dir)
+        pq.write_table(table.slice(start, end - start), os.path.join(part_dir, "part-0.parquet"),
+                       row_group_size=ROW_GROUP_ROWS, write_statistics=True)
+
+    with open(os.path.join(tmp_dir, SOURCE_FILE), "w") as f:
+        f.write(source_signature(output_name))
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return len(arr_bounds) - 1
+
+
+def export(force=False, only=None):
+    # Rewrite the stale datasets; returns {output_name: partitions written}
+    dict_written = {}
+    for output_name in only or PARTITIONED_OUTPUTS:
+        if force or is_stale(output_name):
+            dict_written[output_name] = write(output_name)
+    return dict_written
+
+
+def dataset(output_name):
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor="hive")
+    return ds.dataset(dataset_dir(output_name), format="parquet", partitioning=partitioning,
+                      exclude_invalid_files=True)
+
+
+def months(output_name):
+    # Partition months present, ascending, read from the directory names only
+    list_names = [name for name in os.listdir(dataset_dir(output_name)) if name.startswith(PARTITION_COLUMN + "=")]
+    return pd.DatetimeIndex(sorted(pd.Timestamp(name.split("=", 1)[1]) for name in list_names))
+
+
+def read(output_name, month_from=None, month_through=None, loan_ids=None, columns=None, last_months=None):
+    # Filtered read with partition and row-group pruning; last_months=n keeps the n latest partitions
+    if last_months is not None:
+        month_from = months(output_name)[-last_months]
+
+    def both(left, right):
+        return right if left is None else left & right
+
+    expr = None
+
+    if month_from is not None:
+        expr = both(expr, ds.field(PARTITION_COLUMN) >= pa.scalar(pd.Timestamp(month_from).date(), pa.date32()))
+    if month_through is not None:
+        expr = both(expr, ds.field(PARTITION_COLUMN) <= pa.scalar(pd.Timestamp(month_through).date(), pa.date32()))
+    if loan_ids is not None:
+        arr_ids = np.unique(np.asarray(loan_ids, dtype=np.int64))
+        lo, hi  = (int(arr_ids[0]), int(arr_ids[-1])) if len(arr_ids) else (0, -1)
+        # The range lets the row-group statistics rule groups out before isin is evaluated
+        expr = both(expr, (ds.field("loan_id") >= lo) & (ds.field("loan_id") <= hi) &
+                          ds.field("loan_id").isin(pa.array(arr_ids)))
+
+    df = dataset(output_name).to_table(filter=expr, columns=columns).to_pandas()
+
+    # Back to the CSV layout: year_month first, dates as datetime64
+    for col in [c for c in PARTITIONED_OUTPUTS[output_name] if c in df.columns]:
+        df[col] = pd.to_datetime(df[col]).astype("datetime64[us]")
+    list_order = columns or [c for c in pd.read_csv(paths.generated_path(output_name), nrows=0).columns if c in df.columns]
+    return df[list_order].sort_values([c for c in ["loan_id", PARTITION_COLUMN] if c in df.columns]).reset_index(drop=True)
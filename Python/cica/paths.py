@@ -0,0 +1,46 @@
+import os
+
+# -----------------------------------------------------------
+# Project structure
+# -----------------------------------------------------------
+# .py files live in /Python
+# raw CSV files live in /Data_RAW
+# SQL outputs live in /Data_Generated
+# charts live in /Charts
+
+#
+# Another book with the same schema is picked up by pointing CICA_PROJECT_DIR at
+# its root (a folder holding its own Data_RAW / Data_Generated / Charts). The code
+# in /Python and /SQL is always this repo's. Reference tables shared by every
+# book (SHARED_TABLES) are read from CICA_REFERENCE_DIR/Data_RAW when the book
+# does not carry its own copy.
+
+PROJECT_DIR_ENV     = "CICA_PROJECT_DIR"
+REFERENCE_DIR_ENV   = "CICA_REFERENCE_DIR"
+SHARED_TABLES       = ["dim_month", "macro_monthly"]
+
+package_dir     = os.path.dirname(os.path.abspath(__file__))
+script_dir      = os.path.normpath(os.path.join(package_dir, ".."))
+repo_dir        = os.path.normpath(os.path.join(script_dir, ".."))
+project_dir     = os.path.normpath(os.environ.get(PROJECT_DIR_ENV) or repo_dir)
+reference_dir   = os.path.normpath(os.environ.get(REFERENCE_DIR_ENV) or repo_dir)
+
+raw_dir         = os.path.join(project_dir, "Data_RAW")
+data_dir        = os.path.join(project_dir, "Data_Generated")
+charts_dir      = os.path.join(project_dir, "Charts")
+sql_dir         = os.path.join(repo_dir, "SQL")
+
+
+def raw_path(table_name):
+    path = os.path.join(raw_dir, f"{table_name}.csv")
+    if table_name in SHARED_TABLES and not os.path.exists(path):
+        return os.path.join(reference_dir, "Data_RAW", f"{table_name}.csv")
+    return path
+
+
+def generated_path(output_name):
+    return os.path.join(data_dir, f"{output_name}.csv")
+
+
+def chart_path(chart_name):
+    return os.path.join(charts_dir, f"{chart_name}.png")
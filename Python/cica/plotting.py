@@ -0,0 +1,136 @@
+import numpy as np
+from matplotlib.collections import PathCollection
+from matplotlib.colors import is_color_like
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
+
+# -----------------------------------------------------------
+# Shared plotting helpers
+# -----------------------------------------------------------
+#
+# label_collection : many value labels as ONE artist. Each label becomes a glyph
+#                    outline (cached per distinct string) placed at its data point,
+#                    so drawing cost does not grow with a Text artist per bar/point.
+# lttb             : Largest-Triangle-Three-Buckets downsampling. Keeps the visual
+#                    shape (peaks, dips, kinks) of a dense line with a fixed number
+#                    of points, so render time stays flat as the data grows.
+
+ALIGN_X = {"left": 0.0, "center": 0.5, "right": 1.0}
+ALIGN_Y = {"bottom": 0.0, "center": 0.5, "top": 1.0}
+
+
+def label_collection(ax, x, y, labels, fontsize=11, fontweight="normal", color="black",
+                     ha="center", va="bottom", offset_points=(0.0, 0.0), zorder=3):
+    # x / y in data units (dates are fine), labels as strings.
+    # ha / va may be a single value or one value per label.
+    arr_x       = np.asarray(ax.convert_xunits(list(x)), dtype=float)
+    arr_y       = np.asarray(ax.convert_yunits(list(y)), dtype=float)
+    list_labels = [str(label) for label in labels]
+    n_labels    = len(list_labels)
+
+    arr_ha      = np.broadcast_to(np.asarray(ha, dtype=object), (n_labels,))
+    arr_va      = np.broadcast_to(np.asarray(va, dtype=object), (n_labels,))
+
+    is_drawn    = np.isfinite(arr_x) & np.isfinite(arr_y)
+    prop        = FontProperties(size=fontsize, weight=fontweight)
+
+    # Glyph outlines in points, anchored per ha / va; built once per distinct (label, ha, va)
+    dict_paths  = {}
+    list_paths  = []
+    for idx in np.flatnonzero(is_drawn):
+        key = (list_labels[idx], arr_ha[idx], arr_va[idx])
+        if key not in dict_paths:
+            text_path   = TextPath((0, 0), key[0], prop=prop)
+            bbox        = text_path.get_extents()
+            shift_x     = -bbox.x0 - ALIGN_X[key[1]] * bbox.width
+            shift_y     = -bbox.y0 - ALIGN_Y[key[2]] * bbox.height
+            dict_paths[key] = text_path.transformed(Affine2D().translate(shift_x + offset_points[0], shift_y + offset_points[1]))
+        list_paths.append(dict_paths[key])
+
+    # One colour for all labels, or one colour per label
+    arr_color   = color if is_color_like(color) else [c for c, keep in zip(color, is_drawn) if keep]
+
+    # Paths are in points: scale by 1/72 into inches, then the figure's dpi transform
+    collection  = PathCollection(
+                    list_paths,
+                    offsets=np.column_stack([arr_x[is_drawn], arr_y[is_drawn]]),
+                    offset_transform=ax.transData,
+                    transform=Affine2D().scale(1.0 / 72.0) + ax.figure.dpi_scale_trans,
+                    facecolors=arr_color,
+                    edgecolors="none",
+                    zorder=zorder,
+                  )
+
+    ax.add_collection(collection, autolim=False)
+
+    return collection
+
+
+def bar_value_labels(ax, bars, fmt="{:.0f}", skip_zero=True, match_bar_color=False, **kwargs):
+    # One label per bar at its top centre, drawn as a single collection
+    list_bars   = list(bars)
+    arr_x       = np.array([b.get_x() + b.get_width() / 2 for b in list_bars])
+    arr_h       = np.array([b.get_height() for b in list_bars], dtype=float)
+
+    is_kept     = np.isfinite(arr_h)
+    if skip_zero:
+        is_kept &= arr_h != 0
+
+    if match_bar_color:
+        kwargs["color"] = [b.get_facecolor() for b, keep in zip(list_bars, is_kept) if keep]
+
+    return label_collection(
+        ax,
+        arr_x[is_kept],
+        arr_h[is_kept],
+        [fmt.format(h) for h in arr_h[is_kept]],
+        **kwargs
+    )
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets. Returns the indices of the kept points.
+    # First and last points are always kept; each middle bucket keeps the point
+    # that forms the largest triangle with the previously kept point and the
+    # average of the next bucket.
+    arr_x   = np.asarray(x, dtype=float)
+    arr_y   = np.asarray(y, dtype=float)
+    n_in    = len(arr_x)
+
+    if n_out >= n_in or n_out < 3:
+        return np.arange(n_in)
+
+    arr_edges   = np.floor(np.linspace(1, n_in - 1, n_out - 1)).astype(np.int64)
+    arr_kept    = np.empty(n_out, dtype=np.int64)
+    arr_kept[0] = 0
+    arr_kept[-1]= n_in - 1
+
+    # Next-bucket averages for every bucket at once (last bucket looks at the final point)
+    arr_csum_x  = np.r_[0.0, np.cumsum(arr_x)]
+    arr_csum_y  = np.r_[0.0, np.cumsum(arr_y)]
+    arr_next_lo = np.r_[arr_edges[1:-1], n_in - 1]
+    arr_next_hi = np.r_[arr_edges[2:], n_in, n_in]
+    arr_next_hi = np.maximum(arr_next_hi[:len(arr_next_lo)], arr_next_lo + 1)
+    arr_avg_x   = (arr_csum_x[arr_next_hi] - arr_csum_x[arr_next_lo]) / (arr_next_hi - arr_next_lo)
+    arr_avg_y   = (arr_csum_y[arr_next_hi] - arr_csum_y[arr_next_lo]) / (arr_next_hi - arr_next_lo)
+
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi  = arr_edges[b], max(arr_edges[b + 1], arr_edges[b] + 1)
+        seg_x   = arr_x[lo:hi]
+        seg_y   = arr_y[lo:hi]
+        area    = np.abs(
+                    (arr_x[prev] - arr_avg_x[b]) * (seg_y - arr_y[prev])
+                    - (arr_x[prev] - seg_x) * (arr_avg_y[b] - arr_y[prev])
+                  )
+        prev            = lo + int(np.argmax(area))
+        arr_kept[b + 1] = prev
+
+    return arr_kept
+
+
+def downsample(x, y, n_out=2000):
+    # Convenience wrapper for Series / arrays: returns (x, y) at the kept points
+    arr_idx = lttb(np.asarray(x, dtype=float), y, n_out)
+    return np.asarray(x)[arr_idx], np.asarray(y)[arr_idx]
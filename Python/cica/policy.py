@@ -0,0 +1,255 @@
+import numpy as np
+import pandas as pd
+
+from cica import index, risk_params, tables
+
+# -----------------------------------------------------------
+# Credit policy threshold sweep over decision_score (3.5)
+# -----------------------------------------------------------
+#
+# Every application gets an expected PD from its decision_score, an amount, an
+# expected loss and an expected profit. Sorting by score once (best first) turns
+# "approve everything at or above threshold t" into a prefix of the sorted rows,
+# so every possible threshold is answered by cumulative sums: O(n log n) overall
+# instead of a Python loop over candidate cutoffs.
+#
+# Two-threshold bands (reject < low <= review < high <= approve) use the same idea
+# on a fixed grid of score cutoffs: bincount into (segment, grid bin), cumsum
+# across bins, and every (low, high) pair is a difference of two prefix sums.
+#
+# PD(score)     : logistic fit of is_default_12m on decision_score over booked,
+#                 PD-eligible loans (03_1). Declined applications get the same curve.
+# amount        : approved_amount, or the tier median approved amount if declined
+# loss          : PD x amount x tier LGD (03_3)
+# profit        : (1 - PD) x amount x tier yield - loss, where yield is scheduled
+#                 fee/interest plus origination fee per unit of principal
+
+SEGMENT_COLUMNS         = ["risk_tier_at_signup", "application_month"]
+
+BAND_GRID_SIZE          = 21        # cutoffs at every 5th percentile of decision_score
+REVIEW_APPROVAL_SHARE   = 0.50      # share of the review band that ends up approved
+
+
+def fit_score_pd(arr_score, arr_default, n_iter=50):
+    # Two-parameter logistic regression by Newton steps (score standardised for stability)
+    score_mean      = arr_score.mean()
+    score_sd        = arr_score.std() or 1.0
+    arr_x           = np.column_stack([np.ones_like(arr_score), (arr_score - score_mean) / score_sd])
+    arr_beta        = np.zeros(2)
+
+    for _ in range(n_iter):
+        arr_p       = 1.0 / (1.0 + np.exp(-(arr_x @ arr_beta)))
+        arr_grad    = arr_x.T @ (arr_default - arr_p)
+        arr_hess    = (arr_x * (arr_p * (1.0 - arr_p))[:, None]).T @ arr_x
+        arr_step    = np.linalg.solve(arr_hess + 1e-9 * np.eye(2), arr_grad)
+        arr_beta    = arr_beta + arr_step
+        if np.abs(arr_step).max() < 1e-10:
+            break
+
+    def predict(arr_new_score):
+        arr_z = arr_beta[0] + arr_beta[1] * (np.asarray(arr_new_score, dtype=float) - score_mean) / score_sd
+        return 1.0 / (1.0 + np.exp(-arr_z))
+
+    return predict
+
+
+def application_economics(raw=None):
+    # One row per application with expected PD, amount, loss and profit
+    raw             = dict(raw or {})
+    ex              = index.load_index(raw or None)
+    raw             = tables.load_raw_tables(["applications", "customers", "loans", "payment_schedule"], raw)
+
+    df_pd_table     = tables.load_generated("03_1_probability_of_default")
+
+    # Applicant tier through the entity index
+    df_apps         = raw["applications"].copy()
+    df_apps["risk_tier_at_signup"] = raw["customers"]["risk_tier_at_signup"].to_numpy()[
+                                        ex.customer_rows(df_apps["customer_id"].to_numpy())]
+    df_apps["application_month"] = df_apps["application_date"].dt.to_period("M").dt.to_timestamp()
+
+    # Observed 12M outcome for booked, PD-eligible loans, keyed by the loan's application_id
+    df_eligible     = df_pd_table.loc[df_pd_table["is_pd_eligible"] == 1, ["loan_id", "is_default_12m"]]
+    arr_app_id      = raw["loans"]["application_id"].to_numpy()[ex.loan_rows(df_eligible["loan_id"].to_numpy())]
+    srs_outcome     = pd.Series(df_eligible["is_default_12m"].to_numpy(dtype=float), index=arr_app_id)
+    df_apps["is_default_12m"] = df_apps["application_id"].map(srs_outcome)
+
+    is_observed     = df_apps["is_default_12m"].notna().to_numpy()
+    predict_pd      = fit_score_pd(
+                        df_apps.loc[is_observed, "decision_score"].to_numpy(dtype=float),
+                        df_apps.loc[is_observed, "is_default_12m"].to_numpy(dtype=float)
+                      )
+    df_apps["expected_pd"] = predict_pd(df_apps["decision_score"].to_numpy())
+
+    # Amount: approved amount, or what a typical approval in the same tier would have been
+    # (declined rows carry approved_amount = 0)
+    is_approved     = (df_apps["decision"] == "approved").to_numpy()
+    srs_approved    = df_apps["approved_amount"].where(is_approved)
+    srs_tier_amount = srs_approved.groupby(df_apps["risk_tier_at_signup"]).median()
+
+    df_apps["amount"] = srs_approved.fillna(df_apps["risk_tier_at_signup"].map(srs_tier_amount))
+    df_apps["amount"] = df_apps["amount"].fillna(srs_approved.median())
+
+    # Tier LGD and yield
+    list_tiers              = sorted(df_apps["risk_tier_at_signup"].dropna().unique())
+    srs_lgd, overall_lgd    = risk_params.lgd_by_tier()
+
+    # Scheduled fee/interest per loan is a reduceat over its schedule rows (CSR loan order)
+    arr_fee         = raw["payment_schedule"]["due_fee_interest"].fillna(0.0).to_numpy()[ex.schedule_row]
+    df_loans        = raw["loans"].iloc[ex.loan_row]
+    df_yield        = pd.DataFrame({
+                        "risk_tier_at_signup"   : raw["customers"]["risk_tier_at_signup"].to_numpy()[ex.customer_row[ex.loan_customer_pos]],
+                        "income"                : ex.sum_schedule_by_loan(arr_fee) + df_loans["origination_fee_amount"].to_numpy(),
+                        "principal"             : df_loans["principal"].to_numpy(),
+                      })
+    df_yield        = df_yield.groupby("risk_tier_at_signup")[["income", "principal"]].sum()
+    srs_yield       = df_yield["income"] / df_yield["principal"]
+    overall_yield   = float(df_yield["income"].sum() / df_yield["principal"].sum())
+
+    arr_tier_lgd    = pd.Series(risk_params.align_to_tiers(srs_lgd, overall_lgd, list_tiers), index=list_tiers)
+    arr_tier_yield  = pd.Series(risk_params.align_to_tiers(srs_yield, overall_yield, list_tiers), index=list_tiers)
+
+    df_apps["lgd_rate"]         = df_apps["risk_tier_at_signup"].map(arr_tier_lgd).fillna(overall_lgd)
+    df_apps["yield_rate"]       = df_apps["risk_tier_at_signup"].map(arr_tier_yield).fillna(overall_yield)
+    df_apps["expected_loss"]    = df_apps["expected_pd"] * df_apps["amount"] * df_apps["lgd_rate"]
+    df_apps["expected_profit"]  = (1.0 - df_apps["expected_pd"]) * df_apps["amount"] * df_apps["yield_rate"] - df_apps["expected_loss"]
+
+    return df_apps
+
+
+def _segment_frame(df_apps, segment_col):
+    # The whole book is its own segment ("portfolio" / "all")
+    if segment_col is None:
+        return pd.Series("portfolio", index=df_apps.index), pd.Series("all", index=df_apps.index)
+
+    srs_value = df_apps[segment_col]
+    if pd.api.types.is_datetime64_any_dtype(srs_value):
+        srs_value = srs_value.dt.strftime("%Y-%m-%d")
+
+    return pd.Series(segment_col, index=df_apps.index), srs_value.astype(str)
+
+
+def threshold_sweep(df_apps, segment_col=None):
+    # Metrics for "approve if score >= t" at every distinct score, per segment
+    srs_type, srs_segment   = _segment_frame(df_apps, segment_col)
+    arr_segment_code, arr_segment_labels = pd.factorize(srs_segment, sort=True)
+
+    arr_score       = df_apps["decision_score"].to_numpy(dtype=float)
+    arr_order       = np.lexsort((-arr_score, arr_segment_code))
+
+    arr_seg         = arr_segment_code[arr_order]
+    arr_score_s     = arr_score[arr_order]
+    is_seg_start    = np.r_[True, arr_seg[1:] != arr_seg[:-1]]
+    arr_seg_start   = np.flatnonzero(is_seg_start)
+    arr_seg_size    = np.diff(np.r_[arr_seg_start, len(arr_seg)])
+
+    def seg_cumsum(arr_values):
+        # Running total that restarts at each segment
+        arr_cum     = np.cumsum(arr_values[arr_order])
+        arr_base    = np.r_[0.0, arr_cum][arr_seg_start]
+        return arr_cum - np.repeat(arr_base, arr_seg_size)
+
+    arr_n           = seg_cumsum(np.ones(len(arr_score)))
+    arr_pd_sum      = seg_cumsum(df_apps["expected_pd"].to_numpy(dtype=float))
+    arr_loss        = seg_cumsum(df_apps["expected_loss"].to_numpy(dtype=float))
+    arr_profit      = seg_cumsum(df_apps["expected_profit"].to_numpy(dtype=float))
+    arr_amount      = seg_cumsum(df_apps["amount"].to_numpy(dtype=float))
+
+    arr_observed    = df_apps["is_default_12m"].to_numpy(dtype=float)
+    arr_obs_n       = seg_cumsum(np.where(np.isnan(arr_observed), 0.0, 1.0))
+    arr_obs_bad     = seg_cumsum(np.nan_to_num(arr_observed, nan=0.0))
+
+    # With tied scores only the last row of the tie describes the threshold
+    is_last_of_tie  = np.r_[(arr_seg[1:] != arr_seg[:-1]) | (arr_score_s[1:] != arr_score_s[:-1]), True]
+
+    arr_seg_total   = np.repeat(arr_seg_size, arr_seg_size).astype(float)
+
+    df_sweep = pd.DataFrame({
+        "segment_type"          : srs_type.to_numpy()[arr_order],
+        "segment"               : arr_segment_labels[arr_seg],
+        "threshold"             : arr_score_s,
+        "n_applications"        : arr_seg_total.astype(int),
+        "n_approved"            : arr_n.astype(int),
+        "approval_rate"         : arr_n / arr_seg_total,
+        "approved_amount"       : arr_amount,
+        "expected_bad_rate"     : arr_pd_sum / arr_n,
+        "expected_loss"         : arr_loss,
+        "expected_profit"       : arr_profit,
+        "observed_bad_rate"     : np.where(arr_obs_n > 0, arr_obs_bad / np.maximum(arr_obs_n, 1.0), np.nan),
+    })
+
+    return df_sweep.loc[is_last_of_tie].reset_index(drop=True)
+
+
+def band_sweep(df_apps, segment_col=None, grid_size=BAND_GRID_SIZE, review_share=REVIEW_APPROVAL_SHARE):
+    # Every (reject_below, approve_from) pair on a percentile grid of decision_score
+    srs_type, srs_segment   = _segment_frame(df_apps, segment_col)
+    arr_segment_code, arr_segment_labels = pd.factorize(srs_segment, sort=True)
+    n_seg           = len(arr_segment_labels)
+
+    arr_score       = df_apps["decision_score"].to_numpy(dtype=float)
+    arr_cutoffs     = np.unique(np.quantile(arr_score, np.linspace(0.0, 1.0, grid_size)))
+    n_cut           = len(arr_cutoffs)
+
+    # bin b holds scores in [cutoff b, cutoff b+1); scores below the first cutoff never happen
+    arr_bin         = np.clip(np.searchsorted(arr_cutoffs, arr_score, side="right") - 1, 0, n_cut - 1)
+    arr_cell        = arr_segment_code * n_cut + arr_bin
+
+    def tail_sums(arr_values):
+        # tail[s, b] = total over scores >= cutoff b in segment s
+        arr_grid    = np.bincount(arr_cell, weights=arr_values, minlength=n_seg * n_cut).reshape(n_seg, n_cut)
+        arr_tail    = np.cumsum(arr_grid[:, ::-1], axis=1)[:, ::-1]
+        return np.concatenate([arr_tail, np.zeros((n_seg, 1))], axis=1)
+
+    arr_n           = tail_sums(np.ones(len(arr_score)))
+    arr_pd_sum      = tail_sums(df_apps["expected_pd"].to_numpy(dtype=float))
+    arr_loss        = tail_sums(df_apps["expected_loss"].to_numpy(dtype=float))
+    arr_profit      = tail_sums(df_apps["expected_profit"].to_numpy(dtype=float))
+
+    # low <= high index pairs
+    arr_lo, arr_hi  = np.triu_indices(n_cut)
+
+    def band(arr_tail, idx_from, idx_to):
+        return arr_tail[:, idx_from] - arr_tail[:, idx_to]
+
+    arr_total       = arr_n[:, [0]]
+    n_pairs         = len(arr_lo)
+
+    arr_n_approve   = arr_n[:, arr_hi]
+    arr_n_review    = band(arr_n, arr_lo, arr_hi)
+    arr_pd_approve  = arr_pd_sum[:, arr_hi]
+    arr_pd_review   = band(arr_pd_sum, arr_lo, arr_hi)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dict_cols = {
+            "approve_rate"              : arr_n_approve / arr_total,
+            "review_rate"               : arr_n_review / arr_total,
+            "reject_rate"               : (arr_total - arr_n[:, arr_lo]) / arr_total,
+            "approve_bad_rate"          : arr_pd_approve / arr_n_approve,
+            "review_bad_rate"           : arr_pd_review / arr_n_review,
+            "expected_loss_approve"     : arr_loss[:, arr_hi],
+            "expected_profit_approve"   : arr_profit[:, arr_hi],
+            "expected_profit_review"    : band(arr_profit, arr_lo, arr_hi),
+        }
+
+    dict_cols["expected_profit_policy"] = dict_cols["expected_profit_approve"] + review_share * dict_cols["expected_profit_review"]
+
+    df_band = pd.DataFrame({
+        "segment_type"      : np.repeat(srs_type.iloc[0] if len(srs_type) else segment_col, n_seg * n_pairs),
+        "segment"           : np.repeat(arr_segment_labels.to_numpy(), n_pairs),
+        "reject_below"      : np.tile(arr_cutoffs[arr_lo], n_seg),
+        "approve_from"      : np.tile(arr_cutoffs[arr_hi], n_seg),
+        "n_applications"    : np.repeat(arr_total[:, 0], n_pairs).astype(int),
+    })
+
+    for col, arr_val in dict_cols.items():
+        df_band[col] = np.nan_to_num(arr_val, nan=0.0).reshape(-1) if col.startswith("expected") else arr_val.reshape(-1)
+
+    return df_band
+
+
+def sweep_all_segments(df_apps):
+    # Portfolio plus every segment column, stacked
+    list_single = [threshold_sweep(df_apps)] + [threshold_sweep(df_apps, col) for col in SEGMENT_COLUMNS]
+    list_band   = [band_sweep(df_apps)] + [band_sweep(df_apps, col) for col in SEGMENT_COLUMNS]
+
+    return pd.concat(list_single, ignore_index=True), pd.concat(list_band, ignore_index=True)
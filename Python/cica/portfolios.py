@@ -0,0 +1,215 @@
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# -----------------------------------------------------------
+# Many books, one worker pool
+# -----------------------------------------------------------
+#
+# A portfolio root is a folder with the CICA Prime layout (Data_RAW,
+# Data_Generated, Charts). Every root goes through the same pipeline as
+# "python -m cica sql" followed by "python -m cica build":
+#
+#   plan        validate the raw tables, run the SQL (cica.querycache: outputs
+#               whose key is cached are copied, the rest execute in Postgres),
+#               refresh the Parquet exports, and fingerprint every chart spec
+#               against the root's manifest
+#   render      one task per stale chart spec
+#   finish      record the rendered fingerprints in the root's manifest
+#
+# A root failing validation renders nothing; a failed render is reported and
+# leaves that spec stale for the next run.
+#
+# The SQL step needs a database (CICA_DATABASE_URL). Without one it is skipped,
+# and run() refuses up front any root whose Data_Generated does not already hold
+# every SQL output, instead of letting its plan fail on the first missing CSV.
+#
+# All tasks of all roots share one process pool of n_workers, so wall time
+# follows the total work divided by the cores, not the number of roots. A
+# root's render tasks are queued as soon as its plan comes back, while other
+# roots are still planning.
+#
+# Each task runs in a fresh process (max_tasks_per_child=1) with
+# CICA_PROJECT_DIR pointing at its root before anything from cica is imported,
+# so the module-level paths (entity index, caches, manifest) all resolve inside
+# that root. Reference tables (cica.paths.SHARED_TABLES) come from one shared
+# reference root when a book does not have its own copy.
+#
+# This module only imports the standard library at the top, so unpickling the
+# task function in a worker does not import the rest of cica too early.
+#
+# consolidate() stacks every generated CSV the roots have in common into one
+# table with a leading `portfolio` column.
+
+
+def portfolio_name(root):
+    return os.path.basename(os.path.normpath(root))
+
+
+def _run_task(kind, root, reference_dir, payload):
+    # Runs in a fresh worker process; returns (kind, root, result).
+    # Nothing but cica.paths is imported yet, so re-reading it is enough to switch roots.
+    from cica import paths
+    os.environ[paths.PROJECT_DIR_ENV]   = root
+    os.environ[paths.REFERENCE_DIR_ENV] = reference_dir
+    importlib.reload(paths)
+
+    from cica import partitions, querycache, render, validate
+    from cica.charts import CHART_SPECS
+
+    if kind == "plan":
+        df_summary, _   = validate.validate()
+        n_errors        = validate.n_errors(df_summary)
+        if n_errors:
+            return kind, root, {"n_errors": n_errors, "stale": [], "skipped": [], "hashes": {}}
+
+        if payload["sql"]:
+            os.makedirs(paths.data_dir, exist_ok=True)
+            try:
+                querycache.run(log=lambda line: None)
+            except SystemExit as exc:
+                # PostgresRunner reports a missing driver / connection this way; keep the worker alive
+                raise RuntimeError(str(exc)) from None
+        partitions.export()
+        dict_manifest   = render.load_manifest()
+        dict_hash       = {render.spec_name(s): render.fingerprint(s) for s in CHART_SPECS}
+        list_stale      = [render.spec_name(s) for s in CHART_SPECS
+                           if payload["force"] or not render.is_current(s, dict_manifest, dict_hash[render.spec_name(s)])]
+        return kind, root, {
+            "n_errors"  : 0,
+            "stale"     : [name for name in list_stale if not payload["only"] or name.startswith(tuple(payload["only"]))],
+            "skipped"   : [name for name in dict_hash if name not in list_stale],
+            "hashes"    : dict_hash,
+        }
+
+    if kind == "render":
+        spec = next(s for s in CHART_SPECS if render.spec_name(s) == payload["spec"])
+        os.makedirs(os.path.join(root, "Charts"), exist_ok=True)
+        name, list_saved, seconds = render.render_spec(spec)
+        return kind, root, {"spec": name, "n_charts": len(list_saved), "seconds": seconds}
+
+    if kind == "finish":
+        dict_manifest = render.load_manifest()
+        dict_manifest.update(payload["hashes"])
+        render.save_manifest(dict_manifest)
+        return kind, root, {}
+
+    raise ValueError(f"unknown task kind: {kind}")
+
+
+def run(roots, n_workers=None, reference_dir=None, force=False, only=None, log=print):
+    # Full pipeline for every root on one shared pool; returns one summary row per root
+    from cica import paths
+
+    from cica import querycache
+
+    list_roots      = [os.path.abspath(root) for root in roots]
+    for root in list_roots:
+        if not os.path.isdir(os.path.join(root, "Data_RAW")):
+            raise ValueError(f"not a portfolio root (no Data_RAW): {root}")
+
+    # Without a database the SQL cannot run, so every root must already hold its outputs
+    run_sql         = bool(os.environ.get(querycache.DATABASE_URL_ENV))
+    if not run_sql:
+        for root in list_roots:
+            list_missing = [name for name in querycache.query_names()
+                            if not os.path.exists(os.path.join(root, "Data_Generated", f"{name}.csv"))]
+            if list_missing:
+                raise ValueError(f"{root}: Data_Generated is missing {len(list_missing)} SQL outputs "
+                                 f"({', '.join(list_missing[:3])}{', ...' if len(list_missing) > 3 else ''}); set {querycache.DATABASE_URL_ENV} "
+                                 f"to generate them, or run the SQL for this root first")
+
+    reference_dir   = os.path.abspath(reference_dir or paths.repo_dir)
+    n_workers       = n_workers or os.cpu_count() or 1
+    dict_state      = {root: {"portfolio": portfolio_name(root), "n_errors": 0, "rendered": 0, "skipped": 0,
+                              "failed": 0, "pending": 0, "hashes": {}, "done": {}, "seconds": None}
+                       for root in list_roots}
+    time_start      = time.perf_counter()
+
+    context         = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, max_tasks_per_child=1) as pool:
+        dict_futures = {}
+
+        def submit(kind, root, payload):
+            dict_futures[pool.submit(_run_task, kind, root, reference_dir, payload)] = (kind, root)
+
+        def render_finished(root):
+            # Last render of a root back: write its manifest (or just stop the clock)
+            state = dict_state[root]
+            if state["pending"]:
+                return
+            if state["done"]:
+                submit("finish", root, {"hashes": state["done"]})
+            else:
+                state["seconds"] = time.perf_counter() - time_start
+
+        for root in list_roots:
+            submit("plan", root, {"force": force, "only": only or [], "sql": run_sql})
+
+        while dict_futures:
+            set_done, _ = wait(dict_futures, return_when=FIRST_COMPLETED)
+            for future in set_done:
+                kind, root  = dict_futures.pop(future)
+                state       = dict_state[root]
+
+                if future.exception() is not None:
+                    log(f"{state['portfolio']}: {kind} failed: {future.exception()!r}")
+                    state["failed"] += 1
+                    if kind == "render":
+                        state["pending"] -= 1
+                        render_finished(root)
+                    continue
+
+                result = future.result()[2]
+
+                if kind == "plan":
+                    state["n_errors"]   = result["n_errors"]
+                    state["skipped"]    = len(result["skipped"])
+                    state["hashes"]     = result["hashes"]
+                    state["pending"]    = len(result["stale"])
+                    if result["n_errors"]:
+                        log(f"{state['portfolio']}: {result['n_errors']} validation error rows, nothing rendered")
+                    else:
+                        log(f"{state['portfolio']}: {len(result['stale'])} stale, {len(result['skipped'])} up to date")
+                    for name in result["stale"]:
+                        submit("render", root, {"spec": name})
+                    render_finished(root)
+
+                elif kind == "render":
+                    state["pending"]    -= 1
+                    state["rendered"]   += 1
+                    state["done"][result["spec"]] = state["hashes"][result["spec"]]
+                    log(f"{state['portfolio']}: rendered {result['spec']} in {result['seconds']:.2f}s")
+                    render_finished(root)
+
+                else:
+                    state["seconds"] = time.perf_counter() - time_start
+
+    return [{"portfolio": state["portfolio"], "root": root, "n_errors": state["n_errors"], "rendered": state["rendered"],
+             "skipped": state["skipped"], "failed": state["failed"], "seconds": state["seconds"]}
+            for root, state in dict_state.items()]
+
+
+def consolidate(roots, out_dir):
+    # One CSV per generated table the roots have in common, with a leading portfolio column
+    import pandas as pd
+
+    from cica import tables
+
+    list_roots  = [os.path.abspath(root) for root in roots]
+    list_sets   = [{f[:-4] for f in os.listdir(os.path.join(root, "Data_Generated")) if f.endswith(".csv")}
+                   for root in list_roots]
+    list_names  = sorted(set.intersection(*list_sets)) if list_sets else []
+
+    os.makedirs(out_dir, exist_ok=True)
+    for output_name in list_names:
+        list_frames = []
+        for root in list_roots:
+            df = pd.read_csv(os.path.join(root, "Data_Generated", f"{output_name}.csv"), na_values=tables.NULL_VALUES)
+            df.insert(0, "portfolio", portfolio_name(root))
+            list_frames.append(df)
+        pd.concat(list_frames, ignore_index=True).to_csv(os.path.join(out_dir, f"{output_name}.csv"), index=False)
+
+    return list_names
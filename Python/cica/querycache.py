@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from cica import paths, tables
+
+# -----------------------------------------------------------
+# Result cache for the SQL query outputs
+# -----------------------------------------------------------
+#
+# Every SQL/<name>.txt materializes one table, cica_prime."<name>", which is
+# exported to Data_Generated/<name>.csv. Some of them read other outputs
+# (03_3 reads 03_2, 01_4d reads 01_4c, 02_3b / 02_4 read 02_3a), so the queries
+# form a small dependency graph, found by reading the FROM / JOIN targets.
+#
+# Each output gets a key:
+#
+#   sha256( normalized SQL text
+#           + version of every table it reads )
+#
+#   normalized      comments dropped, whitespace collapsed, unquoted text
+#                   lower-cased (string literals and quoted names untouched)
+#   raw table       size and mtime of its Data_RAW CSV
+#   query output    that query's own key
+#
+# so editing one CTE in 03_2 changes the keys of 03_2 and of 03_3, and nothing
+# else. run() walks the graph upstream first: a key already in the cache is
+# copied to Data_Generated, a new key is executed and stored.
+#
+# The cache lives in Data_Generated/.query_cache (one CSV and one column list per
+# key) and is kept under CACHE_BUDGET_BYTES by evicting the least recently used
+# entries. A hit touches its entry.
+#
+# _STATE.json records which key each Data_Generated CSV and each database table
+# currently holds. A hit whose CSV is already in place is not copied again (so
+# its mtime, which cica.partitions watches, does not move). A query executing in
+# Postgres needs its upstream tables as they are in the cache, not as an older
+# run left them: an upstream served from the cache is copied back into the
+# database (restore) only when a dependent is about to execute and the database
+# holds a different key.
+#
+# The runner is anything with execute(name, sql, out_path) -> columns and
+# restore(name, csv_path, columns). PostgresRunner needs psycopg and a
+# connection string in CICA_DATABASE_URL.
+
+SCHEMA              = "cica_prime"
+CACHE_DIR           = os.path.join(paths.data_dir, ".query_cache")
+CACHE_BUDGET_BYTES  = 2 << 30
+STATE_FILE          = "_STATE.json"
+DATABASE_URL_ENV    = "CICA_DATABASE_URL"
+COPY_OPTIONS        = "(FORMAT csv, HEADER, NULL 'NULL')"
+
+# String literals and quoted names are kept as they are; everything else is normalized
+TOKEN_PATTERN       = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\s+|[^'"\s/-]+|.""", re.DOTALL)
+SOURCE_PATTERN      = re.compile(r"""\b(?:from|join)\s+(?:\w+\s*\.\s*)?"?(\w+)"?""", re.IGNORECASE)
+
+
+def query_names():
+    return sorted(f[:-4] for f in os.listdir(paths.sql_dir) if f[:2].isdigit() and f.endswith(".txt"))
+
+
+def sql_path(name):
+    return os.path.join(paths.sql_dir, f"{name}.txt")
+
+
+def read_sql(name):
+    with open(sql_path(name), encoding="utf-8") as f:
+        return f.read()
+
+
+def normalize_sql(text):
+    list_parts = []
+    for token in TOKEN_PATTERN.findall(text):
+        if token.startswith(("--", "/*")) or token.isspace():
+            if list_parts and list_parts[-1] != " ":
+                list_parts.append(" ")
+        elif token.startswith(("'", '"')):
+            list_parts.append(token)
+        else:
+            list_parts.append(token.lower())
+    return "".join(list_parts).strip().rstrip(";").strip()
+
+
+def dependencies(name, text=None):
+    # Raw tables and other query outputs this query reads (CTE names drop out)
+    set_known   = set(tables.RAW_TABLES) | set(query_names())
+    list_found  = SOURCE_PATTERN.findall(text if text is not None else read_sql(name))
+    return sorted({source for source in list_found if source in set_known and source != name})
+
+
+def upstream_order(names=None):
+    # Requested queries plus every query they read, upstream first
+    dict_deps   = {name: dependencies(name) for name in query_names()}
+    list_order  = []
+
+    def visit(name, stack):
+        if name in list_order:
+            return
+        if name in stack:
+            raise ValueError(f"query dependency cycle: {' -> '.join(stack + [name])}")
+        for dep in dict_deps[name]:
+            if dep in dict_deps:
+                visit(dep, stack + [name])
+        list_order.append(name)
+
+    for name in names or dict_deps:
+        if name not in dict_deps:
+            raise ValueError(f"no SQL file for {name}")
+        visit(name, [])
+    return list_order, dict_deps
+
+
+def raw_version(table_name):
+    stat = os.stat(paths.raw_path(table_name))
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def query_keys(names=None):
+    # {name: key} for the requested queries and their upstream, plus the dependency map
+    list_order, dict_deps = upstream_order(names)
+    dict_keys   = {}
+    for name in list_order:
+        dict_versions = {dep: dict_keys[dep] if dep in dict_keys else raw_version(dep) for dep in dict_deps[name]}
+        digest = hashlib.sha256(normalize_sql(read_sql(name)).encode())
+        digest.update(json.dumps(dict_versions, sort_keys=True).encode())
+        dict_keys[name] = digest.hexdigest()
+    return dict_keys, dict_deps
+
+
+# -----------------------------------------------------------
+# Disk cache with LRU eviction
+# -----------------------------------------------------------
+
+def _entry_paths(key):
+    return os.path.join(CACHE_DIR, f"{key}.csv"), os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def lookup(key):
+    # (csv path, meta) of a cached result, touched as most recently used; None on a miss
+    csv_path, meta_path = _entry_paths(key)
+    if not (os.path.exists(csv_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path) as f:
+        dict_meta = json.load(f)
+    for path in (csv_path, meta_path):
+        os.utime(path)
+    return csv_path, dict_meta
+
+
+def store(key, name, out_path, columns):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    csv_path, meta_path = _entry_paths(key)
+    shutil.copyfile(out_path, csv_path + ".tmp")
+    os.replace(csv_path + ".tmp", csv_path)
+    with open(meta_path, "w") as f:
+        json.dump({"name": name, "columns": columns, "stored": time.time()}, f)
+
+
+def entries():
+    # [(key, bytes, last used)] oldest first
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    list_entries = []
+    for file_name in os.listdir(CACHE_DIR):
+        if not file_name.endswith(".csv"):
+            continue
+        key                 = file_name[:-4]
+        csv_path, meta_path = _entry_paths(key)
+        n_bytes             = os.path.getsize(csv_path) + (os.path.getsize(meta_path) if os.path.exists(meta_path) else 0)
+        list_entries.append((key, n_bytes, os.path.getmtime(csv_path)))
+    return sorted(list_entries, key=lambda entry: entry[2])
+
+
+def evict(budget_bytes=CACHE_BUDGET_BYTES, keep=()):
+    # Drop least recently used entries until the cache fits the budget; returns the keys removed
+    list_entries    = entries()
+    n_total         = sum(n_bytes for _, n_bytes, _ in list_entries)
+    list_removed    = []
+    for key, n_bytes, _ in list_entries:
+        if n_total <= budget_bytes:
+            break
+        if key in keep:
+            continue
+        for path in _entry_paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+        n_total -= n_bytes
+        list_removed.append(key)
+    return list_removed
+
+
+def _load_state():
+    # {"generated": {name: key}, "database": {name: key}}
+    path = os.path.join(CACHE_DIR, STATE_FILE)
+    if not os.path.exists(path):
+        return {"generated": {}, "database": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(dict_state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, STATE_FILE), "w") as f:
+        json.dump(dict_state, f, indent=2, sort_keys=True)
+
+
+# -----------------------------------------------------------
+# Running the queries
+# -----------------------------------------------------------
+
+class PostgresRunner:
+    # CREATE TABLE ... AS <query>, then COPY the table out in the Data_Generated CSV format
+
+    def __init__(self, dsn=None):
+        try:
+            import psycopg
+        except ImportError:
+            raise SystemExit("cica: running the SQL needs psycopg (pip install psycopg)") from None
+
+        dsn = dsn or os.environ.get(DATABASE_URL_ENV)
+        if not dsn:
+            raise SystemExit(f"cica: set {DATABASE_URL_ENV} to a Postgres connection string to run the SQL")
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        self.conn.execute(f"SET search_path TO {SCHEMA}, public")
+
+    def _table(self, name):
+        return f'{SCHEMA}."{name}"'
+
+    def execute(self, name, sql, out_path):
+        self.conn.execute(f"DROP TABLE IF EXISTS {self._table(name)}")
+        self.conn.execute(f"CREATE TABLE {self._table(name)} AS {sql.strip().rstrip(';')}")
+        list_columns = [[col, col_type] for col, col_type in self.conn.execute(
+            "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+            [self._table(name)]).fetchall()]
+
+        # A freshly created table scans in insertion order, i.e. the query's ORDER BY
+        with self.conn.cursor() as cur, open(out_path, "wb") as f:
+            with cur.copy(f"COPY {self._table(name)} TO STDOUT WITH {COPY_OPTIONS}") as copy:
+                for block in copy:
+                    f.write(block)
+        return list_columns
+
+    def restore(self, name, csv_path, columns):
+        list_cols = ", ".join(f'"{col}" {col_type}' for col, col_type in columns)
+        self.conn.execute(f"DROP TABLE IF EXISTS {self._table(name)}")
+        self.conn.execute(f"CREATE TABLE {self._table(name)} ({list_cols})")
+        with self.conn.cursor() as cur, open(csv_path, "rb") as f:
+            with cur.copy(f"COPY {self._table(name)} FROM STDIN WITH {COPY_OPTIONS}") as copy:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    copy.write(block)
+
+    def close(self):
+        self.conn.close()
+
+
+def plan(names=None, force=False):
+    # One row per query, upstream first: name, key, and whether the cache already holds it
+    dict_keys, dict_deps = query_keys(names)
+    return [{"name": name, "key": key, "cached": not force and os.path.exists(_entry_paths(key)[0]),
+             "reads": dict_deps[name]}
+            for name, key in dict_keys.items()]
+
+
+def run(names=None, runner=None, force=False, budget_bytes=CACHE_BUDGET_BYTES, log=print):
+    # Serve unchanged outputs from the cache, execute the rest; returns one row per query
+    list_plan       = plan(names, force)
+    dict_meta       = {}
+    dict_state      = _load_state()
+    list_rows       = []
+
+    for row in list_plan:
+        name, key   = row["name"], row["key"]
+        out_path    = paths.generated_path(name)
+        time_start  = time.perf_counter()
+        hit         = None if force else lookup(key)
+
+        if hit is not None:
+            csv_path, dict_meta[name] = hit
+            if dict_state["generated"].get(name) != key or not os.path.exists(out_path):
+                shutil.copyfile(csv_path, out_path)
+                dict_state["generated"][name] = key
+            status                      = "cached"
+        else:
+            if runner is None:
+                runner = PostgresRunner()
+            # Upstream tables in the database must hold the versions this key was built from
+            for dep in row["reads"]:
+                if dep in dict_meta and dict_state["database"].get(dep) != dict_meta[dep]["key"]:
+                    runner.restore(dep, _entry_paths(dict_meta[dep]["key"])[0], dict_meta[dep]["columns"])
+                    dict_state["database"][dep] = dict_meta[dep]["key"]
+
+            columns                     = runner.execute(name, read_sql(name), out_path)
+            store(key, name, out_path, columns)
+            dict_meta[name]             = {"name": name, "columns": columns}
+            dict_state["generated"][name] = key
+            dict_state["database"][name]  = key
+            status                      = "executed"
+
+        dict_meta[name]["key"]  = key
+        _save_state(dict_state)
+        seconds                 = time.perf_counter() - time_start
+        log(f"{name:<44} {status:<9} {seconds:.2f}s")
+        list_rows.append({"name": name, "key": key[:12], "status": status, "seconds": seconds})
+
+    evict(budget_bytes, keep={row["key"] for row in list_plan})
+    return list_rows
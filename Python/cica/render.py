@@ -0,0 +1,158 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cica import paths
+from cica.charts import CHART_SPECS
+
+# -----------------------------------------------------------
+# Cached, parallel, headless chart rendering
+# -----------------------------------------------------------
+#
+# Each chart spec gets a fingerprint: a hash of its input files, its script and
+# the cica modules it uses. The fingerprint of the last successful render is kept
+# in Charts/.render_manifest.json. A spec is skipped when its fingerprint is
+# unchanged and every chart / output file still exists.
+#
+# Stale specs run in worker processes on the Agg backend. The scripts are run as
+# they are: plt.show() is swapped for "save every open figure to the next chart
+# name in the spec", so scripts that open several figures in a loop (02_2, 03_1,
+# ...) still land on their usual file names.
+
+MANIFEST_PATH   = os.path.join(paths.charts_dir, ".render_manifest.json")
+CHART_DPI       = 200
+HASH_BLOCK      = 1 << 20
+
+
+def input_path(input_name):
+    kind, name = input_name.split("/", 1)
+    if kind == "raw":
+        return paths.raw_path(name)
+    return paths.generated_path(name)
+
+
+def spec_name(spec):
+    return os.path.splitext(spec["script"])[0]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(spec):
+    # Inputs + script + cica modules + the spec itself
+    list_files  = [input_path(name) for name in spec["inputs"]]
+    list_files += [os.path.join(paths.script_dir, spec["script"])]
+    list_files += [os.path.join(paths.package_dir, f"{module}.py") for module in spec.get("modules", [])]
+
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    for path in list_files:
+        digest.update(path.encode())
+        digest.update(file_digest(path).encode() if os.path.exists(path) else b"missing")
+
+    return digest.hexdigest()
+
+
+def spec_outputs(spec):
+    return [paths.chart_path(name) for name in spec["charts"]] + \
+           [paths.generated_path(name) for name in spec.get("outputs", [])]
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(dict_manifest):
+    os.makedirs(paths.charts_dir, exist_ok=True)
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(dict_manifest, f, indent=2, sort_keys=True)
+
+
+def is_current(spec, dict_manifest, spec_hash):
+    return dict_manifest.get(spec_name(spec)) == spec_hash and all(os.path.exists(p) for p in spec_outputs(spec))
+
+
+def render_spec(spec, quiet=True):
+    # Runs in a worker process: headless matplotlib, plt.show() saves instead
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+
+    list_chart_paths    = [paths.chart_path(name) for name in spec["charts"]]
+    list_saved          = []
+
+    def save_open_figures(*args, **kwargs):
+        for fig_num in plt.get_fignums():
+            fig = plt.figure(fig_num)
+            if len(list_saved) < len(list_chart_paths):
+                fig.savefig(list_chart_paths[len(list_saved)], dpi=CHART_DPI)
+                list_saved.append(list_chart_paths[len(list_saved)])
+            plt.close(fig)
+
+    plt.show = save_open_figures
+
+    if paths.script_dir not in sys.path:
+        sys.path.insert(0, paths.script_dir)
+
+    time_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        runpy.run_path(os.path.join(paths.script_dir, spec["script"]), run_name="__main__")
+        save_open_figures()
+
+    return spec_name(spec), list_saved, time.perf_counter() - time_start
+
+
+def render_all(force=False, n_workers=None, only=None):
+    # Render every stale spec; returns (rendered, skipped) spec names
+    dict_manifest   = load_manifest()
+    list_specs      = [s for s in CHART_SPECS if not only or spec_name(s).startswith(tuple(only))]
+
+    dict_hash       = {spec_name(s): fingerprint(s) for s in list_specs}
+    list_stale      = [s for s in list_specs if force or not is_current(s, dict_manifest, dict_hash[spec_name(s)])]
+    list_skipped    = [spec_name(s) for s in list_specs if s not in list_stale]
+
+    if not list_stale:
+        return [], list_skipped
+
+    os.makedirs(paths.charts_dir, exist_ok=True)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(list_stale))
+
+    if n_workers == 1:
+        list_results = [render_spec(s) for s in list_stale]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            list_results = list(pool.map(render_spec, list_stale))
+
+    for name, list_saved, seconds in list_results:
+        dict_manifest[name] = dict_hash[name]
+        print(f"rendered {name:<48} {len(list_saved)} chart(s) in {seconds:.2f}s")
+
+    save_manifest(dict_manifest)
+
+    return [r[0] for r in list_results], list_skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh /Charts, skipping charts whose inputs have not changed.")
+    parser.add_argument("only", nargs="*", help="spec name prefixes, e.g. 03_1 04_")
+    parser.add_argument("--force", action="store_true", help="re-render even when the fingerprint matches")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    time_start          = time.perf_counter()
+    list_rendered, list_skipped = render_all(args.force, args.workers, args.only)
+    print(f"{len(list_rendered)} rendered, {len(list_skipped)} up to date, {time.perf_counter() - time_start:.2f}s")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from cica import tables
+
+# -----------------------------------------------------------
+# Segment-level risk parameters taken from the 03_x SQL outputs
+# -----------------------------------------------------------
+#
+# PD  : 03_1_probability_of_default  -> defaults within 12M / eligible loans
+# LGD : 03_3_loss_given_default      -> principal loss / principal unpaid on default
+#
+# Both are returned per risk_tier_at_signup, with a portfolio-level fallback
+# for tiers that have no eligible loans (or no defaults with exposure).
+
+
+def pd_12m_by_tier(df_pd=None):
+    if df_pd is None:
+        df_pd = tables.load_generated("03_1_probability_of_default")
+
+    df_eligible     = df_pd.loc[df_pd["is_pd_eligible"] == 1]
+
+    df_tier         = (df_eligible
+                            .groupby("risk_tier_at_signup")
+                            .agg(
+                                    total_eligible_loans    = ("is_pd_eligible", "size"),
+                                    total_defaults_12m      = ("is_default_12m", "sum"),
+                                )
+                      )
+
+    srs_pd_12m      = df_tier["total_defaults_12m"] / df_tier["total_eligible_loans"]
+    srs_pd_12m.name = "pd_12m"
+
+    overall_pd_12m  = df_eligible["is_default_12m"].sum() / max(len(df_eligible), 1)
+
+    return srs_pd_12m, float(overall_pd_12m)
+
+
+def lgd_by_tier(df_lgd=None):
+    if df_lgd is None:
+        df_lgd = tables.load_generated("03_3_loss_given_default")
+
+    df_tier         = (df_lgd
+                            .groupby("risk_tier_at_signup")
+                            .agg(
+                                    principal_loss                  = ("principal_loss", "sum"),
+                                    principal_unpaid_on_default     = ("principal_unpaid_on_default", "sum"),
+                                )
+                      )
+
+    srs_lgd         = df_tier["principal_loss"] / df_tier["principal_unpaid_on_default"]
+    srs_lgd.name    = "lgd_rate"
+
+    overall_lgd     = df_lgd["principal_loss"].sum() / max(df_lgd["principal_unpaid_on_default"].sum(), 1e-9)
+
+    return srs_lgd, float(overall_lgd)
+
+
+def align_to_tiers(srs_rate, fallback, list_tiers):
+    # Reindex a per-tier rate onto a fixed tier order, filling gaps with the portfolio rate
+    return srs_rate.reindex(list_tiers).fillna(fallback).to_numpy(dtype=float)
+
+
+def pd_12m_to_monthly_hazard(pd_12m):
+    # Constant monthly hazard that compounds to the 12M PD
+    pd_12m = np.clip(np.asarray(pd_12m, dtype=float), 0.0, 1.0 - 1e-12)
+    return 1.0 - (1.0 - pd_12m) ** (1.0 / 12.0)
+
+
+def month_index(srs_dates):
+    # Calendar month as a single integer (year * 12 + month - 1), handy for offsets
+    srs_dates = pd.to_datetime(srs_dates)
+    return (srs_dates.dt.year * 12 + srs_dates.dt.month - 1).to_numpy()
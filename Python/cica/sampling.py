@@ -0,0 +1,274 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri, stdtrit
+
+from cica import asof, paths, tables
+
+# -----------------------------------------------------------
+# Stratified sampling mode with design-based error bars
+# -----------------------------------------------------------
+#
+# For exploratory runs: draw a fraction of the book, run any metric on it, and
+# get a confidence interval for how far the sample rate can be from the
+# full-book rate.
+#
+# The sampling unit is the customer, with all of their applications, loans,
+# schedules and payments, so customer-level metrics (second loan, 180-day
+# inactivity, LTV) see complete histories. Strata are vintage x risk tier:
+#
+#   vintage     month of the customer's first loan (customers with no loan
+#               form one vintage of their own)
+#   risk tier   risk_tier_at_signup
+#
+# Selection is a stable hash: every customer_id gets a uniform key from
+# splitmix64(customer_id ^ splitmix64(seed)), and a stratum of N_h customers keeps the
+# n_h = round(fraction * N_h) lowest keys (at least 2 when N_h >= 2, so every
+# stratum has a variance). The same (fraction, seed) always picks the same
+# customers, and a smaller fraction picks a subset of a larger one.
+#
+# sample_raw() returns a raw dict that every cica module accepts (asof,
+# ecl, policy, stress, ...), plus the design: one row per sampled customer
+# with its stratum and weight N_h / n_h. load_sample() keeps the drawn tables
+# as Parquet under Data_Generated/.samples/<fraction>_<seed>/, reused while the
+# raw CSVs are unchanged, so a rerun reads only the sampled rows.
+#
+# Rates are ratios of sums, R = sum(num) / sum(den). On the sample the
+# estimate is the weighted ratio, and its variance comes from linearization
+# over customers (a stratified cluster design):
+#
+#   u_c     = weight_c * (num_c - R * den_c)    customer totals
+#   Var(R)  = sum_g (1 - f_g) n_g / (n_g - 1) sum_c (u_c - mean_g u)^2  /  den_total^2
+#
+# with a Wilson interval at CI_LEVEL (see ratio_ci). A rate resting on fewer than
+# MIN_RELIABLE_N sampled elements or MIN_RELIABLE_EVENTS events is flagged
+# unreliable and gets no interval: with a handful of defaulted loans in a tier
+# the variance estimate itself is noise. The variance groups g are
+# the strata collapsed to vintage year x tier: a month x tier stratum holds only
+# a few sampled customers, and with rare defaults their within-stratum variance
+# is mostly zero, which would make the intervals far too narrow.
+
+SAMPLE_FRACTION     = 0.10
+SAMPLE_SEED         = 20260301
+CI_LEVEL            = 0.95
+MIN_PER_STRATUM     = 2
+MIN_RELIABLE_N      = 30
+MIN_RELIABLE_EVENTS = 10
+SAMPLED_TABLES      = ["customers", "applications", "loans", "payments", "payment_schedule"]
+SAMPLE_DIR          = os.path.join(paths.data_dir, ".samples")
+SOURCE_FILE         = "_SOURCE"
+
+
+def _splitmix64(z):
+    with np.errstate(over="ignore"):
+        z = np.asarray(z, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def selection_key(arr_ids, seed=SAMPLE_SEED):
+    # Uniform float in [0, 1) per id; the seed is hashed first so nearby seeds give unrelated draws
+    z = _splitmix64(np.asarray(arr_ids, dtype=np.uint64) ^ _splitmix64(np.uint64(seed)))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def strata(df_customers, df_loans):
+    # One row per customer: first-loan vintage (NaT = no loan), tier, and integer stratum /
+    # variance group codes (vintage month or year x tier; no loan is its own vintage)
+    srs_first       = df_loans.groupby("customer_id")["origination_date"].min()
+    df              = df_customers[["customer_id", "risk_tier_at_signup"]].copy()
+    df["vintage"]   = df["customer_id"].map(srs_first).dt.to_period("M").dt.to_timestamp()
+
+    arr_tier        = pd.Categorical(df["risk_tier_at_signup"], categories=asof.TIERS).codes.astype(np.int64)
+    arr_year        = df["vintage"].dt.year.fillna(0).to_numpy(dtype=np.int64)
+    arr_month       = arr_year * 12 + df["vintage"].dt.month.fillna(0).to_numpy(dtype=np.int64)
+    n_tiers         = len(asof.TIERS) + 1
+
+    df["stratum"]           = arr_month * n_tiers + arr_tier + 1
+    df["variance_group"]    = arr_year * n_tiers + arr_tier + 1
+    return df
+
+
+def draw(df_customers, df_loans, fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED):
+    # Design frame for the sampled customers: customer_id, stratum, variance group, N_h, n_h, weight
+    df              = strata(df_customers, df_loans)
+    arr_stratum     = df["stratum"].to_numpy()
+    arr_key         = selection_key(df["customer_id"].to_numpy(), seed)
+
+    # Rank of each customer's key within its stratum
+    arr_order       = np.lexsort((arr_key, arr_stratum))
+    _, arr_h, arr_N = np.unique(arr_stratum, return_inverse=True, return_counts=True)
+    arr_start       = np.concatenate([[0], np.cumsum(arr_N)[:-1]])
+    arr_rank        = np.empty(len(df), dtype=np.int64)
+    arr_rank[arr_order] = np.arange(len(df)) - arr_start[arr_h[arr_order]]
+
+    arr_N_h         = arr_N[arr_h]
+    arr_n_h         = np.clip(np.rint(fraction * arr_N_h), np.minimum(arr_N_h, MIN_PER_STRATUM), arr_N_h).astype(np.int64)
+    df["N_h"]       = arr_N_h
+    df["n_h"]       = arr_n_h
+
+    df              = df.loc[arr_rank < arr_n_h].copy()
+    df["weight"]    = df["N_h"] / df["n_h"]
+    return df.sort_values("customer_id").reset_index(drop=True)
+
+
+def sample_raw(fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED, raw=None):
+    # (sampled raw dict, design); tables outside SAMPLED_TABLES are passed through whole
+    raw             = tables.load_raw_tables(SAMPLED_TABLES, raw)
+    df_design       = draw(raw["customers"], raw["loans"], fraction, seed)
+
+    arr_customers   = df_design["customer_id"].to_numpy()
+    raw_out         = dict(raw)
+    for table_name in ["customers", "applications", "loans"]:
+        df = raw[table_name]
+        raw_out[table_name] = df.loc[np.isin(df["customer_id"].to_numpy(), arr_customers)].reset_index(drop=True)
+
+    arr_loans       = raw_out["loans"]["loan_id"].to_numpy()
+    for table_name in ["payments", "payment_schedule"]:
+        df = raw[table_name]
+        raw_out[table_name] = df.loc[np.isin(df["loan_id"].to_numpy(), arr_loans)].reset_index(drop=True)
+
+    return raw_out, df_design
+
+
+def source_signature():
+    list_parts = []
+    for table_name in SAMPLED_TABLES:
+        stat = os.stat(paths.raw_path(table_name))
+        list_parts.append(f"{table_name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(list_parts)
+
+
+def load_sample(fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED):
+    # (sampled raw dict, design) from disk when the raw CSVs are unchanged; drawn and saved otherwise
+    out_dir     = os.path.join(SAMPLE_DIR, f"{fraction:g}_{seed}")
+    signature   = source_signature()
+    source_path = os.path.join(out_dir, SOURCE_FILE)
+
+    if os.path.exists(source_path):
+        with open(source_path) as f:
+            if f.read().strip() == signature:
+                raw = {name: pd.read_parquet(os.path.join(out_dir, f"{name}.parquet")) for name in SAMPLED_TABLES}
+                return raw, pd.read_parquet(os.path.join(out_dir, "design.parquet"))
+
+    raw, df_design  = sample_raw(fraction, seed)
+    tmp_dir         = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in SAMPLED_TABLES:
+        raw[name].to_parquet(os.path.join(tmp_dir, f"{name}.parquet"), index=False)
+    df_design.to_parquet(os.path.join(tmp_dir, "design.parquet"), index=False)
+    with open(os.path.join(tmp_dir, SOURCE_FILE), "w") as f:
+        f.write(signature)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return raw, df_design
+
+
+def ratio_ci(df_design, arr_customer_id, arr_group, arr_num, arr_den, group_labels, level=CI_LEVEL):
+    # Weighted ratio per group (+ "All") with its linearized standard error and interval.
+    # arr_* are element level (loans, defaults, customers); arr_group indexes group_labels, -1 counts in All only
+    n_groups        = len(group_labels)
+    n_cust          = len(df_design)
+    arr_cust        = np.searchsorted(df_design["customer_id"].to_numpy(), arr_customer_id)
+    mask_known      = arr_group >= 0
+    arr_cell        = arr_cust[mask_known] * n_groups + arr_group[mask_known]
+
+    # Customer x group totals, plus a last column for All
+    arr_y           = np.zeros((n_cust, n_groups + 1))
+    arr_x           = np.zeros((n_cust, n_groups + 1))
+    arr_y[:, :-1]   = np.bincount(arr_cell, weights=arr_num[mask_known], minlength=n_cust * n_groups).reshape(n_cust, n_groups)
+    arr_x[:, :-1]   = np.bincount(arr_cell, weights=arr_den[mask_known], minlength=n_cust * n_groups).reshape(n_cust, n_groups)
+    arr_y[:, -1]    = np.bincount(arr_cust, weights=arr_num, minlength=n_cust)
+    arr_x[:, -1]    = np.bincount(arr_cust, weights=arr_den, minlength=n_cust)
+
+    arr_w           = df_design["weight"].to_numpy()
+    arr_y_hat       = arr_w @ arr_y
+    arr_x_hat       = arr_w @ arr_x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr_r       = np.where(arr_x_hat > 0, arr_y_hat / arr_x_hat, np.nan)
+
+    # Variance of the weighted, linearized customer totals within collapsed strata
+    arr_u           = arr_w[:, None] * (arr_y - np.nan_to_num(arr_r) * arr_x)
+    _, arr_g        = np.unique(df_design["variance_group"].to_numpy(), return_inverse=True)
+    n_var_groups    = arr_g.max() + 1 if n_cust else 0
+    arr_n_g         = np.bincount(arr_g, minlength=n_var_groups).astype(np.float64)
+    arr_N_g         = np.bincount(arr_g, weights=arr_w, minlength=n_var_groups)
+    arr_u_sum       = np.zeros((n_var_groups, n_groups + 1))
+    np.add.at(arr_u_sum, arr_g, arr_u)
+    arr_u_dev       = arr_u - (arr_u_sum / np.maximum(arr_n_g, 1)[:, None])[arr_g]
+    arr_ss          = np.zeros((n_var_groups, n_groups + 1))
+    np.add.at(arr_ss, arr_g, arr_u_dev ** 2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr_factor  = np.where(arr_n_g > 1, (1 - arr_n_g / arr_N_g) * arr_n_g / (arr_n_g - 1), 0.0)
+        arr_se      = np.sqrt(np.maximum(arr_factor @ arr_ss, 0.0)) / arr_x_hat
+
+    mask_event      = mask_known & (arr_num != 0)
+    arr_n_sampled   = np.append(np.bincount(arr_group[mask_known], minlength=n_groups), len(arr_group))
+    arr_n_events    = np.append(np.bincount(arr_group[mask_event], minlength=n_groups), int((arr_num != 0).sum()))
+
+    # A cell is a census when every customer in it sits in a fully sampled variance group
+    arr_partial     = ~np.isclose(arr_n_g, arr_N_g)
+    mask_census     = ~((arr_x != 0) & arr_partial[arr_g][:, None]).any(axis=0)
+
+    # Degrees of freedom per cell: sampled customers (PSUs) in it less the variance groups they span
+    mask_in         = (arr_x != 0) | (arr_y != 0)
+    arr_g_in        = np.zeros((n_var_groups, n_groups + 1))
+    np.add.at(arr_g_in, arr_g, mask_in)
+    arr_dof         = np.maximum(mask_in.sum(axis=0) - (arr_g_in > 0).sum(axis=0), 1)
+
+    # Wilson interval on the design-effective sample size n_eff = R (1 - R) / se^2, with a
+    # t critical value on arr_dof: it stays inside [0, 1] and does not collapse onto a rate
+    # near 0 the way R +- z se does. n_eff is capped at the sampled element count, since a
+    # near-zero se from a few elements would otherwise stand for thousands of observations;
+    # se = 0 outside a census (no events, or every element an event) takes the cap as well.
+    arr_t_crit      = stdtrit(arr_dof, 0.5 + level / 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr_n_eff   = np.where(arr_se > 0, np.minimum(arr_r * (1 - arr_r) / arr_se ** 2, arr_n_sampled),
+                               np.where(mask_census, np.inf, arr_n_sampled))
+        arr_t2      = arr_t_crit ** 2
+        arr_centre  = (arr_r + arr_t2 / (2 * arr_n_eff)) / (1 + arr_t2 / arr_n_eff)
+        arr_half    = arr_t_crit * np.sqrt(arr_r * (1 - arr_r) / arr_n_eff + arr_t2 / (4 * arr_n_eff ** 2)) / (1 + arr_t2 / arr_n_eff)
+
+    # Unreliable cells get no interval at all; a census cell's interval is the rate itself
+    mask_reliable   = (arr_n_sampled >= MIN_RELIABLE_N) & (arr_n_events >= MIN_RELIABLE_EVENTS)
+    mask_open       = np.isfinite(arr_n_eff) & (arr_n_eff > 0)
+    arr_ci_low      = np.where(mask_open, arr_centre - arr_half, arr_r)
+    arr_ci_high     = np.where(mask_open, arr_centre + arr_half, arr_r)
+    mask_publish    = mask_reliable | mask_census
+
+    return pd.DataFrame({
+                            "group"         : list(group_labels) + ["All"],
+                            "n_sampled"     : arr_n_sampled,
+                            "n_events"      : arr_n_events,
+                            "numerator"     : arr_y_hat,
+                            "denominator"   : arr_x_hat,
+                            "estimate"      : arr_r,
+                            "std_error"     : arr_se,
+                            "ci_low"        : np.where(mask_publish, arr_ci_low, np.nan),
+                            "ci_high"       : np.where(mask_publish, arr_ci_high, np.nan),
+                            "reliable"      : mask_reliable,
+                        })
+
+
+def sampled_rates(as_of=asof.DATA_END, fraction=SAMPLE_FRACTION, seed=SAMPLE_SEED, raw=None, level=CI_LEVEL):
+    # PD / LGD / CDR / CLR / inactivity by tier on a sample, with confidence intervals
+    raw_sample, df_design   = sample_raw(fraction, seed, raw) if raw is not None else load_sample(fraction, seed)
+    ix                      = asof.EventIndex(raw_sample)
+    st                      = ix.state(as_of)
+
+    list_frames = []
+    for metric, (arr_pos, arr_num, arr_den) in asof.rate_elements(ix, st).items():
+        df = ratio_ci(df_design, ix.customer_id[arr_pos], ix.tier_code[arr_pos], arr_num, arr_den, asof.TIERS, level)
+        df.insert(0, "metric", metric)
+        list_frames.append(df)
+
+    df_rates = pd.concat(list_frames, ignore_index=True).rename(columns={"group": "risk_tier_at_signup"})
+    df_rates.attrs["n_customers"]   = len(df_design)
+    df_rates.attrs["n_loans"]       = len(raw_sample["loans"])
+    return df_rates
@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+
+# -----------------------------------------------------------
+# KLL quantile sketch
+# -----------------------------------------------------------
+#
+# Karnin-Lang-Liberty: a stack of compactors. Level h holds items that each stand
+# for 2**h inputs. When a level outgrows its capacity it is sorted and every other
+# item (odd or even positions, picked by a seeded splitmix64 coin) moves up
+# one level; the rest is dropped. Capacities shrink by 2/3 per level below the top,
+# so memory stays O(k) however many values go in, and the rank error is about
+# 1.7 / k of n (k = 200 -> under 1%).
+#
+# Two sketches merge by concatenating level by level and compacting, so per-cohort
+# sketches can be combined into any cohort union after the fact. Until level 0
+# first overflows the sketch still holds every value, and quantiles are exact
+# linear interpolation (PERCENTILE_CONT).
+
+KLL_K           = 200
+KLL_MIN_WIDTH   = 2
+KLL_SHRINK      = 2 / 3
+MASK_64         = (1 << 64) - 1
+
+
+class KLLSketch:
+
+    def __init__(self, k=KLL_K):
+        self.k          = k
+        self.levels     = [np.empty(0)]
+        self.n          = 0
+        self.min        = np.inf
+        self.max        = -np.inf
+        self.coin       = 0
+
+    def __len__(self):
+        return self.n
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(KLL_MIN_WIDTH, int(math.ceil(self.k * KLL_SHRINK ** depth)))
+
+    def _offset(self):
+        # splitmix64 coin: random enough to keep compaction unbiased, and
+        # deterministic so a rebuilt sketch is identical
+        self.coin   = (self.coin + 0x9E3779B97F4A7C15) & MASK_64
+        z           = self.coin
+        z           = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+        z           = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK_64
+        return (z ^ (z >> 31)) & 1
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            arr = self.levels[level]
+            if len(arr) <= self.capacity(level):
+                level += 1
+                continue
+
+            arr     = np.sort(arr)
+            n_keep  = len(arr) % 2
+            arr_up  = arr[n_keep:][self._offset()::2]
+
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level]      = arr[:n_keep]
+            self.levels[level + 1]  = np.concatenate([self.levels[level + 1], arr_up])
+            level = 0
+
+    def update(self, values):
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        if len(arr) == 0:
+            return self
+        self.levels[0]  = np.concatenate([self.levels[0], arr])
+        self.n          += len(arr)
+        self.min        = min(self.min, float(arr.min()))
+        self.max        = max(self.max, float(arr.max()))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, arr in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], arr])
+        self.n      += other.n
+        self.min    = min(self.min, other.min)
+        self.max    = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def copy(self):
+        out         = KLLSketch(self.k)
+        out.levels  = [arr.copy() for arr in self.levels]
+        out.n, out.min, out.max, out.coin = self.n, self.min, self.max, self.coin
+        return out
+
+    def quantile(self, quantiles):
+        arr_q = np.atleast_1d(np.asarray(quantiles, dtype=np.float64))
+        if self.n == 0:
+            return np.full(arr_q.shape, np.nan)
+        if self.is_exact():
+            return np.quantile(self.levels[0], arr_q)
+
+        arr_items   = np.concatenate(self.levels)
+        arr_weight  = np.concatenate([np.full(len(arr), 2.0 ** level) for level, arr in enumerate(self.levels)])
+        arr_order   = np.argsort(arr_items, kind="stable")
+        arr_items   = arr_items[arr_order]
+        arr_cum     = np.cumsum(arr_weight[arr_order])
+
+        arr_pos     = np.minimum(np.searchsorted(arr_cum, arr_q * arr_cum[-1], side="left"), len(arr_items) - 1)
+        arr_out     = arr_items[arr_pos]
+        arr_out[arr_q <= 0] = self.min
+        arr_out[arr_q >= 1] = self.max
+        return arr_out
+
+    # --- persistence ---------------------------------------------------------
+
+    def to_arrays(self):
+        return (
+                    np.concatenate(self.levels),
+                    np.array([len(arr) for arr in self.levels]),
+                    np.array([self.n, self.k, self.coin], dtype=np.uint64),
+                    np.array([self.min, self.max]),
+               )
+
+    @classmethod
+    def from_arrays(cls, arr_items, arr_sizes, arr_counts, arr_range):
+        out         = cls(int(arr_counts[1]))
+        out.levels  = list(np.split(arr_items, np.cumsum(arr_sizes)[:-1]))
+        out.n       = int(arr_counts[0])
+        out.coin    = int(arr_counts[2])
+        out.min, out.max = float(arr_range[0]), float(arr_range[1])
+        return out
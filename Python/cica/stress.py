@@ -0,0 +1,299 @@
+import numpy as np
+import pandas as pd
+
+from cica import index, risk_params, tables
+
+# -----------------------------------------------------------
+# Macro-scenario stress projection (4.1)
+# -----------------------------------------------------------
+#
+# Projects the open book forward month by month under every macro scenario in
+# macro_monthly:
+#
+#   1. map each scenario month to a single stress score (weighted index moves,
+#      measured against the baseline level over the history the base PD came from)
+#   2. turn the score into PD and LGD multipliers per risk tier
+#   3. run the stressed monthly hazard over the remaining payment_schedule
+#
+# Everything is an array of shape (scenario, tier, month). Survival only depends
+# on tier and month (every loan starts from the same as-of date), so the loan
+# level work is a handful of bincounts over the schedule rows and the cost does
+# not grow with scenarios x loans.
+#
+# The projection months must lie inside every scenario path. Without an explicit
+# as_of, the book is taken at the latest month end for which that holds.
+
+# How much each macro index move feeds the stress score (index of 1.00 = neutral)
+MACRO_WEIGHTS = {
+    "unemployment_index"    : 0.50,
+    "rates_index"           : 0.20,
+    "consumer_stress_index" : 0.30,
+}
+
+# PD multiplier = exp(beta * stress score). Weaker tiers react harder.
+PD_SENSITIVITY = {
+    "A" : 4.0,
+    "B" : 5.0,
+    "C" : 6.0,
+    "D" : 7.0,
+}
+
+# LGD multiplier = 1 + beta * max(stress score, 0). Recoveries only get worse.
+LGD_SENSITIVITY = {
+    "A" : 1.0,
+    "B" : 1.25,
+    "C" : 1.5,
+    "D" : 1.75,
+}
+
+DEFAULT_HORIZON_MONTHS = 24
+
+# The base PD / LGD from 03_1 / 03_3 were observed under this scenario's path
+CALIBRATION_SCENARIO = "baseline"
+
+
+def default_as_of():
+    # Last month end on the calendar spine
+    df_dim_month = tables.load_raw("dim_month")
+    return df_dim_month["month_start"].max() + pd.offsets.MonthEnd(0)
+
+
+def scenario_as_of(df_macro, horizon_months=DEFAULT_HORIZON_MONTHS):
+    # Latest month end (no later than the calendar spine) whose whole horizon has a macro path in every scenario
+    last_covered    = df_macro.groupby("scenario_name")["month"].max().min()
+    last_as_of      = last_covered - pd.DateOffset(months=horizon_months) + pd.offsets.MonthEnd(0)
+    return min(default_as_of(), last_as_of)
+
+
+def projection_months(as_of, horizon_months):
+    first_month = pd.Timestamp(as_of).to_period("M").to_timestamp() + pd.DateOffset(months=1)
+    return pd.date_range(first_month, periods=horizon_months, freq="MS")
+
+
+def scenario_path(df_macro, scenario_name, idx_months):
+    # One scenario's macro rows for exactly idx_months. A path that stops short is an error, not a flat tail.
+    df_scn          = (df_macro
+                        .loc[df_macro["scenario_name"] == scenario_name]
+                        .set_index("month")
+                        .sort_index()
+                      )
+
+    idx_missing     = idx_months.difference(df_scn.index)
+    if len(idx_missing):
+        raise ValueError(f"macro_monthly has no {scenario_name!r} path for {len(idx_missing)} projection month(s) "
+                         f"from {idx_missing[0]:%Y-%m}; pick an as_of inside the scenario horizon")
+
+    return df_scn.loc[idx_months]
+
+
+def calibration_path(df_macro, idx_calibration):
+    # Macro rows the base rates were observed under: the calibration scenario over the history window
+    df_cal          = df_macro.loc[(df_macro["scenario_name"] == CALIBRATION_SCENARIO)
+                                   & df_macro["month"].isin(idx_calibration)]
+    if df_cal.empty:
+        raise ValueError(f"macro_monthly has no {CALIBRATION_SCENARIO!r} rows inside the calibration window")
+    return df_cal
+
+
+def macro_score(df_scn):
+    # Weighted index moves (index of 1.00 = neutral)
+    arr_score = np.zeros(len(df_scn))
+    for col, weight in MACRO_WEIGHTS.items():
+        arr_score += weight * (df_scn[col].to_numpy() - 1.0)
+    return arr_score
+
+
+def macro_paths(df_macro, idx_months, idx_calibration):
+    # One row per scenario, one column per projection month.
+    # Scores are taken relative to the calibration window, so the scenario the
+    # base PD was observed under comes out at a multiplier of about 1.0.
+    list_scenarios  = list(df_macro["scenario_name"].drop_duplicates())
+    arr_score       = np.zeros((len(list_scenarios), len(idx_months)))
+
+    for s_idx, scenario_name in enumerate(list_scenarios):
+        arr_score[s_idx] = macro_score(scenario_path(df_macro, scenario_name, idx_months))
+
+    calibration_score = macro_score(calibration_path(df_macro, idx_calibration)).mean()
+
+    return list_scenarios, arr_score - calibration_score
+
+
+def stress_multipliers(arr_score, list_tiers):
+    # (scenario, month) score -> (scenario, tier, month) multipliers
+    arr_pd_beta     = np.array([PD_SENSITIVITY.get(t, max(PD_SENSITIVITY.values())) for t in list_tiers])
+    arr_lgd_beta    = np.array([LGD_SENSITIVITY.get(t, max(LGD_SENSITIVITY.values())) for t in list_tiers])
+
+    arr_pd_mult     = np.exp(arr_pd_beta[None, :, None] * arr_score[:, None, :])
+    arr_lgd_mult    = 1.0 + arr_lgd_beta[None, :, None] * np.maximum(arr_score[:, None, :], 0.0)
+
+    return arr_pd_mult, arr_lgd_mult
+
+
+def open_book(df_loans, df_customers, df_payments, as_of, ex):
+    # Loans on the books at the as-of date: originated, not defaulted, principal not yet fully repaid.
+    # ex: cica.index.EntityIndex over these frames (paid principal is a reduceat over its payment offsets)
+    as_of           = pd.Timestamp(as_of)
+
+    df_pay          = df_payments.iloc[ex.payment_row]
+    arr_paid_csr    = ex.sum_by_loan(np.where(df_pay["payment_date"] <= as_of, df_pay["paid_principal"].fillna(0.0), 0.0))
+    arr_paid        = arr_paid_csr[ex.loan_csr_pos]
+
+    mask_book       = ((df_loans["origination_date"] <= as_of)
+                       & (df_loans["default_date"].isna() | (df_loans["default_date"] > as_of))).to_numpy()
+    mask_book       = mask_book & (arr_paid < df_loans["principal"].to_numpy() - 0.005)
+
+    arr_cust_row    = ex.borrower_rows()
+
+    df_book         = df_loans.loc[mask_book].reset_index(drop=True)
+    df_book["risk_tier_at_signup"] = df_customers["risk_tier_at_signup"].to_numpy()[arr_cust_row[mask_book]]
+
+    return df_book
+
+
+def tier_schedule_grid(df_book, df_schedule, as_of, list_tiers, horizon_months):
+    # Scheduled cash for the open book, summed into (tier, month) cells
+    arr_tier_code   = pd.Categorical(df_book["risk_tier_at_signup"], categories=list_tiers).codes
+    return schedule_grid(df_book, df_schedule, as_of, arr_tier_code, len(list_tiers), horizon_months)
+
+
+def schedule_grid(df_book, df_schedule, as_of, arr_group, n_groups, horizon_months):
+    # Scheduled cash for the open book, summed into (group, month) cells with bincount.
+    # arr_group: group code per df_book row (a tier code, or np.arange for one row per loan)
+    as_of_month     = risk_params.month_index(pd.Series([pd.Timestamp(as_of)]))[0]
+
+    srs_group       = pd.Series(np.asarray(arr_group), index=df_book["loan_id"].to_numpy())
+
+    df_sched        = df_schedule.loc[df_schedule["loan_id"].isin(srs_group.index)]
+    arr_grp         = srs_group.reindex(df_sched["loan_id"].to_numpy()).to_numpy()
+    arr_offset      = risk_params.month_index(df_sched["due_date"]) - as_of_month - 1
+
+    # Opening balance = principal less everything scheduled on or before the as-of date
+    is_past         = arr_offset < 0
+    arr_prin_past   = np.bincount(arr_grp[is_past], weights=df_sched["due_principal"].to_numpy()[is_past], minlength=n_groups)
+    arr_principal   = np.bincount(srs_group.to_numpy(), weights=df_book["principal"].to_numpy(), minlength=n_groups)
+    arr_open_bal    = np.maximum(arr_principal - arr_prin_past, 0.0)
+
+    # Future dues inside the horizon
+    is_future       = (arr_offset >= 0) & (arr_offset < horizon_months)
+    arr_cell        = arr_grp[is_future] * horizon_months + arr_offset[is_future]
+    n_cells         = n_groups * horizon_months
+
+    arr_due_prin    = np.bincount(arr_cell, weights=df_sched["due_principal"].to_numpy()[is_future], minlength=n_cells)
+    arr_due_fee     = np.bincount(arr_cell, weights=df_sched["due_fee_interest"].to_numpy()[is_future], minlength=n_cells)
+
+    # Loans still running at the start of each month = last due month >= that month.
+    # Loans with nothing left to fall due are already overdue, so they stay on the book.
+    arr_last_off    = (pd.Series(arr_offset[~is_past], index=df_sched["loan_id"].to_numpy()[~is_past])
+                        .groupby(level=0).max()
+                        .reindex(srs_group.index)
+                        .fillna(horizon_months - 1)
+                        .to_numpy()
+                        .astype(int)
+                      )
+    arr_last_off    = np.clip(arr_last_off, 0, horizon_months - 1)
+    arr_end_cell    = srs_group.to_numpy() * horizon_months + arr_last_off
+    arr_ending      = np.bincount(arr_end_cell, minlength=n_cells).reshape(n_groups, horizon_months)
+    arr_n_active    = np.cumsum(arr_ending[:, ::-1], axis=1)[:, ::-1]
+
+    arr_due_prin    = arr_due_prin.reshape(n_groups, horizon_months)
+    arr_due_fee     = arr_due_fee.reshape(n_groups, horizon_months)
+
+    arr_bal_end     = np.maximum(arr_open_bal[:, None] - np.cumsum(arr_due_prin, axis=1), 0.0)
+    arr_bal_start   = np.concatenate([arr_open_bal[:, None], arr_bal_end[:, :-1]], axis=1)
+
+    return {
+        "n_active"      : arr_n_active,
+        "due_principal" : arr_due_prin,
+        "due_fee"       : arr_due_fee,
+        "balance_start" : arr_bal_start,
+        "balance_end"   : arr_bal_end,
+    }
+
+
+def project(as_of=None, horizon_months=DEFAULT_HORIZON_MONTHS, raw=None):
+    # Full-book projection for every scenario.
+    # raw: optional dict of already-loaded raw tables (loans, customers, payments, payment_schedule, macro_monthly, dim_month)
+    # as_of defaults to the latest month end whose horizon macro_monthly covers
+    raw             = dict(raw or {})
+    ex              = index.load_index(raw or None)
+    raw             = tables.load_raw_tables(["loans", "customers", "payments", "payment_schedule", "macro_monthly",
+                                          "dim_month"], raw)
+
+    as_of           = pd.Timestamp(as_of) if as_of is not None else scenario_as_of(raw["macro_monthly"], horizon_months)
+    idx_months      = projection_months(as_of, horizon_months)
+
+    srs_pd_12m, overall_pd_12m  = risk_params.pd_12m_by_tier()
+    srs_lgd, overall_lgd        = risk_params.lgd_by_tier()
+
+    df_book         = open_book(raw["loans"], raw["customers"], raw["payments"], as_of, ex)
+    list_tiers      = sorted(df_book["risk_tier_at_signup"].dropna().unique())
+
+    dict_grid       = tier_schedule_grid(df_book, raw["payment_schedule"], as_of, list_tiers, horizon_months)
+
+    list_scenarios, arr_score   = macro_paths(raw["macro_monthly"], idx_months, raw["dim_month"]["month_start"])
+    arr_pd_mult, arr_lgd_mult   = stress_multipliers(arr_score, list_tiers)
+
+    # Base monthly hazard and LGD per tier, then stressed: (scenario, tier, month)
+    arr_base_hazard = risk_params.pd_12m_to_monthly_hazard(risk_params.align_to_tiers(srs_pd_12m, overall_pd_12m, list_tiers))
+    arr_base_lgd    = risk_params.align_to_tiers(srs_lgd, overall_lgd, list_tiers)
+
+    arr_hazard      = np.minimum(arr_base_hazard[None, :, None] * arr_pd_mult, 1.0)
+    arr_lgd         = np.minimum(arr_base_lgd[None, :, None] * arr_lgd_mult, 1.0)
+
+    arr_surv_end    = np.cumprod(1.0 - arr_hazard, axis=2)
+    arr_surv_start  = np.concatenate([np.ones_like(arr_surv_end[:, :, :1]), arr_surv_end[:, :, :-1]], axis=2)
+    arr_default_p   = arr_surv_start * arr_hazard
+
+    arr_exposure    = dict_grid["balance_start"][None] * arr_default_p
+
+    dict_out = {
+        "expected_balance"              : dict_grid["balance_end"][None] * arr_surv_end,
+        "expected_active_loans"         : dict_grid["n_active"][None] * arr_surv_start,
+        "expected_defaults"             : dict_grid["n_active"][None] * arr_default_p,
+        "expected_default_exposure"     : arr_exposure,
+        "expected_loss"                 : arr_exposure * arr_lgd,
+        "expected_revenue"              : dict_grid["due_fee"][None] * arr_surv_end,
+        "expected_principal_collected"  : dict_grid["due_principal"][None] * arr_surv_end,
+        "pd_multiplier"                 : arr_pd_mult,
+        "lgd_multiplier"                : arr_lgd_mult,
+    }
+
+    # Long table: one row per scenario x month x tier
+    n_scn, n_tier, n_month = arr_hazard.shape
+
+    df_projection = pd.DataFrame({
+        "scenario_name"         : np.repeat(list_scenarios, n_tier * n_month),
+        "risk_tier_at_signup"   : np.tile(np.repeat(list_tiers, n_month), n_scn),
+        "year_month"            : np.tile(idx_months, n_scn * n_tier),
+        "months_ahead"          : np.tile(np.arange(1, n_month + 1), n_scn * n_tier),
+    })
+
+    for col, arr_val in dict_out.items():
+        df_projection[col] = arr_val.reshape(-1)
+
+    df_projection = df_projection.sort_values(["scenario_name", "year_month", "risk_tier_at_signup"]).reset_index(drop=True)
+
+    return df_projection
+
+
+def portfolio_summary(df_projection):
+    # Tiers summed per scenario x month, plus revenue-after-loss cover
+    list_sum_cols   = [
+        "expected_balance",
+        "expected_active_loans",
+        "expected_defaults",
+        "expected_default_exposure",
+        "expected_loss",
+        "expected_revenue",
+        "expected_principal_collected",
+    ]
+
+    df_summary      = (df_projection
+                        .groupby(["scenario_name", "year_month"], as_index=False)[list_sum_cols]
+                        .sum()
+                      )
+
+    df_summary["revenue_after_loss"]            = df_summary["expected_revenue"] - df_summary["expected_loss"]
+    df_summary["cumulative_revenue_after_loss"] = df_summary.groupby("scenario_name")["revenue_after_loss"].cumsum()
+
+    return df_summary
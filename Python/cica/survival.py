@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+from cica import asof, compact
+
+# -----------------------------------------------------------
+# Survival analysis: Kaplan-Meier and Nelson-Aalen with right-censoring
+# -----------------------------------------------------------
+#
+# Subjects enter at time 0 and leave at `duration` days, either with the event
+# (event = True) or censored. Durations are whole days, so the life table is
+# counts on a (group, day) grid:
+#
+#   d(g, t)     events at day t                 bincount of group * T + t
+#   c(g, t)     censored at day t               same, for censored rows
+#   n(g, t)     at risk just before day t       group size - removals before t
+#                                               (cumsum within the group)
+#
+# Everything after the counts is cumulative sums / products down the grid:
+#
+#   Kaplan-Meier        S(t) = prod (1 - d / n)
+#   Greenwood           Var S(t) = S(t)^2 * sum d / (n (n - d))
+#   Nelson-Aalen        H(t) = sum d / n,   Var H(t) = sum d / n^2
+#
+# Counting is O(subjects + groups * days), with no sort. When the grid would be
+# too large (sparse, very long durations) the (group, day) keys go through
+# np.unique instead.
+#
+# Confidence bands for S are log(-log) transformed, so they stay inside [0, 1].
+#
+# Outcomes, both as seen on an as_of date (default: the SQL data end):
+#
+#   second_loan     first loan -> second loan of the same customer; censored at
+#                   as_of when no second loan has been originated by then
+#   default         origination -> default_date; loans fully repaid by as_of are
+#                   censored at their last payment (no longer at risk), loans
+#                   still open are censored at as_of
+
+Z_95            = 1.959963984540054
+MAX_GRID_CELLS  = 50_000_000
+PAID_OFF_CENTS  = 1
+SEGMENT_COLUMNS = ["risk_tier_at_signup", "acquisition_channel"]
+HORIZON_DAYS    = [90, 180, 365, 730]
+
+
+# -----------------------------------------------------------
+# Life table
+# -----------------------------------------------------------
+
+def _grid_counts(arr_group, arr_duration, arr_event, n_groups):
+    # (group, time, events, censored) per occupied (group, day) cell, sorted by group then time
+    n_times = int(arr_duration.max(initial=0)) + 1
+    arr_key = arr_group * n_times + arr_duration
+
+    if n_groups * n_times <= MAX_GRID_CELLS:
+        arr_events  = np.bincount(arr_key, weights=arr_event, minlength=n_groups * n_times)
+        arr_total   = np.bincount(arr_key, minlength=n_groups * n_times)
+        arr_cell    = np.flatnonzero(arr_total)
+        arr_events  = arr_events[arr_cell]
+        arr_total   = arr_total[arr_cell]
+    else:
+        arr_cell, arr_inverse = np.unique(arr_key, return_inverse=True)
+        arr_events  = np.bincount(arr_inverse, weights=arr_event, minlength=len(arr_cell))
+        arr_total   = np.bincount(arr_inverse, minlength=len(arr_cell))
+
+    return arr_cell // n_times, arr_cell % n_times, arr_events, arr_total - arr_events
+
+
+def life_table(durations, events, groups=None):
+    # One row per (group, day) with an event or a censoring; group = 0 when groups is None
+    arr_duration    = np.asarray(durations, dtype=np.int64)
+    arr_event       = np.asarray(events, dtype=bool).astype(np.float64)
+    if (arr_duration < 0).any():
+        raise ValueError("durations must be non-negative")
+
+    if groups is None:
+        arr_group, list_labels = np.zeros(len(arr_duration), dtype=np.int64), ["All"]
+    else:
+        arr_codes, list_labels = pd.factorize(pd.Series(groups), sort=True)
+        arr_group, list_labels = arr_codes.astype(np.int64), list(list_labels)
+        if (arr_group < 0).any():
+            raise ValueError("groups must not contain missing values")
+
+    n_groups        = len(list_labels)
+    arr_g, arr_t, arr_d, arr_c = _grid_counts(arr_group, arr_duration, arr_event, n_groups)
+
+    # At risk just before t: group size minus everyone removed at earlier days of the group
+    arr_removed     = arr_d + arr_c
+    arr_cum         = np.cumsum(arr_removed)
+    arr_start       = np.searchsorted(arr_g, np.arange(n_groups))
+    arr_before      = np.concatenate([[0.0], arr_cum])[arr_start][arr_g]
+    arr_size        = np.bincount(arr_group, minlength=n_groups)[arr_g]
+    arr_n           = arr_size - (arr_cum - arr_removed - arr_before)
+
+    arr_ratio       = arr_d / arr_n
+    arr_S           = _group_cumprod(1 - arr_ratio, arr_g, arr_start)
+    arr_H           = _group_cumsum(arr_ratio, arr_g, arr_start)
+    arr_var_H       = _group_cumsum(arr_d / arr_n ** 2, arr_g, arr_start)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arr_green   = _group_cumsum(np.where(arr_n > arr_d, arr_d / (arr_n * (arr_n - arr_d)), 0.0), arr_g, arr_start)
+        # log(-log S) band: S ** exp(+- z * se / log S)
+        arr_log_S   = np.log(arr_S)
+        arr_theta   = Z_95 * np.sqrt(arr_green) / np.abs(arr_log_S)
+        arr_lower   = np.where((arr_S > 0) & (arr_S < 1), arr_S ** np.exp(arr_theta), arr_S)
+        arr_upper   = np.where((arr_S > 0) & (arr_S < 1), arr_S ** np.exp(-arr_theta), arr_S)
+
+    return pd.DataFrame({
+                            "segment"           : np.array(list_labels, dtype=object)[arr_g],
+                            "time_days"         : arr_t,
+                            "n_at_risk"         : arr_n.astype(np.int64),
+                            "n_events"          : arr_d.astype(np.int64),
+                            "n_censored"        : arr_c.astype(np.int64),
+                            "survival"          : arr_S,
+                            "survival_lower"    : arr_lower,
+                            "survival_upper"    : arr_upper,
+                            "cum_hazard"        : arr_H,
+                            "cum_hazard_se"     : np.sqrt(arr_var_H),
+                        })
+
+
+def _group_cumsum(arr_values, arr_g, arr_start):
+    arr_cum = np.cumsum(arr_values)
+    return arr_cum - np.concatenate([[0.0], arr_cum])[arr_start][arr_g]
+
+
+def _group_cumprod(arr_factors, arr_g, arr_start):
+    # Product within each group as exp(sum log); a zero factor zeroes the rest of its group
+    arr_zero    = arr_factors <= 0
+    with np.errstate(divide="ignore"):
+        arr_log = np.where(arr_zero, 0.0, np.log(np.where(arr_zero, 1.0, arr_factors)))
+    arr_prod    = np.exp(_group_cumsum(arr_log, arr_g, arr_start))
+    return np.where(_group_cumsum(arr_zero.astype(np.float64), arr_g, arr_start) > 0, 0.0, arr_prod)
+
+
+def segmented(durations, events, df_attributes, list_columns=SEGMENT_COLUMNS):
+    # Life tables for the whole population plus each attribute column, stacked
+    list_tables = [life_table(durations, events).assign(segment_type="All")]
+    for col in list_columns:
+        list_tables.append(life_table(durations, events, df_attributes[col].to_numpy()).assign(segment_type=col))
+
+    df = pd.concat(list_tables, ignore_index=True)
+    return df[["segment_type"] + [c for c in df.columns if c != "segment_type"]]
+
+
+def survival_at(df_subjects, day):
+    # Kaplan-Meier S(day) for one population of (duration_days, event) rows
+    df_life = life_table(df_subjects["duration_days"], df_subjects["event"])
+    arr_S   = df_life.loc[df_life["time_days"] <= day, "survival"]
+    return arr_S.iloc[-1] if len(arr_S) else 1.0
+
+
+def at_horizons(df_table, list_days=HORIZON_DAYS):
+    # Survival and cumulative hazard at fixed days (step functions), plus median survival
+    list_rows = []
+    for (segment_type, segment), df in df_table.groupby(["segment_type", "segment"], sort=False):
+        arr_t   = df["time_days"].to_numpy()
+        arr_pos = np.searchsorted(arr_t, list_days, side="right") - 1
+        arr_S   = np.where(arr_pos >= 0, df["survival"].to_numpy()[np.maximum(arr_pos, 0)], 1.0)
+        arr_H   = np.where(arr_pos >= 0, df["cum_hazard"].to_numpy()[np.maximum(arr_pos, 0)], 0.0)
+        arr_med = arr_t[df["survival"].to_numpy() <= 0.5]
+
+        row = {"segment_type": segment_type, "segment": segment, "n_subjects": int(df["n_at_risk"].iloc[0])}
+        for day, S, H in zip(list_days, arr_S, arr_H):
+            row[f"survival_{day}d"]     = S
+            row[f"cum_hazard_{day}d"]   = H
+        row["median_days"] = arr_med[0] if len(arr_med) else np.nan
+        list_rows.append(row)
+
+    return pd.DataFrame(list_rows)
+
+
+# -----------------------------------------------------------
+# Outcomes (on the asof.EventIndex arrays)
+# -----------------------------------------------------------
+
+def time_to_second_loan(ix, as_of=asof.DATA_END):
+    # One row per customer with a first loan by as_of
+    day_as_of       = compact.day_number(as_of)
+    arr_first_day   = ix.orig_day[ix.first_pos]
+    arr_second_day  = np.where(ix.second_pos >= 0, ix.orig_day[np.maximum(ix.second_pos, 0)], asof.NO_EVENT)
+
+    mask_customer   = arr_first_day <= day_as_of
+    arr_event       = arr_second_day <= day_as_of
+    arr_end_day     = np.where(arr_event, arr_second_day, day_as_of)
+
+    df = ix.df_loans.iloc[ix.first_pos[mask_customer]][["customer_id"] + SEGMENT_COLUMNS].reset_index(drop=True)
+    df["duration_days"] = (arr_end_day - arr_first_day)[mask_customer]
+    df["event"]         = arr_event[mask_customer]
+    return df
+
+
+def time_to_default(ix, as_of=asof.DATA_END, censor_repaid=True):
+    # One row per loan originated by as_of; censor_repaid=False keeps repaid loans
+    # at risk until as_of, which is how 03_1 counts its 12M default flag
+    day_as_of       = compact.day_number(as_of)
+    arr_pos         = np.flatnonzero(ix.orig_day <= day_as_of)
+    arr_orig        = ix.orig_day[arr_pos]
+    arr_default     = ix.default_day[arr_pos]
+    arr_event       = arr_default <= day_as_of
+
+    # Repaid by as_of: principal paid through as_of covers the principal; censor at the last payment
+    arr_paid, arr_n_pay = ix.payments_through(arr_pos, np.full(len(arr_pos), day_as_of))
+    arr_last_pay        = ix.pay_day[np.maximum(ix.loan_pay_start[arr_pos] + arr_n_pay - 1, 0)]
+    mask_repaid         = ~arr_event & (arr_n_pay > 0) & \
+                          (np.round((ix.principal[arr_pos] - arr_paid) * 100) <= PAID_OFF_CENTS)
+    if not censor_repaid:
+        mask_repaid     = np.zeros(len(arr_pos), dtype=bool)
+
+    arr_end_day     = np.where(arr_event, arr_default, np.where(mask_repaid, arr_last_pay, day_as_of))
+
+    df = ix.df_loans.iloc[arr_pos][["loan_id", "customer_id"] + SEGMENT_COLUMNS].reset_index(drop=True)
+    df["duration_days"] = np.maximum(arr_end_day - arr_orig, 0)
+    df["event"]         = arr_event
+    df["repaid"]        = mask_repaid
+    return df
+
+
+OUTCOMES = {
+    "second_loan"   : time_to_second_loan,
+    "default"       : time_to_default,
+}
+
+
+def survival_tables(ix=None, as_of=asof.DATA_END):
+    # (curves, horizons) for every outcome, segmented by tier and channel
+    ix          = ix or asof.EventIndex()
+    list_curves = []
+    for outcome, build in OUTCOMES.items():
+        df = build(ix, as_of)
+        list_curves.append(segmented(df["duration_days"], df["event"], df).assign(outcome=outcome))
+
+    df_curves   = pd.concat(list_curves, ignore_index=True)
+    df_curves   = df_curves[["outcome"] + [c for c in df_curves.columns if c != "outcome"]]
+    df_horizons = pd.concat([at_horizons(df).assign(outcome=outcome) for outcome, df in df_curves.groupby("outcome", sort=False)],
+                            ignore_index=True)
+    return df_curves, df_horizons[["outcome"] + [c for c in df_horizons.columns if c != "outcome"]]
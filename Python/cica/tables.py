@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+
+from cica import paths
+
+# -----------------------------------------------------------
+# Raw + generated table loading
+# -----------------------------------------------------------
+#
+# Raw tables are parsed by the pyarrow CSV reader (multi-threaded) with every
+# column's type declared up front in RAW_COLUMN_TYPES, so ids come out as int64,
+# money as float64 and dates as datetime64 straight from the parser. Floats are
+# correctly rounded, so the frames match pd.read_csv(float_precision="round_trip");
+# pandas' default parser can be one ulp off on some values (due_principal,
+# paid_principal, decision_score), and sums over those columns differ from the
+# pre-pyarrow outputs in the last digits.
+#
+# submit_raw() starts all requested tables at once on a thread pool and hands
+# back {table_name: Future}, so a caller can start on loans while payments is
+# still being read. load_raw_tables() fills in whatever a `raw` dict is missing,
+# concurrently; it is what the cica modules call.
+
+DATE = "date"
+
+# Every raw column with its parse type (int64 / float64 / str / date)
+RAW_COLUMN_TYPES = {
+    "applications"          : {"application_id": "int64", "customer_id": "int64", "application_date": DATE,
+                               "decision": "str", "approved_amount": "float64", "decision_score": "float64",
+                               "reason_code": "str"},
+    "budget_plan_monthly"   : {"month": DATE, "scenario_name": "str", "planned_originations": "int64",
+                               "planned_cash_inflow": "float64", "planned_revenue": "float64",
+                               "planned_net_losses": "float64"},
+    "customers"             : {"customer_id": "int64", "signup_date": DATE, "acquisition_channel": "str",
+                               "risk_tier_at_signup": "str", "income_band": "str", "region": "str", "age_band": "str"},
+    "dim_month"             : {"month_start": DATE},
+    "loans"                 : {"loan_id": "int64", "customer_id": "int64", "application_id": "int64",
+                               "origination_date": DATE, "principal": "float64", "term_months": "int64",
+                               "apr": "float64", "origination_fee_rate": "float64", "origination_fee_amount": "float64",
+                               "merchant_category": "str", "loan_status": "str", "default_date": DATE,
+                               "principal_paid_total": "float64", "outstanding_principal_end": "float64",
+                               "orig_month": DATE, "default_month": DATE},
+    "macro_monthly"         : {"month": DATE, "scenario_name": "str", "unemployment_index": "float64",
+                               "rates_index": "float64", "consumer_stress_index": "float64"},
+    "payment_schedule"      : {"loan_id": "int64", "installment_no": "int64", "due_date": DATE,
+                               "due_principal": "float64", "due_fee_interest": "float64", "due_total": "float64",
+                               "scheduled_balance_after": "float64"},
+    "payments"              : {"payment_id": "int64", "loan_id": "int64", "payment_date": DATE,
+                               "payment_amount": "float64", "paid_principal": "float64", "paid_fee_interest": "float64",
+                               "payment_type": "str"},
+}
+
+# Date columns per raw table
+RAW_DATE_COLUMNS = {table_name: [col for col, col_type in dict_types.items() if col_type == DATE]
+                    for table_name, dict_types in RAW_COLUMN_TYPES.items()}
+
+RAW_TABLES = list(RAW_COLUMN_TYPES)
+
+ARROW_TYPES = {
+    "int64"     : pa.int64(),
+    "float64"   : pa.float64(),
+    "str"       : pa.string(),
+    DATE        : pa.timestamp("us"),
+}
+
+# The Postgres exports in /Data_Generated write missing values as the literal NULL
+NULL_VALUES = ["NULL"]
+
+
+def load_raw(table_name):
+    dict_types  = RAW_COLUMN_TYPES[table_name]
+    convert     = pcsv.ConvertOptions(
+                    column_types        = {col: ARROW_TYPES[col_type] for col, col_type in dict_types.items()},
+                    include_columns     = list(dict_types),
+                    null_values         = [""],
+                    strings_can_be_null = True,
+                  )
+    table       = pcsv.read_csv(paths.raw_path(table_name), read_options=pcsv.ReadOptions(use_threads=True),
+                                convert_options=convert)
+    df          = table.to_pandas()
+    return df
+
+
+def submit_raw(table_names=None, executor=None):
+    # {table_name: Future of its frame}; the caller owns the executor when it passes one
+    list_names  = list(RAW_TABLES if table_names is None else table_names)
+    pool        = executor or ThreadPoolExecutor(max_workers=min(len(list_names), os.cpu_count() or 1) or 1)
+    dict_futures = {table_name: pool.submit(load_raw, table_name) for table_name in list_names}
+    if executor is None:
+        pool.shutdown(wait=False)
+    return dict_futures
+
+
+def load_raw_tables(table_names=None, raw=None):
+    # Copy of raw with every table in table_names present; missing ones are read concurrently
+    raw             = dict(raw or {})
+    list_missing    = [name for name in (RAW_TABLES if table_names is None else table_names) if name not in raw]
+    dict_futures    = submit_raw(list_missing) if list_missing else {}
+    for table_name, future in dict_futures.items():
+        raw[table_name] = future.result()
+    return raw
+
+
+def load_generated(output_name, date_cols=None):
+    df = pd.read_csv(paths.generated_path(output_name), na_values=NULL_VALUES)
+
+    for col in date_cols or []:
+        df[col] = pd.to_datetime(df[col])
+
+    return df
+
+
+def save_generated(df, output_name):
+    df.to_csv(paths.generated_path(output_name), index=False)
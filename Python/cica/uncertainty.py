@@ -0,0 +1,182 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import betaincinv
+
+from cica import asof
+
+# -----------------------------------------------------------
+# Bootstrap confidence intervals for the 03_x ratio metrics
+# -----------------------------------------------------------
+#
+# PD (03_1), LGD (03_3), CDR (03_4a) and CLR (03_4b) are all ratios of
+# loan-level sums within a segment:
+#
+#   pd_12m      is_default_12m                  / 1                 PD-eligible loans
+#   lgd         principal_loss                  / principal_unpaid  defaulted loans with a recovery row
+#   cdr_12m     defaulted within 12M            / 1                 closed vintages
+#   clr_12m     unpaid at default within 12M    / principal         closed vintages
+#
+# The loan-level inputs come from asof.EventIndex at DATA_END with no event
+# horizon, which reproduces the SQL exports exactly.
+#
+# Every (metric, segment) pair is one column of two sparse (loans x cells)
+# matrices, one for numerators and one for denominators. Segments are the whole
+# book, each risk tier and each origination month. A bootstrap replicate is a
+# row of Poisson(1) weights, one per loan. A block of replicates is then two
+# matrix products, W @ NUM and W @ DEN, and the replicate ratios are their
+# quotient. 10,000 replicates over every cell take a few products, with no
+# resampling loop.
+#
+# Each loan gets one weight per replicate, shared by every metric. The weights
+# depend only on the seed and the loan order, so a metric's interval does not
+# change with which other metrics are requested. A cell whose denominator is 0
+# in a replicate (a thin vintage that drew no loans) gives NaN there, and the
+# percentiles are taken over the replicates that remain.
+#
+# A count rate (pd_12m, cdr_12m) resting on a handful of events has no usable
+# bootstrap: a replicate weights all x events zero with probability e^-x, so
+# once e^-x >= (1 - level) / 2 (x <= 3 at 95%) the lower percentile is exactly
+# 0, and a 0-event cell collapses onto the estimate altogether. The same holds
+# for the upper end with few non-events. Those cells take the Jeffreys interval
+# instead, Beta(x + 1/2, n - x + 1/2) quantiles with the lower end at 0 when
+# x = 0, and the Beta's standard deviation as the standard error. Each row's
+# ci_method says which one it got, and ci_label() words the legend from it.
+
+N_BOOTSTRAP         = 10_000
+BOOTSTRAP_BLOCK     = 1_000
+BOOTSTRAP_SEED      = 20260315
+CI_LEVEL            = 0.95
+EVENTS_THROUGH      = asof.SQL_EVENTS_THROUGH
+
+METRICS             = ["pd_12m", "lgd", "cdr_12m", "clr_12m"]
+COUNT_METRICS       = ["pd_12m", "cdr_12m"]
+SEGMENT_TYPES       = ["portfolio", "risk_tier_at_signup", "origination_month"]
+
+
+def _segment_codes(ix, segment_type, arr_pos):
+    # (cell code per row, labels); rows with code -1 are left out
+    if segment_type == "portfolio":
+        return np.zeros(len(arr_pos), dtype=np.int64), ["All"]
+    if segment_type == "risk_tier_at_signup":
+        return ix.tier_code[arr_pos], list(asof.TIERS)
+
+    arr_month               = ix.orig_month[arr_pos]
+    arr_months, arr_code    = np.unique(arr_month, return_inverse=True)
+    return arr_code.astype(np.int64), list(ix.spine.to_month_start(arr_months))
+
+
+def design(ix=None, as_of=asof.DATA_END, metrics=None, events_through=EVENTS_THROUGH):
+    # Sparse numerator / denominator matrices (loans x cells) plus one row per cell
+    ix              = ix or asof.EventIndex()
+    st              = ix.state(as_of, events_through)
+    dict_rows       = asof.rate_elements(ix, st)
+
+    list_rows, list_cols, list_num, list_den, list_cells = [], [], [], [], []
+    n_cells         = 0
+    for metric in metrics or METRICS:
+        arr_pos, arr_num, arr_den = dict_rows[metric]
+        for segment_type in SEGMENT_TYPES:
+            arr_code, list_labels = _segment_codes(ix, segment_type, arr_pos)
+            mask            = arr_code >= 0
+            list_rows.append(arr_pos[mask])
+            list_cols.append(n_cells + arr_code[mask])
+            list_num.append(arr_num[mask])
+            list_den.append(arr_den[mask])
+            list_cells.append(pd.DataFrame({
+                                "metric"        : metric,
+                                "segment_type"  : segment_type,
+                                "segment"       : list_labels,
+                                "n_loans"       : np.bincount(arr_code[mask], minlength=len(list_labels)),
+                              }))
+            n_cells         += len(list_labels)
+
+    arr_rows        = np.concatenate(list_rows)
+    arr_cols        = np.concatenate(list_cols)
+    shape           = (len(ix.loan_id), n_cells)
+    mat_num         = sparse.csr_matrix((np.concatenate(list_num), (arr_rows, arr_cols)), shape=shape)
+    mat_den         = sparse.csr_matrix((np.concatenate(list_den), (arr_rows, arr_cols)), shape=shape)
+    return mat_num, mat_den, pd.concat(list_cells, ignore_index=True)
+
+
+def rate_intervals(metrics=None, ix=None, as_of=asof.DATA_END, events_through=EVENTS_THROUGH,
+                   n_bootstrap=N_BOOTSTRAP, seed=BOOTSTRAP_SEED, level=CI_LEVEL):
+    # One row per (metric, segment): value, standard error and interval (bootstrap percentile,
+    # or Jeffreys for thin count-rate cells; see ci_method)
+    mat_num, mat_den, df_cells = design(ix, as_of, metrics, events_through)
+    n_loans         = mat_num.shape[0]
+
+    df_cells["numerator"]   = np.asarray(mat_num.sum(axis=0)).ravel()
+    df_cells["denominator"] = np.asarray(mat_den.sum(axis=0)).ravel()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df_cells["value"]   = df_cells["numerator"] / df_cells["denominator"]
+
+    # Poisson-weight bootstrap, in blocks of replicates
+    rng             = np.random.default_rng(seed)
+    list_boot       = []
+    for block_start in range(0, n_bootstrap, BOOTSTRAP_BLOCK):
+        n_block     = min(BOOTSTRAP_BLOCK, n_bootstrap - block_start)
+        arr_w       = rng.poisson(1.0, size=(n_block, n_loans)).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            list_boot.append((arr_w @ mat_num) / (arr_w @ mat_den))
+
+    alpha           = (1.0 - level) / 2.0
+    arr_boot        = np.concatenate(list_boot, axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        df_cells["std_error"]   = np.nanstd(arr_boot, axis=0, ddof=1)
+        df_cells["ci_low"]      = np.nanquantile(arr_boot, alpha, axis=0)
+        df_cells["ci_high"]     = np.nanquantile(arr_boot, 1.0 - alpha, axis=0)
+
+    df_cells["ci_method"]   = "bootstrap"
+    jeffreys_intervals(df_cells, level)
+
+    df_cells.attrs["n_bootstrap"]   = n_bootstrap
+    df_cells.attrs["level"]         = level
+    return df_cells
+
+
+def jeffreys_intervals(df_cells, level=CI_LEVEL):
+    # Count-rate cells whose bootstrap tail is degenerate (e^-x >= alpha, x the events or the
+    # non-events): Jeffreys interval in place of the bootstrap
+    alpha           = (1.0 - level) / 2.0
+    arr_x           = df_cells["numerator"].to_numpy(dtype=float)
+    arr_n           = df_cells["denominator"].to_numpy(dtype=float)
+    mask            = (df_cells["metric"].isin(COUNT_METRICS).to_numpy()
+                       & (np.exp(-np.minimum(arr_x, arr_n - arr_x)) >= alpha) & (arr_n > 0))
+    if not mask.any():
+        return df_cells
+
+    arr_a           = arr_x[mask] + 0.5
+    arr_b           = arr_n[mask] - arr_x[mask] + 0.5
+
+    df_cells.loc[mask, "ci_low"]    = np.where(arr_x[mask] > 0, betaincinv(arr_a, arr_b, alpha), 0.0)
+    df_cells.loc[mask, "ci_high"]   = np.where(arr_x[mask] < arr_n[mask], betaincinv(arr_a, arr_b, 1.0 - alpha), 1.0)
+    df_cells.loc[mask, "std_error"] = np.sqrt(arr_a * arr_b / ((arr_a + arr_b) ** 2 * (arr_a + arr_b + 1.0)))
+    df_cells.loc[mask, "ci_method"] = "jeffreys"
+    return df_cells
+
+
+def segment_table(df_intervals, metric, segment_type, scale=1.0):
+    # Intervals for one metric keyed like the script's aggregate table, e.g. to merge onto df_pd_by_tier
+    df = df_intervals.loc[(df_intervals["metric"] == metric) & (df_intervals["segment_type"] == segment_type)]
+    return pd.DataFrame({
+                            segment_type            : df["segment"].to_numpy(),
+                            f"{metric}_std_error"   : df["std_error"].to_numpy() * scale,
+                            f"{metric}_ci_low"      : df["ci_low"].to_numpy() * scale,
+                            f"{metric}_ci_high"     : df["ci_high"].to_numpy() * scale,
+                            f"{metric}_ci_method"   : df["ci_method"].to_numpy(),
+                        })
+
+
+def ci_label(df_intervals, metric, segment_type, level=CI_LEVEL):
+    # Legend text naming the interval method(s) behind one metric x segment_type, e.g. "95% bootstrap CI"
+    df          = df_intervals.loc[(df_intervals["metric"] == metric) & (df_intervals["segment_type"] == segment_type)]
+    set_methods = set(df["ci_method"])
+    if set_methods == {"jeffreys"}:
+        return f"{level:.0%} Jeffreys CI"
+    if "jeffreys" in set_methods:
+        return f"{level:.0%} CI: bootstrap, Jeffreys where events are few"
+    return f"{level:.0%} bootstrap CI"
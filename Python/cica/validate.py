@@ -0,0 +1,324 @@
+import numpy as np
+import pandas as pd
+
+from cica import compact, tables
+
+# -----------------------------------------------------------
+# Data validation / referential integrity gate
+# -----------------------------------------------------------
+#
+# Runs over the raw tables before anything else uses them. Every check is
+# whole-column array work, no row loops:
+#
+#   membership      key -> position lookup table over the parent id range (ids are
+#                   serial, so the range is dense); np.searchsorted into the sorted
+#                   parent keys when it is not
+#   uniqueness      bincount over the key range when it is dense, otherwise one sort
+#   grouped sums    bincount of the child values into parent positions
+#   contiguity      installment counts / min / max per loan via bincount + minimum.at
+#
+# Money is compared in integer cents (cica.compact), so "agrees" means within
+# MONEY_TOLERANCE_CENTS and float noise never raises a violation.
+#
+# Severity:
+#   error    the row breaks a key or an ordering rule; metrics built on it are wrong
+#   warning  the row is internally inconsistent but joins still work
+#
+# validate() returns (summary, violations); violations has one row per bad row,
+# capped at MAX_ROWS_PER_CHECK per check so a broken extract cannot flood the report.
+
+MONEY_TOLERANCE_CENTS   = 1
+MAX_ROWS_PER_CHECK      = 1000
+DENSE_KEY_FACTOR        = 4
+VALIDATION_TABLES       = ["customers", "applications", "loans", "payments", "payment_schedule"]
+
+PRIMARY_KEYS = {
+    "customers"         : ["customer_id"],
+    "applications"      : ["application_id"],
+    "loans"             : ["loan_id"],
+    "payments"          : ["payment_id"],
+    "payment_schedule"  : ["loan_id", "installment_no"],
+}
+
+# (child table, child column, parent table, parent column)
+FOREIGN_KEYS = [
+    ("applications",        "customer_id",      "customers",    "customer_id"),
+    ("loans",               "customer_id",      "customers",    "customer_id"),
+    ("loans",               "application_id",   "applications", "application_id"),
+    ("payments",            "loan_id",          "loans",        "loan_id"),
+    ("payment_schedule",    "loan_id",          "loans",        "loan_id"),
+]
+
+REQUIRED_COLUMNS = {
+    "customers"         : ["customer_id", "signup_date", "risk_tier_at_signup"],
+    "applications"      : ["application_id", "customer_id", "application_date", "decision"],
+    "loans"             : ["loan_id", "customer_id", "application_id", "origination_date", "principal", "term_months"],
+    "payments"          : ["payment_id", "loan_id", "payment_date", "payment_amount", "paid_principal"],
+    "payment_schedule"  : ["loan_id", "installment_no", "due_date", "due_principal"],
+}
+
+SIGNED_PAYMENT_TYPES    = ["refund"]
+
+
+# -----------------------------------------------------------
+# Array primitives
+# -----------------------------------------------------------
+
+def composite_key(list_arrays):
+    # Several non-negative integer columns -> one int64 key (mixed radix)
+    arr_key = np.zeros(len(list_arrays[0]), dtype=np.int64)
+    for arr in list_arrays:
+        arr     = np.asarray(arr, dtype=np.int64)
+        radix   = int(arr.max(initial=0)) + 1
+        arr_key = arr_key * radix + arr
+    return arr_key
+
+
+def _dense_range(arr_keys, n_rows):
+    # (min, range) when the keys fit a lookup table of at most DENSE_KEY_FACTOR x n_rows
+    if len(arr_keys) == 0:
+        return None
+    key_min     = int(arr_keys.min())
+    key_range   = int(arr_keys.max()) - key_min + 1
+    return (key_min, key_range) if key_range <= DENSE_KEY_FACTOR * max(n_rows, 1) else None
+
+
+def parent_position(arr_keys, arr_parent_keys):
+    # Position of each child key in the parent column (-1 when missing).
+    # Dense parent ids (the usual serial keys) go through a key -> position table,
+    # one gather per child row; sparse ids fall back to a sorted searchsorted.
+    arr_keys        = np.asarray(arr_keys, dtype=np.int64)
+    arr_parent_keys = np.asarray(arr_parent_keys, dtype=np.int64)
+    if len(arr_parent_keys) == 0:
+        return np.full(len(arr_keys), -1, dtype=np.int64)
+
+    dense = _dense_range(arr_parent_keys, len(arr_parent_keys))
+    if dense is not None:
+        key_min, key_range  = dense
+        arr_lut             = np.full(key_range, -1, dtype=np.int64)
+        arr_lut[arr_parent_keys - key_min] = np.arange(len(arr_parent_keys))
+        arr_offset          = arr_keys - key_min
+        is_inside           = (arr_offset >= 0) & (arr_offset < key_range)
+        return np.where(is_inside, arr_lut[np.where(is_inside, arr_offset, 0)], -1)
+
+    arr_order   = np.argsort(arr_parent_keys, kind="stable")
+    arr_sorted  = arr_parent_keys[arr_order]
+    arr_pos     = np.minimum(np.searchsorted(arr_sorted, arr_keys), len(arr_sorted) - 1)
+    return np.where(arr_sorted[arr_pos] == arr_keys, arr_order[arr_pos], -1)
+
+
+def is_member(arr_keys, arr_ref):
+    # True where arr_keys[i] is in arr_ref
+    return parent_position(arr_keys, arr_ref) >= 0
+
+
+def is_duplicate(arr_keys):
+    # True on every row whose key appears more than once
+    arr_keys    = np.asarray(arr_keys, dtype=np.int64)
+    dense       = _dense_range(arr_keys, len(arr_keys))
+    if len(arr_keys) == 0:
+        return np.zeros(0, dtype=bool)
+
+    if dense is not None:
+        key_min, key_range  = dense
+        arr_count           = np.bincount(arr_keys - key_min, minlength=key_range)
+        return arr_count[arr_keys - key_min] > 1
+
+    arr_order   = np.argsort(arr_keys, kind="stable")
+    arr_sorted  = arr_keys[arr_order]
+    arr_same    = arr_sorted[1:] == arr_sorted[:-1]
+    arr_dup     = np.zeros(len(arr_keys), dtype=bool)
+    arr_dup[arr_order[1:][arr_same]]    = True
+    arr_dup[arr_order[:-1][arr_same]]   = True
+    return arr_dup
+
+
+# -----------------------------------------------------------
+# Checks: each returns (rows_checked, mask of violating rows, detail per violating row)
+# -----------------------------------------------------------
+
+def _int_column(df, col):
+    return df[col].fillna(-1).to_numpy().astype(np.int64)
+
+
+def check_not_null(raw):
+    for table_name, list_cols in REQUIRED_COLUMNS.items():
+        df = raw[table_name]
+        for col in list_cols:
+            mask = df[col].isna().to_numpy()
+            yield "not_null", "error", table_name, df, mask, f"{col} is NULL"
+
+
+def check_primary_keys(raw):
+    for table_name, list_cols in PRIMARY_KEYS.items():
+        df      = raw[table_name]
+        arr_key = composite_key([_int_column(df, c) for c in list_cols])
+        yield "primary_key", "error", table_name, df, is_duplicate(arr_key), f"duplicate ({', '.join(list_cols)})"
+
+
+def check_foreign_keys(raw):
+    for child, child_col, parent, parent_col in FOREIGN_KEYS:
+        df      = raw[child]
+        mask    = ~is_member(_int_column(df, child_col), _int_column(raw[parent], parent_col))
+        yield "foreign_key", "error", child, df, mask, f"{child_col} not in {parent}.{parent_col}"
+
+
+def check_loan_applications(raw):
+    # Every loan comes from an approved application of the same customer
+    df_loans    = raw["loans"]
+    df_apps     = raw["applications"]
+    arr_pos     = parent_position(_int_column(df_loans, "application_id"), _int_column(df_apps, "application_id"))
+    has_app     = arr_pos >= 0
+    arr_pos     = np.maximum(arr_pos, 0)
+
+    is_approved = (df_apps["decision"].to_numpy() == "approved")[arr_pos]
+    same_cust   = _int_column(df_apps, "customer_id")[arr_pos] == _int_column(df_loans, "customer_id")
+
+    yield "loan_application", "error", "loans", df_loans, has_app & ~is_approved, "application is not approved"
+    yield "loan_application", "error", "loans", df_loans, has_app & ~same_cust, "application belongs to another customer"
+
+
+def check_schedule(raw):
+    # Installments per loan are 1..n with no gaps, and n = term_months
+    df_loans    = raw["loans"]
+    df_sched    = raw["payment_schedule"]
+    arr_pos     = parent_position(_int_column(df_sched, "loan_id"), _int_column(df_loans, "loan_id"))
+    has_loan    = arr_pos >= 0
+    arr_pos     = arr_pos[has_loan]
+    arr_inst    = _int_column(df_sched, "installment_no")[has_loan]
+    n_loans     = len(df_loans)
+
+    arr_count   = np.bincount(arr_pos, minlength=n_loans)
+    arr_max     = np.zeros(n_loans, dtype=np.int64)
+    arr_min     = np.full(n_loans, np.iinfo(np.int64).max)
+    np.maximum.at(arr_max, arr_pos, arr_inst)
+    np.minimum.at(arr_min, arr_pos, arr_inst)
+
+    has_sched   = arr_count > 0
+    is_gappy    = has_sched & ((arr_min != 1) | (arr_max != arr_count))
+    is_short    = has_sched & (arr_count != _int_column(df_loans, "term_months"))
+
+    yield "schedule_contiguous", "error", "loans", df_loans, is_gappy, "installment_no is not 1..n without gaps"
+    yield "schedule_term", "warning", "loans", df_loans, is_short, "installment count differs from term_months"
+    yield "schedule_missing", "warning", "loans", df_loans, ~has_sched, "loan has no payment_schedule rows"
+
+
+def check_loan_totals(raw):
+    # principal_paid_total = sum(paid_principal), outstanding = principal - paid
+    df_loans        = raw["loans"]
+    df_pay          = raw["payments"]
+    arr_pos         = parent_position(_int_column(df_pay, "loan_id"), _int_column(df_loans, "loan_id"))
+    has_loan        = arr_pos >= 0
+
+    # Sum the raw amounts first and round the total: the raw floats carry sub-cent
+    # noise, and rounding every payment before summing drifts by several cents
+    arr_paid        = np.bincount(arr_pos[has_loan], weights=df_pay["paid_principal"].fillna(0).to_numpy()[has_loan],
+                                  minlength=len(df_loans))
+    arr_paid_cents  = compact.to_cents(pd.Series(arr_paid)).astype(np.int64)
+    arr_total_cents = compact.to_cents(df_loans["principal_paid_total"].fillna(0)).astype(np.int64)
+    arr_prin_cents  = compact.to_cents(df_loans["principal"].fillna(0)).astype(np.int64)
+    arr_out_cents   = compact.to_cents(df_loans["outstanding_principal_end"].fillna(0)).astype(np.int64)
+
+    is_paid_off     = np.abs(arr_paid_cents - arr_total_cents) > MONEY_TOLERANCE_CENTS
+    is_out_off      = np.abs(arr_prin_cents - arr_total_cents - arr_out_cents) > MONEY_TOLERANCE_CENTS
+
+    yield "loan_paid_total", "warning", "loans", df_loans, is_paid_off, "principal_paid_total != sum(payments.paid_principal)"
+    yield "loan_outstanding", "warning", "loans", df_loans, is_out_off, "principal - principal_paid_total != outstanding_principal_end"
+
+
+def check_payments(raw):
+    df_pay      = raw["payments"]
+    df_loans    = raw["loans"]
+
+    arr_amount  = compact.to_cents(df_pay["payment_amount"].fillna(0)).astype(np.int64)
+    arr_prin    = compact.to_cents(df_pay["paid_principal"].fillna(0)).astype(np.int64)
+    arr_fee     = compact.to_cents(df_pay["paid_fee_interest"].fillna(0)).astype(np.int64)
+    is_signed   = df_pay["payment_type"].isin(SIGNED_PAYMENT_TYPES).to_numpy()
+
+    is_split    = np.abs(arr_amount - arr_prin - arr_fee) > MONEY_TOLERANCE_CENTS
+    is_negative = ~is_signed & ((arr_amount < 0) | (arr_prin < 0) | (arr_fee < 0))
+
+    arr_pos     = parent_position(_int_column(df_pay, "loan_id"), _int_column(df_loans, "loan_id"))
+    arr_orig    = compact.to_days(df_loans["origination_date"])[np.maximum(arr_pos, 0)]
+    is_early    = (arr_pos >= 0) & (compact.to_days(df_pay["payment_date"]) < arr_orig)
+
+    yield "payment_split", "warning", "payments", df_pay, is_split, "payment_amount != paid_principal + paid_fee_interest"
+    yield "payment_sign", "error", "payments", df_pay, is_negative, "negative amount on a non-refund payment"
+    yield "event_order", "error", "payments", df_pay, is_early, "payment_date before origination_date"
+
+
+def check_loan_dates(raw):
+    df_loans    = raw["loans"]
+    df_cust     = raw["customers"]
+    arr_orig    = compact.to_days(df_loans["origination_date"])
+    arr_default = compact.to_days(df_loans["default_date"])
+
+    is_early    = (arr_default != compact.MISSING_DAY) & (arr_default < arr_orig)
+    yield "event_order", "error", "loans", df_loans, is_early, "default_date before origination_date"
+
+    arr_pos     = parent_position(_int_column(df_loans, "customer_id"), _int_column(df_cust, "customer_id"))
+    arr_signup  = compact.to_days(df_cust["signup_date"])[np.maximum(arr_pos, 0)]
+    is_pre      = (arr_pos >= 0) & (arr_orig < arr_signup)
+    yield "event_order", "warning", "loans", df_loans, is_pre, "origination_date before the customer's signup_date"
+
+
+CHECKS = [
+    check_not_null,
+    check_primary_keys,
+    check_foreign_keys,
+    check_loan_applications,
+    check_schedule,
+    check_loan_totals,
+    check_payments,
+    check_loan_dates,
+]
+
+
+# -----------------------------------------------------------
+# Report
+# -----------------------------------------------------------
+
+def _row_keys(df, table_name, arr_rows):
+    list_cols = PRIMARY_KEYS[table_name]
+    return df[list_cols].iloc[arr_rows].astype(str).agg("/".join, axis=1).to_numpy()
+
+
+def validate(raw=None):
+    raw = tables.load_raw_tables(VALIDATION_TABLES, raw)
+
+    list_summary    = []
+    list_violations = []
+
+    for check in CHECKS:
+        for check_name, severity, table_name, df, mask, detail in check(raw):
+            arr_rows = np.flatnonzero(mask)
+
+            list_summary.append({
+                                    "check_name"    : check_name,
+                                    "severity"      : severity,
+                                    "table_name"    : table_name,
+                                    "detail"        : detail,
+                                    "rows_checked"  : len(df),
+                                    "n_violations"  : len(arr_rows),
+                                })
+
+            if len(arr_rows):
+                arr_rows = arr_rows[:MAX_ROWS_PER_CHECK]
+                list_violations.append(pd.DataFrame({
+                                    "check_name"    : check_name,
+                                    "severity"      : severity,
+                                    "table_name"    : table_name,
+                                    "row_number"    : arr_rows,
+                                    "row_key"       : _row_keys(df, table_name, arr_rows),
+                                    "detail"        : detail,
+                                }))
+
+    df_summary      = pd.DataFrame(list_summary)
+    df_violations   = (pd.concat(list_violations, ignore_index=True) if list_violations else
+                       pd.DataFrame(columns=["check_name", "severity", "table_name", "row_number", "row_key", "detail"]))
+
+    return df_summary, df_violations
+
+
+def n_errors(df_summary):
+    return int(df_summary.loc[df_summary["severity"] == "error", "n_violations"].sum())